@@ -1,9 +1,9 @@
 from flask import Flask, request, jsonify, send_from_directory, send_file
 from flask_cors import CORS
 import os
+import io
 import json
 import tempfile
-import shutil
 import zipfile
 from datetime import datetime
 from werkzeug.utils import secure_filename
@@ -14,9 +14,10 @@ sys.path.append('./evaluation_system_v2')
 try:
     from evaluation_engine import EvaluationEngine
     from pdf_processor import PDFImageExtractor
-    from image_classifier import ImageClassifier
-    from qwen_client import QwenClient
+    from model_registry import REGISTRY, get_classifier, get_qwen_client
     from metadata_generator import MetadataGenerator
+    from reference_set import ReferenceSet
+    from result_store import ArtifactStore, write_result_json
 except ImportError:
     print("Evaluation system imports failed")
     print("   Make sure evaluation_system_v2/ is available")
@@ -26,97 +27,123 @@ app = Flask(__name__, static_folder='frontend/static', static_url_path='/static'
 CORS(app)
 
 # Configuration
-UPLOAD_FOLDER = './frontend/uploads'
 ALLOWED_EXTENSIONS = {'zip', 'pdf', 'png', 'jpg', 'jpeg'}
 MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 10MB
 
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Uploads are processed in memory; the size limit bounds memory per request
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 
-# Create upload folder
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Seconds a request waits for a warming-up engine before it gets a 503
+ENGINE_READY_WAIT = 10
 
-# Initialize Evaluation Engine
+# Initialize Evaluation Engine: the server starts right away, classifier, Qwen connection and
+# metadata database are loaded in the background and retried until available
 evaluation_engine = None
 if EvaluationEngine:
     try:
-        evaluation_engine = EvaluationEngine()
-        print("Evaluation Engine initialized")
+        evaluation_engine = EvaluationEngine(background_warmup=True)
     except Exception as e:
         print(f"Evaluation Engine Error: {e}")
 else:
     print("Evaluation Engine not available")
 
+def engine_unavailable(components=None):
+    """
+    503 response if the evaluation engine is not ready within ENGINE_READY_WAIT seconds
+    
+    Args:
+        components: Engine components the request needs (default: all)
+        
+    Returns:
+        (response, status) tuple, or None if the engine is ready
+    """
+    if not evaluation_engine:
+        return jsonify({'error': 'Evaluation system not available'}), 503
+    
+    if evaluation_engine.wait_until_ready(ENGINE_READY_WAIT, components):
+        return None
+    
+    response = jsonify({
+        'error': 'Evaluation system is starting up (Qwen server / models not ready yet). Please retry shortly.',
+        'readiness': evaluation_engine.readiness()
+    })
+    response.headers['Retry-After'] = str(ENGINE_READY_WAIT)
+    return response, 503
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def save_uploaded_file(file, prefix=""):
-    """Save uploaded file and return path"""
+def read_uploaded_file(file):
+    """Read an uploaded file into memory and return its bytes (None if missing or not allowed)"""
     if file and file.filename and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        if prefix:
-            filename = f"{prefix}_{filename}"
-        
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        return filepath
+        return file.read()
     return None
 
-def extract_pdf_from_zip(zip_path):
-    """Extract PDF from ZIP file"""
-    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+def read_pdf_from_zip(zip_source):
+    """
+    Read the first PDF of a ZIP file into memory
+    
+    Args:
+        zip_source: Path, bytes or file-like object of the ZIP file
+    """
+    if isinstance(zip_source, bytes):
+        zip_source = io.BytesIO(zip_source)
+    
+    with zipfile.ZipFile(zip_source, 'r') as zip_ref:
         for file_info in zip_ref.filelist:
             if file_info.filename.lower().endswith('.pdf'):
-                # Extract PDF to temporary directory
-                temp_dir = tempfile.mkdtemp()
-                pdf_path = zip_ref.extract(file_info, temp_dir)
-                return pdf_path
+                # Stream the member straight out of the archive, nothing touches the disk
+                with zip_ref.open(file_info) as member:
+                    return member.read()
     return None
 
 def process_custom_references(reference_files):
-    """Process custom reference files"""
+    """
+    Process custom reference files into a per-request ReferenceSet
+    
+    Args:
+        reference_files: List of (filename, bytes) of the uploaded references
+    """
     temp_metadata = {}
+    temp_embeddings = {}
     processed_files = []
     
-    for file_path in reference_files:
-        if not os.path.exists(file_path):
-            continue
-            
-        filename = os.path.basename(file_path)
+    # Reference pixels live in a per-request file store, not in the metadata (removed via cleanup())
+    reference_store = ArtifactStore(tempfile.mkdtemp(prefix="references_"))
+    
+    for filename, data in reference_files:
         file_ext = filename.split('.')[-1].lower()
         
         if file_ext == 'zip':
-            # Extract ZIP and find PDF
-            pdf_path = extract_pdf_from_zip(file_path)
-            if pdf_path:
-                processed_files.append(pdf_path)
+            # Find PDF inside ZIP
+            pdf_bytes = read_pdf_from_zip(data)
+            if pdf_bytes:
+                processed_files.append((f"{os.path.splitext(filename)[0]}.pdf", pdf_bytes))
         elif file_ext == 'pdf':
-            processed_files.append(file_path)
+            processed_files.append((filename, data))
         elif file_ext in ['jpg', 'jpeg', 'png']:
-            processed_files.append(file_path)
+            processed_files.append((filename, data))
     
     # Generate metadata for reference files
     if processed_files:
-        metadata_generator = MetadataGenerator()
+        # Shared, already loaded models (loaded once per process, not per image)
+        classifier = get_classifier()
+        qwen_client = get_qwen_client()
+        extractor = PDFImageExtractor()
         
-        for file_path in processed_files:
+        for filename, data in processed_files:
             try:
-                if file_path.lower().endswith('.pdf'):
-                    # Process PDF to images
-                    extractor = PDFImageExtractor()
-                    images = extractor.extract_images_as_base64_only(file_path)
-                    
-                    for img_data in images:
+                if filename.lower().endswith('.pdf'):
+                    # Process PDF to images, classified as pages are decoded
+                    for img_data in extractor.iter_images(data):
                         # Classification
-                        classifier = ImageClassifier()
-                        predicted_class, confidence, is_valid = classifier.predict_from_base64(
-                            img_data["image_base64"]
+                        predicted_class, confidence, is_valid, embedding = classifier.predict_and_embed_from_image(
+                            img_data.get_image()
                         )
                         
                         if is_valid:
                             # Generate metadata
-                            qwen_client = QwenClient()
                             metadata_result = qwen_client.extract_metadata(
                                 img_data["image_base64"], predicted_class
                             )
@@ -124,45 +151,53 @@ def process_custom_references(reference_files):
                             
                             if predicted_class not in temp_metadata:
                                 temp_metadata[predicted_class] = []
+                                temp_embeddings[predicted_class] = []
                             
+                            ext = img_data.get("format", "png")
+                            image_hash = reference_store.put_base64(img_data["image_base64"], ext)
                             temp_metadata[predicted_class].append({
                                 "filename": img_data["filename"],
                                 "metadata": metadata,
                                 "confidence": confidence,
-                                "image_base64": img_data["image_base64"]  # Store base64 for comparison
+                                "image_hash": image_hash,
+                                "file_path": reference_store.path_for(image_hash, ext)  # Image file for comparison
                             })
+                            temp_embeddings[predicted_class].append(embedding)
                 
-                elif file_path.lower().endswith(('.jpg', '.jpeg', '.png')):
+                elif filename.lower().endswith(('.jpg', '.jpeg', '.png')):
                     # Process single image
                     import base64
-                    with open(file_path, 'rb') as f:
-                        img_base64 = base64.b64encode(f.read()).decode()
+                    img_bytes = data
+                    img_base64 = base64.b64encode(img_bytes).decode()
                     
                     # Classification
-                    classifier = ImageClassifier()
-                    predicted_class, confidence, is_valid = classifier.predict_from_base64(img_base64)
+                    predicted_class, confidence, is_valid, embedding = classifier.predict_and_embed_from_base64(img_base64)
                     
                     if is_valid:
                         # Generate metadata
-                        qwen_client = QwenClient()
                         metadata_result = qwen_client.extract_metadata(img_base64, predicted_class)
                         metadata = metadata_result.get("metadata", {}) if metadata_result.get("status") == "success" else {}
                         
                         if predicted_class not in temp_metadata:
                             temp_metadata[predicted_class] = []
+                            temp_embeddings[predicted_class] = []
                         
+                        ext = filename.rsplit('.', 1)[1].lower()
+                        image_hash = reference_store.put(img_bytes, ext)
                         temp_metadata[predicted_class].append({
-                            "filename": os.path.basename(file_path),
+                            "filename": filename,
                             "metadata": metadata,
                             "confidence": confidence,
-                            "image_base64": img_base64  # Store base64 for comparison
+                            "image_hash": image_hash,
+                            "file_path": reference_store.path_for(image_hash, ext)  # Image file for comparison
                         })
+                        temp_embeddings[predicted_class].append(embedding)
                         
             except Exception as e:
-                print(f"Error processing {file_path}: {e}")
+                print(f"Error processing {filename}: {e}")
                 continue
     
-    return temp_metadata
+    return ReferenceSet.from_custom(temp_metadata, temp_embeddings, artifact_store=reference_store)
 
 # Routes
 
@@ -188,9 +223,10 @@ def evaluate():
         use_database = request.form.get('use_database', 'false').lower() == 'true'
         print(f"Use Database: {use_database}")
         
-        # Evaluation Engine Check only for Database Mode
-        if use_database and not evaluation_engine:
-            return jsonify({'error': 'Standard evaluation system not available. Qwen Server not reachable.'}), 503
+        # Custom mode does not need the metadata database
+        unavailable = engine_unavailable(None if use_database else ("classifier", "qwen"))
+        if unavailable:
+            return unavailable
         
         # Check submission file
         if 'submission' not in request.files:
@@ -202,28 +238,28 @@ def evaluate():
         
         print(f"Submission file: {submission_file.filename}")
         
-        # Save submission file
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        submission_path = save_uploaded_file(submission_file, f"submission_{timestamp}")
+        # Read submission into memory (no upload folder, no temp directories)
+        submission_name = secure_filename(submission_file.filename)
+        submission_data = read_uploaded_file(submission_file)
         
-        if not submission_path:
-            return jsonify({'error': 'Error saving submission file'}), 400
+        if submission_data is None:
+            return jsonify({'error': 'Error reading submission file'}), 400
         
-        print(f"Submission saved: {submission_path}")
+        print(f"Submission read: {submission_name} ({len(submission_data)} bytes)")
         
         # Extract PDF (ZIP or direct PDF)
-        pdf_path = None
+        pdf_data = None
         try:
-            if submission_path.lower().endswith('.zip'):
-                # Extract ZIP
-                pdf_path = extract_pdf_from_zip(submission_path)
-                if not pdf_path:
+            if submission_name.lower().endswith('.zip'):
+                # PDF member read from the in-memory ZIP
+                pdf_data = read_pdf_from_zip(submission_data)
+                if not pdf_data:
                     return jsonify({'error': 'No PDF file found in ZIP'}), 400
-                print(f"PDF extracted from ZIP: {pdf_path}")
-            elif submission_path.lower().endswith('.pdf'):
+                print(f"PDF read from ZIP: {submission_name}")
+            elif submission_name.lower().endswith('.pdf'):
                 # Use direct PDF
-                pdf_path = submission_path
-                print(f"Direct PDF used: {pdf_path}")
+                pdf_data = submission_data
+                print(f"Direct PDF used: {submission_name}")
             else:
                 return jsonify({'error': 'Invalid file type. ZIP or PDF expected.'}), 400
                 
@@ -235,11 +271,8 @@ def evaluate():
         
         if use_database:
             print("Standard evaluation with Database")
-            if not evaluation_engine:
-                return jsonify({'error': 'Standard evaluation system not available'}), 503
-            
             try:
-                raw_result = evaluation_engine.evaluate_pdf_submission(pdf_path)
+                raw_result = evaluation_engine.evaluate_pdf_submission(pdf_data, pdf_name=submission_name)
                 print("Standard evaluation completed")
                 
                 # Convert for frontend
@@ -287,43 +320,30 @@ def evaluate():
                 if key.startswith('reference_'):
                     file = request.files[key]
                     if file.filename != '':
-                        ref_path = save_uploaded_file(file, f"reference_{timestamp}")
-                        if ref_path:
-                            reference_files.append(ref_path)
-                            print(f"Reference saved: {file.filename}")
+                        ref_data = read_uploaded_file(file)
+                        if ref_data is not None:
+                            reference_files.append((secure_filename(file.filename), ref_data))
+                            print(f"Reference read: {file.filename}")
             
             if not reference_files:
                 return jsonify({'error': 'No reference files uploaded'}), 400
             
             # Process custom references and get metadata
             print("Processing custom references...")
-            custom_metadata = process_custom_references(reference_files)
-            
-            if not custom_metadata:
-                return jsonify({'error': 'No valid reference files found'}), 400
+            custom_references = process_custom_references(reference_files)
             
-            print(f"Custom references processed: {len(custom_metadata)} categories")
-            
-            # Custom evaluation with processed references
+            # Custom evaluation with processed references (temporary reference files removed in every case)
             try:
-                # Use evaluation_engine but with custom metadata
-                if not evaluation_engine:
-                    return jsonify({'error': 'Evaluation system not available'}), 503
-                
-                # Temporarily override reference metadata
-                original_metadata = evaluation_engine.metadata_db.copy()
-                # Custom metadata format conversion
-                custom_db = {"categories": {}}
-                for category, items in custom_metadata.items():
-                    custom_db["categories"][category] = {"images": items}
+                if not custom_references.categories:
+                    return jsonify({'error': 'No valid reference files found'}), 400
                 
-                evaluation_engine.metadata_db = custom_db
+                print(f"Custom references processed: {len(custom_references.categories)} categories")
                 
+                # Per-request reference set: the shared engine and its database stay untouched
                 # Use custom_mode_only=True to skip categories not in custom reference
-                raw_result = evaluation_engine.evaluate_pdf_submission(pdf_path, custom_mode_only=True)
-                
-                # Restore original metadata
-                evaluation_engine.metadata_db = original_metadata
+                raw_result = evaluation_engine.evaluate_pdf_submission(
+                    pdf_data, custom_mode_only=True, reference_set=custom_references, pdf_name=submission_name
+                )
                 
                 print("Custom evaluation completed")
                 
@@ -341,31 +361,13 @@ def evaluate():
                         "passed": False,
                         "evaluations": []
                     }
-                
-                # Cleanup reference files
-                for ref_file in reference_files:
-                    try:
-                        if os.path.exists(ref_file):
-                            os.remove(ref_file)
-                    except:
-                        pass
                         
             except Exception as e:
                 print(f"Custom evaluation error: {e}")
                 return jsonify({'error': f'Custom evaluation failed: {str(e)}'}), 500
-        
-        # Cleanup temporary files
-        try:
-            if os.path.exists(submission_path):
-                os.remove(submission_path)
-            if pdf_path and os.path.exists(pdf_path):
-                # PDF temp dir cleanup
-                temp_dir = os.path.dirname(pdf_path)
-                if temp_dir and os.path.exists(temp_dir):
-                    shutil.rmtree(temp_dir)
-            print("Cleanup completed")
-        except Exception as e:
-            print(f"Cleanup error: {e}")
+            
+            finally:
+                custom_references.cleanup()
         
         # Save evaluation result to file
         try:
@@ -373,9 +375,7 @@ def evaluate():
             output_file = f"results/evaluation_result_{timestamp}.json"
             os.makedirs(os.path.dirname(output_file), exist_ok=True)
             
-            with open(output_file, 'w', encoding='utf-8') as f:
-                import json
-                json.dump(result, f, indent=2, ensure_ascii=False)
+            write_result_json(result, output_file)
             print(f"Evaluation result saved to: {output_file}")
         except Exception as e:
             print(f"Failed to save result: {e}")
@@ -423,7 +423,9 @@ def health():
         'status': 'OK' if (tunnel_active and qwen_status == "active") else 'SSH_TUNNEL_REQUIRED',
         'ssh_tunnel': 'active' if tunnel_active else 'inactive',
         'qwen_server': qwen_status,
-        'evaluation_engine': 'ready' if evaluation_engine else 'not_initialized',
+        'evaluation_engine': evaluation_engine.readiness()['state'] if evaluation_engine else 'not_initialized',
+        'readiness': evaluation_engine.readiness() if evaluation_engine else None,
+        'models': REGISTRY.memory_report() if EvaluationEngine else [],
         'frontend': 'running',
         'timestamp': datetime.now().isoformat()
     }
@@ -459,7 +461,6 @@ def too_large(e):
 
 if __name__ == '__main__':
     print("AI Doc Checker Server is starting...")
-    print(f"Upload folder: {UPLOAD_FOLDER}")
     print(f"Max file size: {MAX_CONTENT_LENGTH / (1024*1024):.1f}MB")
     print("Frontend available at: http://localhost:5001")
     print("API Health Check: http://localhost:5001/api/health")
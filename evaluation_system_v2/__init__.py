@@ -18,14 +18,40 @@ Usage:
     engine.save_evaluation_result(result)
 """
 
-from .pdf_processor import PDFImageExtractor
-from .image_classifier import ImageClassifier
-from .qwen_client import QwenClient
-from .metadata_generator import MetadataGenerator
-from .evaluation_engine import EvaluationEngine
+import os
+import sys
+import importlib
 
 __version__ = "2.0.0"
 
+# Components are imported on first attribute access (PEP 562), so importing the
+# package does not load torch, torchvision or PyMuPDF up front
+_LAZY_IMPORTS = {
+    "PDFImageExtractor": "pdf_processor",
+    "ImageClassifier": "image_classifier",
+    "QwenClient": "qwen_client",
+    "MetadataGenerator": "metadata_generator",
+    "EvaluationEngine": "evaluation_engine"
+}
+
+# The modules import each other by flat name (as scripts run from this directory and
+# app.py do), so they are loaded under those names from the package directory
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def __getattr__(name):
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    if _PACKAGE_DIR not in sys.path:
+        sys.path.append(_PACKAGE_DIR)
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_IMPORTS))
+
 __all__ = [
     "PDFImageExtractor",
     "ImageClassifier", 
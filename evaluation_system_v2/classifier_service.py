@@ -0,0 +1,383 @@
+import os
+import sys
+import stat
+import time
+import queue
+import secrets
+import threading
+import numpy as np
+from multiprocessing import shared_memory
+from multiprocessing.connection import Client, Listener
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# TCP on localhost works on every platform (AF_UNIX sockets are not available on all Windows builds)
+DEFAULT_ADDRESS = "127.0.0.1:5100"
+
+# Connections exchange pickles, so the authkey must stay private to the user running the service
+DEFAULT_KEY_FILE = os.path.join(os.path.expanduser("~"), ".ai_doc_checker", "classifier_service.key")
+
+def load_authkey(create: bool = False) -> bytes:
+    """
+    Shared secret of service and clients
+
+    CLASSIFIER_SERVICE_KEY wins; otherwise the key is read from CLASSIFIER_SERVICE_KEY_FILE
+    (default ~/.ai_doc_checker/classifier_service.key), which the service creates with a
+    random key and mode 0600 on first start.
+
+    Args:
+        create: Generate the key file if it does not exist (service side)
+
+    Returns:
+        Key bytes
+    """
+    key = os.environ.get("CLASSIFIER_SERVICE_KEY", "").strip()
+    if key:
+        return key.encode("utf-8")
+
+    key_file = os.environ.get("CLASSIFIER_SERVICE_KEY_FILE", DEFAULT_KEY_FILE)
+    if create and not os.path.exists(key_file):
+        os.makedirs(os.path.dirname(os.path.abspath(key_file)), mode=0o700, exist_ok=True)
+        try:
+            fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(secrets.token_hex(32))
+            print(f"🔑 Created classifier service key {key_file}")
+        except FileExistsError:
+            pass  # created concurrently by another service process
+
+    if not os.path.exists(key_file):
+        raise PermissionError(f"No classifier service key: set CLASSIFIER_SERVICE_KEY or start "
+                              f"classifier_service.py once to create {key_file}")
+
+    if os.name == "posix" and os.stat(key_file).st_mode & (stat.S_IRWXG | stat.S_IRWXO):
+        raise PermissionError(f"Classifier service key {key_file} is accessible by other users (chmod 600)")
+
+    with open(key_file, "r", encoding="utf-8") as f:
+        key = f.read().strip()
+    if not key:
+        raise PermissionError(f"Classifier service key {key_file} is empty")
+    return key.encode("utf-8")
+
+def parse_address(address: Union[str, Tuple[str, int]]) -> Tuple[str, int]:
+    """'host:port' -> (host, port)"""
+    if isinstance(address, tuple):
+        return address
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+def attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    Open a block created by another process without taking ownership
+
+    Before Python 3.13 every attach registers the block with the resource tracker,
+    which would unlink it when this process exits although the client still uses it.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        block = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(block._name, "shared_memory")
+        return block
+
+class _Request:
+    """Images of one client call waiting for the batcher"""
+
+    def __init__(self, images: np.ndarray):
+        self.images = images
+        self.probs = None
+        self.embeddings = None
+        self.error = None
+        self.done = threading.Event()
+
+class ClassifierService:
+    """Classifier daemon: owns one model and serves local clients, merging their requests into micro-batches"""
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, max_batch: int = 32, max_wait_ms: float = 5.0,
+                 authkey: Optional[bytes] = None, **classifier_config):
+        """
+        Initialize service (the model is loaded here)
+
+        Args:
+            address: 'host:port' to listen on
+            max_batch: Images per forward pass
+            max_wait_ms: How long the first queued request waits for others to join its batch
+            authkey: Shared secret clients must present (default: load_authkey(create=True))
+            **classifier_config: ImageClassifier arguments (model_path, backend, quantized, ...)
+        """
+        from model_registry import get_classifier
+
+        self.address = parse_address(address)
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.authkey = authkey or load_authkey(create=True)
+
+        # service=None also keeps CLASSIFIER_SERVICE from turning the daemon into its own client
+        classifier_config["service"] = None
+        classifier_config["fast_preprocess"] = True
+        self.classifier = get_classifier(**classifier_config)
+
+        self._queue = queue.Queue()
+        self.stats = {"requests": 0, "images": 0, "batches": 0, "clients": 0}
+
+    def info(self) -> Dict[str, Any]:
+        """Model description sent to clients on connect"""
+        return {
+            "status": "success",
+            "class_names": self.classifier.class_names,
+            "input_size": self.classifier.input_size,
+            "backend": self.classifier.backend,
+            "quantized": self.classifier.quantized,
+            "model_path": self.classifier.model_path,
+            "max_batch": self.max_batch,
+            "stats": dict(self.stats)
+        }
+
+    def serve_forever(self):
+        """Accept clients until interrupted"""
+        self.classifier.warm_up(self.max_batch)
+        threading.Thread(target=self._batch_loop, daemon=True).start()
+
+        with Listener(self.address, authkey=self.authkey) as listener:
+            print(f"🚀 Classifier service listening on {self.address[0]}:{self.address[1]} "
+                  f"(max batch {self.max_batch}, max wait {self.max_wait * 1000:.0f} ms)")
+            while True:
+                try:
+                    connection = listener.accept()
+                except KeyboardInterrupt:
+                    break
+                except Exception as e:
+                    print(f"❌ Rejected client: {e}")
+                    continue
+                self.stats["clients"] += 1
+                threading.Thread(target=self._serve_client, args=(connection,), daemon=True).start()
+
+    def _serve_client(self, connection):
+        """Handle the calls of one client connection (one call at a time)"""
+        block = None
+        try:
+            while True:
+                try:
+                    message = connection.recv()
+                except (EOFError, OSError):
+                    break
+
+                op = message.get("op")
+                if op == "info":
+                    connection.send(self.info())
+                    continue
+                if op != "predict":
+                    connection.send({"status": "error", "error": f"Unknown operation: {op}"})
+                    continue
+
+                try:
+                    # Clients grow their block by replacing it
+                    if block is None or block.name != message["shm"]:
+                        if block is not None:
+                            block.close()
+                        block = attach_shared_memory(message["shm"])
+
+                    width, height = self.classifier.input_size
+                    images = np.ndarray((message["count"], height, width, 3), dtype=np.uint8, buffer=block.buf)
+                    request = _Request(images)
+                    self._queue.put(request)
+                    request.done.wait()
+                    del images
+                    request.images = None
+                except Exception as e:
+                    connection.send({"status": "error", "error": str(e)})
+                    continue
+
+                if request.error is not None:
+                    connection.send({"status": "error", "error": request.error})
+                    continue
+
+                reply = {"status": "success", "probs": request.probs}
+                if message.get("embeddings"):
+                    reply["embeddings"] = request.embeddings
+                connection.send(reply)
+        finally:
+            if block is not None:
+                block.close()
+            connection.close()
+
+    def _batch_loop(self):
+        """Collect queued requests into batches of up to max_batch images and run them"""
+        from preprocessing import BatchNormalizer
+
+        normalizer = BatchNormalizer(self.max_batch, self.classifier.input_size)
+        while True:
+            requests = [self._queue.get()]
+            count = len(requests[0].images)
+            deadline = time.monotonic() + self.max_wait
+
+            while count < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                requests.append(request)
+                count += len(request.images)
+
+            self._run(requests, normalizer)
+
+    def _run(self, requests: List[_Request], normalizer):
+        """Forward passes over the merged images; results are split back per request"""
+        images = [image for request in requests for image in request.images]
+        try:
+            probs, embeddings = [], []
+            for start in range(0, len(images), self.max_batch):
+                chunk_probs, chunk_embeddings = self.classifier._infer(images[start:start + self.max_batch], normalizer)
+                probs.append(chunk_probs)
+                embeddings.append(chunk_embeddings.astype(np.float32))
+            probs = np.concatenate(probs)
+            embeddings = np.concatenate(embeddings)
+
+            offset = 0
+            for request in requests:
+                count = len(request.images)
+                request.probs = probs[offset:offset + count]
+                request.embeddings = embeddings[offset:offset + count]
+                offset += count
+        except Exception as e:
+            for request in requests:
+                request.error = f"Service inference failed: {str(e)}"
+        finally:
+            self.stats["requests"] += len(requests)
+            self.stats["images"] += len(images)
+            self.stats["batches"] += 1
+
+            # No views into the clients' blocks may outlive the call (they close them on resize)
+            images.clear()
+            for request in requests:
+                request.done.set()
+
+class ClassifierServiceClient:
+    """Connection to a ClassifierService; images are passed through a reusable shared memory block"""
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, authkey: Optional[bytes] = None):
+        """
+        Initialize client (connects on first use)
+
+        Args:
+            address: 'host:port' of the service
+            authkey: Shared secret of the service (default: load_authkey())
+        """
+        self.address = parse_address(address)
+        self.authkey = authkey or load_authkey()
+        self._connection = None
+        self._block = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = Client(self.address, authkey=self.authkey)
+        return self._connection
+
+    def _call(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one message and wait for the reply (reconnects once if the service restarted)"""
+        for attempt in range(2):
+            try:
+                connection = self._connect()
+                connection.send(message)
+                reply = connection.recv()
+                break
+            except (EOFError, OSError):
+                self._disconnect()
+                if attempt:
+                    raise ConnectionError(f"Classifier service at {self.address[0]}:{self.address[1]} not reachable")
+
+        if reply.get("status") != "success":
+            raise Exception(reply.get("error", "Classifier service error"))
+        return reply
+
+    def info(self) -> Dict[str, Any]:
+        """Model description and counters of the service"""
+        with self._lock:
+            return self._call({"op": "info"})
+
+    def infer(self, arrays: List[np.ndarray], return_embeddings: bool = True) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Classify resized images
+
+        Args:
+            arrays: uint8 arrays [height, width, 3] of the service input size (preprocessing.resize_for_model)
+            return_embeddings: Also return penultimate-layer embeddings
+
+        Returns:
+            Tuple of (class probabilities [N, classes], embeddings [N, features] or None)
+        """
+        with self._lock:
+            needed = sum(array.nbytes for array in arrays)
+            if self._block is None or self._block.size < needed:
+                size = max(needed, 2 * self._block.size if self._block is not None else needed)
+                self._release_block()
+                self._block = shared_memory.SharedMemory(create=True, size=size)
+
+            view = np.ndarray((len(arrays),) + arrays[0].shape, dtype=np.uint8, buffer=self._block.buf)
+            for row, array in enumerate(arrays):
+                view[row] = array
+            del view
+
+            reply = self._call({
+                "op": "predict",
+                "shm": self._block.name,
+                "count": len(arrays),
+                "embeddings": return_embeddings
+            })
+            return reply["probs"], reply.get("embeddings")
+
+    def _disconnect(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except OSError:
+                pass
+            self._connection = None
+
+    def _release_block(self):
+        if self._block is not None:
+            self._block.close()
+            self._block.unlink()
+            self._block = None
+
+    def close(self):
+        """Close the connection and free the shared memory block"""
+        with self._lock:
+            self._disconnect()
+            self._release_block()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+# Command line interface: run the daemon
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Classifier service shared by local processes")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help="host:port to listen on")
+    parser.add_argument("--model-path", default="./model/efficientnet_b0_best.pth")
+    parser.add_argument("--backend", default="torch", choices=("torch", "onnx", "torchscript"))
+    parser.add_argument("--quantized", action="store_true", help="Serve the INT8 model (onnx backend)")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--threads", type=int, default=None, help="Intra-op threads of the CPU backends")
+    args = parser.parse_args()
+
+    try:
+        service = ClassifierService(
+            args.address, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms,
+            model_path=args.model_path, backend=args.backend, quantized=args.quantized,
+            num_threads=args.threads
+        )
+        service.serve_forever()
+    except Exception as e:
+        print(f"❌ {e}")
+        sys.exit(1)
@@ -0,0 +1,175 @@
+import os
+import json
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+class EmbeddingIndex:
+    """Per-category matrix of reference image embeddings for cosine top-k search"""
+
+    def __init__(self, embeddings: Dict[str, np.ndarray] = None):
+        """
+        Initialize embedding index
+
+        Args:
+            embeddings: Mapping category -> (n_images, dim) embedding matrix.
+                        Row i belongs to images[i] of that category in the metadata database.
+        """
+        self.matrices = {}
+        for category, matrix in (embeddings or {}).items():
+            self.matrices[category] = self._normalize(np.asarray(matrix, dtype=np.float32))
+
+        # Categories whose stored rows no longer line up with the database (set by load)
+        self.stale_categories = []
+
+    @staticmethod
+    def get_index_dir(metadata_db_path: str) -> str:
+        """
+        Get directory holding the .npy matrices for a metadata database
+
+        metadata_database.json -> metadata_database_embeddings/
+        """
+        base, _ = os.path.splitext(metadata_db_path)
+        return f"{base}_embeddings"
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        """L2-normalize rows so that dot products are cosine similarities"""
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    @staticmethod
+    def manifest_matches(entry: Dict[str, Any], images: List[Dict[str, Any]]) -> bool:
+        """
+        Whether the rows of a stored category matrix belong to the given database images
+
+        Rows are matched by filename and, where the manifest and database record them,
+        by content hash (a reference replaced under the same filename is detected).
+        """
+        if entry.get("filenames") != [img.get("filename") for img in images]:
+            return False
+        content_hashes = entry.get("content_hashes")
+        if content_hashes is None:
+            return True
+        return all(stored is None or img.get("content_sha256") in (None, stored)
+                   for stored, img in zip(content_hashes, images))
+
+    @classmethod
+    def load(cls, metadata_db_path: str, database: Optional[Dict[str, Any]] = None) -> "EmbeddingIndex":
+        """
+        Load embedding matrices stored next to a metadata database
+
+        Args:
+            metadata_db_path: Path to metadata database JSON
+            database: Loaded database; categories whose stored rows do not match its
+                      images are skipped and listed in stale_categories
+
+        Returns:
+            EmbeddingIndex (empty if no index exists)
+        """
+        index_dir = cls.get_index_dir(metadata_db_path)
+        manifest_path = os.path.join(index_dir, "index.json")
+
+        if not os.path.exists(manifest_path):
+            return cls()
+
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        embeddings = {}
+        stale = []
+        for category, entry in manifest.get("categories", {}).items():
+            matrix_path = os.path.join(index_dir, entry["file"])
+            if not os.path.exists(matrix_path):
+                continue
+            if database is not None:
+                images = database.get("categories", {}).get(category, {}).get("images", [])
+                if not cls.manifest_matches(entry, images):
+                    stale.append(category)
+                    continue
+            embeddings[category] = np.load(matrix_path)
+
+        index = cls(embeddings)
+        index.stale_categories = stale
+        return index
+
+    @classmethod
+    def save(cls, metadata_db_path: str, embeddings: Dict[str, np.ndarray], filenames: Dict[str, List[str]],
+             content_hashes: Optional[Dict[str, List[Optional[str]]]] = None) -> str:
+        """
+        Save one .npy matrix per category next to the metadata database
+
+        Matrices of categories that are no longer part of the index are deleted.
+
+        Args:
+            metadata_db_path: Path to metadata database JSON
+            embeddings: Mapping category -> (n_images, dim) matrix
+            filenames: Mapping category -> reference filenames in row order
+            content_hashes: Mapping category -> content SHA-256 of the references in row order
+
+        Returns:
+            Path to index directory
+        """
+        index_dir = cls.get_index_dir(metadata_db_path)
+        os.makedirs(index_dir, exist_ok=True)
+
+        manifest = {"categories": {}}
+        for category, matrix in embeddings.items():
+            matrix_file = f"{category}.npy"
+            np.save(os.path.join(index_dir, matrix_file), np.asarray(matrix, dtype=np.float32))
+            manifest["categories"][category] = {
+                "file": matrix_file,
+                "count": int(len(matrix)),
+                "filenames": filenames.get(category, []),
+                "content_hashes": (content_hashes or {}).get(category)
+            }
+
+        with open(os.path.join(index_dir, "index.json"), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+        referenced = {entry["file"] for entry in manifest["categories"].values()}
+        for name in os.listdir(index_dir):
+            if name.endswith(".npy") and name not in referenced:
+                os.remove(os.path.join(index_dir, name))
+
+        return index_dir
+
+    def has_category(self, category: str, expected_count: int = None) -> bool:
+        """
+        Check whether a usable matrix exists for a category
+
+        Args:
+            category: Category name
+            expected_count: Number of reference images the rows must line up with
+        """
+        matrix = self.matrices.get(category)
+        if matrix is None or len(matrix) == 0:
+            return False
+        return expected_count is None or len(matrix) == expected_count
+
+    def top_k(self, embedding: np.ndarray, category: str, top_k: int = 3) -> List[Tuple[int, float]]:
+        """
+        Cosine top-k search within a category
+
+        Args:
+            embedding: Query embedding (unnormalized)
+            category: Category to search
+            top_k: Number of results
+
+        Returns:
+            List of (row_index, cosine_similarity), best first
+        """
+        matrix = self.matrices.get(category)
+        if matrix is None or len(matrix) == 0:
+            return []
+
+        query = self._normalize(np.asarray(embedding, dtype=np.float32))[0]
+        similarities = matrix @ query
+
+        top_k = min(top_k, len(similarities))
+        candidates = np.argpartition(-similarities, top_k - 1)[:top_k]
+        candidates = candidates[np.argsort(-similarities[candidates])]
+
+        return [(int(i), float(similarities[i])) for i in candidates]
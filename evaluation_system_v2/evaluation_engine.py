@@ -1,41 +1,228 @@
 import os
-import json
 import base64
+import io
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 import tempfile
 import shutil
+import threading
+import time
+from PIL import Image
 
-from pdf_processor import PDFImageExtractor
-from image_classifier import ImageClassifier
-from qwen_client import QwenClient
+from pdf_processor import PDFImageExtractor, ExtractedImage, PDFSource
+from model_registry import get_qwen_client, warm_up_classifier
 from metadata_generator import MetadataGenerator
+from reference_set import ReferenceSet, metadata_similarity
+from result_store import ArtifactStore, format_result_summary, hash_image_bytes, slim_image_entry, write_result_json
+from image_hash_index import ImageHashIndex, compute_dhash, is_exact_copy
+from image_filters import AutoCropper
+from extraction_cache import ExtractionCache
 
 class EvaluationEngine:
     """Main evaluation engine for student submissions"""
     
-    def __init__(self, metadata_db_path: str = "metadata_database.json"):
+    REFERENCE_SELECTION_MODES = ("metadata", "embedding", "hybrid")
+    
+    # Loaded by warm_up(), in this order (a missing database is generated with Qwen)
+    COMPONENTS = ("classifier", "qwen", "reference_set")
+    
+    def __init__(self, metadata_db_path: str = "metadata_database.json",
+                 reference_selection: str = "metadata", embedding_shortlist: int = 10,
+                 dedup_index_path: Optional[str] = None, dedup_max_distance: int = 4, dedup_max_entries: int = 5000,
+                 artifact_dir: Optional[str] = None, auto_crop: bool = True, remove_ui_chrome: bool = False,
+                 extraction_cache_dir: Optional[str] = None, text_metadata_min_chars: int = 0,
+                 background_warmup: bool = False, warmup_retry_delay: float = 2.0,
+                 warmup_max_retry_delay: float = 30.0):
         """
         Initialize evaluation engine
         
         Args:
             metadata_db_path: Path to metadata database file
+            reference_selection: How references are selected:
+                "metadata"  - Qwen metadata extraction + key matching (default)
+                "embedding" - EfficientNet embedding cosine search only (no metadata VLM call)
+                "hybrid"    - embedding shortlist, re-ranked by metadata similarity
+            embedding_shortlist: Shortlist size for hybrid selection
+            dedup_index_path: Persistent perceptual-hash index of graded images (None disables reuse)
+            dedup_max_distance: Maximum dHash Hamming distance for reusing classification and
+                                evaluability; evaluations are only reused for exact copies
+            dedup_max_entries: Size limit of the index (least recently seen images are evicted)
+            artifact_dir: Side-car store for extracted image pixels (results only carry image hashes)
+            auto_crop: Trim uniform borders of valid images before VLM calls
+            remove_ui_chrome: Also cut title bars / toolbars / taskbars (heuristic)
+            extraction_cache_dir: Cache of extracted images keyed by PDF hash (re-grading skips extraction)
+            text_metadata_min_chars: Images with at least this much surrounding PDF text that also
+                                     mentions reference terms (ReferenceSet.prefilter_by_text) get
+                                     their metadata from a text-only query instead of a vision call
+                                     (0, the default, always uses the vision call)
+            background_warmup: Return immediately and load classifier, Qwen connection and reference
+                               set in a background thread, retrying until all are available
+                               (see readiness() / wait_until_ready()); otherwise warm_up() runs here
+                               and raises if a component is unavailable
+            warmup_retry_delay: First delay between background warm-up attempts (doubled per attempt)
+            warmup_max_retry_delay: Upper bound of the retry delay
         """
+        if reference_selection not in self.REFERENCE_SELECTION_MODES:
+            raise ValueError(f"Unknown reference selection mode: {reference_selection}")
+        
         self.metadata_db_path = metadata_db_path
-        self.pdf_extractor = PDFImageExtractor()
-        self.classifier = ImageClassifier()
+        self.reference_selection = reference_selection
+        self.embedding_shortlist = embedding_shortlist
+        self.artifact_store = ArtifactStore(artifact_dir) if artifact_dir else None
+        self.pdf_extractor = PDFImageExtractor(
+            cache=ExtractionCache(extraction_cache_dir) if extraction_cache_dir else None
+        )
+        self.cropper = AutoCropper(remove_chrome=remove_ui_chrome) if auto_crop else None
+        self.text_metadata_min_chars = text_metadata_min_chars
+        
+        # Perceptual-hash index of previously graded images
+        self.hash_index = None
+        if dedup_index_path:
+            self.hash_index = ImageHashIndex(dedup_index_path, max_distance=dedup_max_distance,
+                                             max_entries=dedup_max_entries)
+            print(f"Image hash index loaded: {len(self.hash_index.entries)} images")
+        
+        # Set by warm_up(): shared classifier, Qwen client (REQUIRED) and the default
+        # reference set (metadata database, shared read-only by all requests)
+        self.classifier = None
+        self.qwen_client = None
+        self.reference_set = None
+        
+        self.warmup_retry_delay = warmup_retry_delay
+        self.warmup_max_retry_delay = warmup_max_retry_delay
+        self._ready = {name: threading.Event() for name in self.COMPONENTS}
+        self._warmup_lock = threading.Lock()
+        self._warmup_wake = threading.Event()
+        self._warmup_thread = None
+        self._created_at = time.time()
+        self.warmup_status = {"state": "starting", "attempts": 0, "errors": {}, "ready_seconds": None}
+        
+        if background_warmup:
+            self.start_background_warmup()
+            print("Evaluation Engine created (warming up in the background)")
+        else:
+            self.warm_up()
+            print("Evaluation Engine initialized")
+    
+    def warm_up(self):
+        """
+        Load the components that are not ready yet (classifier, Qwen connection, reference set)
         
-        # Ensure SSH tunnel for Qwen connection
-        self._ensure_ssh_tunnel()
+        Components that load successfully stay ready, so a retry only repeats the failed ones.
         
-        # Initialize Qwen client - REQUIRED
-        self.qwen_client = QwenClient()
+        Raises:
+            Exception: Naming every component that is still unavailable
+        """
+        with self._warmup_lock:
+            self.warmup_status["attempts"] += 1
+            errors = {}
+            
+            for name in self.COMPONENTS:
+                if self._ready[name].is_set():
+                    continue
+                try:
+                    getattr(self, f"_warm_up_{name}")()
+                    self._ready[name].set()
+                except Exception as e:
+                    errors[name] = str(e)
+            
+            self.warmup_status["errors"] = errors
+            if errors:
+                self.warmup_status["state"] = "warming_up"
+                raise Exception("; ".join(f"{name}: {error}" for name, error in errors.items()))
+            
+            if self.warmup_status["state"] != "ready":
+                self.warmup_status["state"] = "ready"
+                self.warmup_status["ready_seconds"] = round(time.time() - self._created_at, 2)
+    
+    def _warm_up_classifier(self):
+        """Load the shared classifier and run one forward pass (first request pays no lazy allocations)"""
+        self.classifier = warm_up_classifier()
+    
+    def _warm_up_qwen(self):
+        """Check the SSH tunnel and the Qwen server health"""
+        self._ensure_ssh_tunnel()
+        self.qwen_client = get_qwen_client()
         self._check_qwen_connection()
+    
+    def _warm_up_reference_set(self):
+        """Load (or generate) the metadata database"""
+        self.reference_set = self._load_reference_set()
+    
+    def start_background_warmup(self) -> threading.Thread:
+        """
+        Run warm_up() in a daemon thread until every component is ready
         
-        # Load metadata database
-        self.metadata_db = self._load_metadata_database()
+        Failed attempts are retried with exponential backoff (warmup_retry_delay up to
+        warmup_max_retry_delay); wait_until_ready() cuts the current delay short.
         
-        print("Evaluation Engine initialized")
+        Returns:
+            The warm-up thread (the running one if already started)
+        """
+        def run():
+            delay = self.warmup_retry_delay
+            while True:
+                try:
+                    self.warm_up()
+                    print(f"✅ Evaluation Engine ready after {self.warmup_status['ready_seconds']}s")
+                    return
+                except Exception as e:
+                    print(f"⚠️ Evaluation Engine warm-up attempt {self.warmup_status['attempts']} failed, "
+                          f"retrying in {delay:.1f}s: {e}")
+                
+                self._warmup_wake.wait(delay)
+                self._warmup_wake.clear()
+                delay = min(delay * 2, self.warmup_max_retry_delay)
+        
+        if self._warmup_thread is None or not self._warmup_thread.is_alive():
+            self._warmup_thread = threading.Thread(target=run, name="engine-warmup", daemon=True)
+            self._warmup_thread.start()
+        return self._warmup_thread
+    
+    def is_ready(self, components: Optional[Tuple[str, ...]] = None) -> bool:
+        """Whether the given components (default: all) are loaded"""
+        return all(self._ready[name].is_set() for name in (components or self.COMPONENTS))
+    
+    def wait_until_ready(self, timeout: Optional[float] = None, components: Optional[Tuple[str, ...]] = None) -> bool:
+        """
+        Block until components are ready
+        
+        A waiting caller triggers the next background attempt right away instead of
+        after the current backoff delay.
+        
+        Args:
+            timeout: Seconds to wait at most (None waits indefinitely)
+            components: Components needed (default: all)
+            
+        Returns:
+            True if ready, False on timeout
+        """
+        if self.is_ready(components):
+            return True
+        
+        self._warmup_wake.set()
+        deadline = None if timeout is None else time.time() + timeout
+        for name in components or self.COMPONENTS:
+            remaining = None if deadline is None else max(0.0, deadline - time.time())
+            if not self._ready[name].wait(remaining):
+                return False
+        return True
+    
+    def readiness(self) -> Dict[str, Any]:
+        """
+        Startup state for health checks
+        
+        Returns:
+            Dictionary with state ("starting", "warming_up", "ready"), ready flag per
+            component, attempts, errors of the last attempt and seconds until ready
+        """
+        return {
+            "state": self.warmup_status["state"],
+            "components": {name: event.is_set() for name, event in self._ready.items()},
+            "attempts": self.warmup_status["attempts"],
+            "errors": dict(self.warmup_status["errors"]),
+            "ready_seconds": self.warmup_status["ready_seconds"]
+        }
     
     def _ensure_ssh_tunnel(self):
         """Ensure SSH tunnel to Qwen server is established"""
@@ -79,8 +266,8 @@ class EvaluationEngine:
         except Exception as e:
             raise Exception(f"Qwen server is not available or model not loaded: {str(e)}")
     
-    def _load_metadata_database(self) -> Dict[str, Any]:
-        """Load metadata database for reference solutions"""
+    def _load_reference_set(self) -> ReferenceSet:
+        """Load metadata database and embedding index as the default reference set"""
         print(f"Loading metadata database from: {self.metadata_db_path}")
         
         if not os.path.exists(self.metadata_db_path):
@@ -88,61 +275,177 @@ class EvaluationEngine:
             generator = MetadataGenerator(output_path=self.metadata_db_path)
             generator.save_database()
         
-        with open(self.metadata_db_path, 'r', encoding='utf-8') as f:
-            db = json.load(f)
+        reference_set = ReferenceSet.from_database(self.metadata_db_path)
+        
+        # Rows of a stored index are only used while they belong to the database's images
+        stale = reference_set.embedding_index.stale_categories
+        if stale and self.reference_selection != "metadata":
+            print(f"Embedding index out of date for {', '.join(stale)}, rebuilding...")
+            generator = MetadataGenerator(output_path=self.metadata_db_path)
+            generator.save_embedding_index(reference_set.database)
+            reference_set = ReferenceSet.from_database(self.metadata_db_path)
+        elif stale:
+            print(f"Embedding index out of date for {', '.join(stale)} (rebuild: python metadata_generator.py embeddings)")
         
         # Debug: Print loaded database structure
         print(f"Metadata database loaded:")
-        print(f"   Total categories: {len(db.get('categories', {}))}")
-        for cat_name, cat_data in db.get('categories', {}).items():
-            images_count = len(cat_data.get('images', []))
-            print(f"   - {cat_name}: {images_count} images")
+        print(f"   Total categories: {len(reference_set.categories)}")
+        for cat_name in reference_set.categories:
+            print(f"   - {cat_name}: {len(reference_set.get_references(cat_name))} images")
+        
+        if reference_set.embedding_index.matrices:
+            print(f"Embedding index loaded: {len(reference_set.embedding_index.matrices)} categories")
+        elif self.reference_selection != "metadata":
+            print("Embedding index not found, falling back to metadata reference selection")
+            print("   Build it with: python metadata_generator.py embeddings")
         
-        return db
+        return reference_set
     
-    def _find_best_reference_match(self, student_metadata: Dict[str, Any], category: str) -> Optional[Dict[str, Any]]:
+    @property
+    def metadata_db(self) -> Dict[str, Any]:
+        """Metadata database of the default reference set"""
+        return self.reference_set.database
+    
+    def _find_top_reference_matches_by_embedding(self, student_embedding, category: str, top_k: int = 3,
+                                                 reference_set: Optional[ReferenceSet] = None) -> List[Dict[str, Any]]:
         """
-        Find best matching reference solution based on metadata similarity
+        Find top K references by cosine similarity of EfficientNet embeddings
         
         Args:
-            student_metadata: Extracted metadata from student image
+            student_embedding: Embedding of student image
             category: Image category
+            top_k: Number of top matches to return
+            reference_set: References to search (default: metadata database)
             
         Returns:
-            Best matching reference metadata or None
+            List of top matching references (sorted by similarity), empty if no index for category
         """
-        print(f"Looking for references in category: '{category}'")
-        print(f"   Available categories: {list(self.metadata_db.get('categories', {}).keys())}")
+        reference_set = reference_set or self.reference_set
         
-        if category not in self.metadata_db.get("categories", {}):
-            print(f"Category '{category}' not found in database")
-            return None
+        if not reference_set.has_embeddings(category):
+            print(f"No embedding index for category '{category}'")
+            return []
         
-        reference_images = self.metadata_db["categories"][category].get("images", [])
-        print(f"   Found {len(reference_images)} reference images for '{category}'")
+        references = reference_set.get_references(category)
+        return [references[row] for row in reference_set.top_by_embedding(student_embedding, category, top_k=top_k)]
+    
+    def _reference_key(self, reference_set: ReferenceSet) -> str:
+        """Key identifying the references and selection mode an evaluation was made against"""
+        return f"{reference_set.key}:{self.reference_selection}"
+    
+    @staticmethod
+    def _get_image(img_data: Dict[str, Any]) -> Image.Image:
+        """Decoded pixels of an extracted image (no PNG round trip for ExtractedImage entries)"""
+        if isinstance(img_data, ExtractedImage):
+            return img_data.get_image()
+        return Image.open(io.BytesIO(base64.b64decode(img_data["image_base64"])))
+    
+    @staticmethod
+    def _get_encoded_bytes(img_data: Dict[str, Any]) -> bytes:
+        """Compressed image bytes of an extracted image (format given by img_data["format"], encoded once)"""
+        if isinstance(img_data, ExtractedImage):
+            return img_data.encode()
+        return base64.b64decode(img_data["image_base64"])
+    
+    def _register_image(self, img_data: Dict[str, Any]):
+        """
+        Give an extracted image a content hash and store its bytes in the artifact store
         
-        if not reference_images:
-            print(f"No reference images found for category '{category}'")
+        Results reference images by "image_hash" only; base64 payloads never reach the result.
+        The image is encoded at most once (ExtractedImage keeps the bytes for later stages).
+        """
+        try:
+            encoded = None
+            if "image_hash" not in img_data:
+                encoded = self._get_encoded_bytes(img_data)
+                img_data["image_hash"] = hash_image_bytes(encoded)
+            ext = img_data.get("format", "png")
+            if self.artifact_store and not self.artifact_store.exists(img_data["image_hash"], ext):
+                if encoded is None:
+                    encoded = self._get_encoded_bytes(img_data)
+                self.artifact_store.put(encoded, ext, image_hash=img_data["image_hash"])
+        except Exception as e:
+            print(f"  ⚠️ Could not register {img_data['filename']}: {str(e)}")
+    
+    def _auto_crop(self, img_data: ExtractedImage):
+        """Crop an image to its content box (original stays registered under its image_hash)"""
+        try:
+            box = self.cropper.find_crop_box(img_data.get_image())
+        except Exception as e:
+            print(f"  ⚠️ Auto-crop failed for {img_data['filename']}: {str(e)}")
+            return
+        
+        if box and img_data.crop(box):
+            print(f"  ✂️ {img_data['filename']}: cropped {img_data['width']}x{img_data['height']} -> "
+                  f"{img_data['cropped_size'][0]}x{img_data['cropped_size'][1]}")
+    
+    def _match_hash_index(self, img_data: Dict[str, Any], pdf_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up an extracted image in the perceptual-hash index
+        
+        Near-duplicates of previously graded images get a "reused_from" flag; new images are registered.
+        
+        Returns:
+            Index entry (None without index or if hashing failed)
+        """
+        if not self.hash_index:
+            return None
+        
+        try:
+            image_hash = compute_dhash(self._get_image(img_data))
+        except Exception as e:
+            print(f"  ⚠️ Hashing failed for {img_data['filename']}: {str(e)}")
             return None
         
-        # Simple matching based on structural similarity
-        # This can be enhanced with more sophisticated algorithms
-        best_match = None
-        best_score = 0
+        img_data["image_phash"] = f"{image_hash:016x}"
+        entry, distance = self.hash_index.find(image_hash)
+        
+        if entry is not None:
+            self.hash_index.record_occurrence(entry, pdf_path, img_data["filename"], distance)
+            img_data["reused_from"] = {
+                "pdf_path": entry["pdf_path"],
+                "filename": entry["filename"],
+                "hash_distance": distance,
+                # Only byte-identical copies may take over another submission's grade
+                "exact": is_exact_copy(entry, img_data.get("image_hash"))
+            }
+            kind = "exact copy" if img_data["reused_from"]["exact"] else "near-duplicate"
+            print(f"  ♻️ {img_data['filename']}: {kind} of {entry['filename']} in {entry['pdf_path']} (distance {distance})")
+        else:
+            entry = self.hash_index.add(image_hash, pdf_path, img_data["filename"], img_data.get("image_hash"))
+        
+        return entry
+    
+    def get_near_duplicate_report(self) -> List[Dict[str, Any]]:
+        """
+        Images that appeared in more than one graded submission
         
-        for ref_image in reference_images:
-            ref_metadata = ref_image.get("metadata", {})
-            
-            # Calculate similarity score (simplified)
-            score = self._calculate_metadata_similarity(student_metadata, ref_metadata)
-            
-            if score > best_score:
-                best_score = score
-                best_match = ref_image
+        Returns:
+            List of duplicate groups (empty if deduplication is disabled)
+        """
+        if not self.hash_index:
+            return []
+        return self.hash_index.near_duplicate_report()
+    
+    def _find_best_reference_match(self, student_metadata: Dict[str, Any], category: str,
+                                   reference_set: Optional[ReferenceSet] = None) -> Optional[Dict[str, Any]]:
+        """
+        Find best matching reference solution based on metadata similarity
         
-        return best_match
+        Args:
+            student_metadata: Extracted metadata from student image
+            category: Image category
+            reference_set: References to search (default: metadata database)
+            
+        Returns:
+            Best matching reference metadata or None
+        """
+        matches = self._find_top_reference_matches(student_metadata, category, top_k=1, reference_set=reference_set)
+        return matches[0] if matches else None
     
-    def _find_top_reference_matches(self, student_metadata: Dict[str, Any], category: str, top_k: int = 3) -> List[Dict[str, Any]]:
+    def _find_top_reference_matches(self, student_metadata: Dict[str, Any], category: str, top_k: int = 3,
+                                    reference_set: Optional[ReferenceSet] = None,
+                                    candidates: Optional[List[int]] = None) -> List[Dict[str, Any]]:
         """
         Find top K matching reference solutions for hybrid evaluation
         
@@ -150,39 +453,62 @@ class EvaluationEngine:
             student_metadata: Extracted metadata from student image
             category: Image category
             top_k: Number of top matches to return
+            reference_set: References to search (default: metadata database)
+            candidates: Restrict the search to these reference rows (text pre-filter)
             
         Returns:
             List of top matching references (sorted by similarity)
         """
+        reference_set = reference_set or self.reference_set
+        
         print(f"Finding top {top_k} references for category: '{category}'")
-        print(f"   Available categories: {list(self.metadata_db.get('categories', {}).keys())}")
+        print(f"   Available categories: {list(reference_set.categories.keys())}")
         
-        if category not in self.metadata_db.get("categories", {}):
+        if category not in reference_set.categories:
             print(f"Category '{category}' not found in database")
             return []
         
-        reference_images = self.metadata_db["categories"][category].get("images", [])
+        reference_images = reference_set.get_references(category)
         print(f"   Found {len(reference_images)} reference images for '{category}'")
         
         if not reference_images:
             print(f"No reference images found for category '{category}'")
             return []
         
-        # Calculate similarity scores for all references
-        scored_references = []
-        
-        for ref_image in reference_images:
-            ref_metadata = ref_image.get("metadata", {})
-            score = self._calculate_metadata_similarity(student_metadata, ref_metadata)
-            scored_references.append((score, ref_image))
-        
-        # Sort by score (descending) and take top K
-        scored_references.sort(key=lambda x: x[0], reverse=True)
+        if candidates:
+            print(f"   Text pre-filter: {len(candidates)} candidate references")
+            ranked = reference_set.rerank_by_metadata(student_metadata, category, candidates)
+            return [reference_images[i] for i in ranked[:top_k]]
         
-        # Return top K references
-        top_references = [ref for score, ref in scored_references[:top_k]]
+        return reference_set.top_by_metadata(student_metadata, category, top_k=top_k)
+    
+    def _extract_student_metadata(self, img_data: Dict[str, Any], category: str,
+                                  text_candidates: Optional[List[int]] = None) -> Tuple[Dict[str, Any], str]:
+        """
+        Extract metadata of a student image, from its surrounding PDF text where that suffices
         
-        return top_references
+        Args:
+            img_data: Extracted image entry (with "context_text" from the PDF text layer)
+            category: Image category
+            text_candidates: References whose metadata terms appear in the text (prefilter_by_text);
+                             without any, the text is only passed as context to the vision call
+            
+        Returns:
+            Tuple of (metadata extraction result, source "text" or "vision")
+        """
+        context_text = img_data.get("context_text") or ""
+        
+        # Captions naming reference terms often state what the vision call would recover;
+        # arbitrary body text next to the image does not
+        if (self.text_metadata_min_chars and text_candidates
+                and len(context_text) >= self.text_metadata_min_chars):
+            result = self.qwen_client.extract_metadata_from_text(context_text, category)
+            if result.get("status") == "success" and result.get("metadata"):
+                return result, "text"
+            print(f"⚠️ Text-only metadata failed for {img_data['filename']}, using vision call")
+        
+        result = self.qwen_client.extract_metadata(img_data["image_base64"], category, context_text=context_text or None)
+        return result, "vision"
     
     def _calculate_metadata_similarity(self, student_meta: Dict[str, Any], reference_meta: Dict[str, Any]) -> float:
         """
@@ -195,51 +521,45 @@ class EvaluationEngine:
         Returns:
             Similarity score (0-1)
         """
-        if not student_meta or not reference_meta:
-            return 0.0
-        
-        matches = 0
-        total = 0
-        
-        # Compare nested dictionary values
-        def compare_nested(dict1, dict2, path=""):
-            nonlocal matches, total
-            
-            for key in set(dict1.keys()) | set(dict2.keys()):
-                if key in dict1 and key in dict2:
-                    val1, val2 = dict1[key], dict2[key]
-                    
-                    if isinstance(val1, dict) and isinstance(val2, dict):
-                        compare_nested(val1, val2, f"{path}.{key}")
-                    else:
-                        total += 1
-                        if val1 == val2:
-                            matches += 1
-        
-        compare_nested(student_meta, reference_meta)
-        
-        return matches / total if total > 0 else 0.0
+        return metadata_similarity(student_meta, reference_meta)
     
-    def evaluate_pdf_submission(self, pdf_path: str, temp_dir: Optional[str] = None, custom_mode_only: bool = False) -> Dict[str, Any]:
+    def evaluate_pdf_submission(self, pdf_path: PDFSource, temp_dir: Optional[str] = None, custom_mode_only: bool = False,
+                                reference_set: Optional[ReferenceSet] = None, pdf_name: Optional[str] = None) -> Dict[str, Any]:
         """
         Evaluate complete PDF submission
         
+        All per-request state stays local, so one engine can serve concurrent
+        evaluations against different reference sets.
+        
         Args:
-            pdf_path: Path to student PDF submission
-            temp_dir: Temporary directory for extracted images
-            custom_mode_only: If True, only evaluate categories present in metadata_db
+            pdf_path: Path to student PDF submission, or its bytes / file-like object (e.g. an upload)
+            temp_dir: Directory to save extracted images to (optional, removed afterwards)
+            custom_mode_only: If True, only evaluate categories present in the reference set
+            reference_set: References to evaluate against (default: metadata database)
+            pdf_name: Name recorded in the result for in-memory submissions (default: the path)
             
         Returns:
             Complete evaluation result
         """
-        if temp_dir is None:
-            temp_dir = tempfile.mkdtemp(prefix="eval_")
+        # Custom references do not need the metadata database
+        required = ("classifier", "qwen") if reference_set is not None else self.COMPONENTS
+        if not self.is_ready(required):
+            raise Exception(f"Evaluation engine is not ready yet: {self.readiness()}")
+        
+        reference_set = reference_set or self.reference_set
+        pdf_source = pdf_path
+        pdf_path = pdf_name or (pdf_source if isinstance(pdf_source, str) else "<memory>")
+        
+        extracted_images = []
+        valid_images = []
+        rejected_images = []
         
         evaluation_result = {
             "pdf_path": pdf_path,
             "timestamp": datetime.now().isoformat(),
             "images": [],
             "valid_images": [],
+            "rejected_images": [],
             "evaluations": [],
             "overall_score": 0,
             "passed": False,
@@ -247,42 +567,109 @@ class EvaluationEngine:
         }
         
         try:
-            # Step 1: Extract images from PDF
-            print("Extracting images from PDF...")
-            extracted_images = self.pdf_extractor.extract_images_from_pdf(pdf_path, temp_dir)
-            evaluation_result["images"] = extracted_images
+            if self.artifact_store:
+                evaluation_result["artifact_dir"] = self.artifact_store.root_dir
             
-            if not extracted_images:
-                evaluation_result["errors"].append("No images found in PDF")
-                return evaluation_result
+            hash_entries = {}
+            reference_key = self._reference_key(reference_set)
             
-            print(f"Extracted {len(extracted_images)} images")
+            def reusable_stage(img_data, stage):
+                """Stored output of a stage for near-duplicates of graded images, else None"""
+                if not stage or "reused_from" not in img_data:
+                    return None
+                return hash_entries[img_data["filename"]]["stages"].get(stage)
             
-            # Step 2: Classify images with EfficientNet
-            print("Classifying images...")
-            valid_images = []
+            def record_stage(img_data, stage, output):
+                entry = hash_entries.get(img_data["filename"])
+                if entry is not None and stage:
+                    self.hash_index.record_stage(entry, stage, output)
             
-            for img_data in extracted_images:
-                try:
-                    predicted_class, confidence, is_valid = self.classifier.predict_from_base64(
-                        img_data["image_base64"]
-                    )
-                    
-                    img_data["predicted_class"] = predicted_class
-                    img_data["confidence"] = confidence
-                    img_data["is_valid"] = is_valid
+            # Embeddings come out of the classification forward pass; kept out of the result JSON
+            use_embeddings = self.reference_selection != "metadata" and bool(reference_set.embedding_index.matrices)
+            student_embeddings = {}
+            
+            def classify_pending(pending):
+                """Classify buffered images with one batched forward pass, then drop their pixels"""
+                cached = {}
+                if not use_embeddings:
+                    for img_data in pending:
+                        output = reusable_stage(img_data, "classification")
+                        if output:
+                            cached[img_data["filename"]] = dict(output, status="success")
+                
+                # Decoding happens in the classifier's preprocessing threads
+                uncached = [img_data for img_data in pending if img_data["filename"] not in cached]
+                predictions = self.classifier.batch_predict(
+                    [lambda img_data=img_data: self._get_image(img_data) for img_data in uncached],
+                    return_embeddings=use_embeddings
+                )
+                for img_data, prediction in zip(uncached, predictions):
+                    cached[img_data["filename"]] = prediction
+                
+                for img_data in pending:
+                    prediction = cached[img_data["filename"]]
                     
-                    if is_valid:
-                        valid_images.append(img_data)
-                        print(f"  ✅ {img_data['filename']}: {predicted_class} ({confidence:.3f})")
-                    else:
-                        print(f"  ❌ {img_data['filename']}: Low confidence ({confidence:.3f})")
+                    if prediction.get("status") == "success":
+                        predicted_class, confidence, is_valid = prediction["predicted_class"], prediction["confidence"], prediction["is_valid"]
+                        if "embedding" in prediction:
+                            student_embeddings[img_data["filename"]] = prediction["embedding"]
                         
-                except Exception as e:
-                    print(f"  ❌ Classification failed for {img_data['filename']}: {str(e)}")
-                    img_data["error"] = str(e)
+                        img_data["predicted_class"] = predicted_class
+                        img_data["confidence"] = confidence
+                        img_data["is_valid"] = is_valid
+                        record_stage(img_data, "classification", {
+                            "predicted_class": predicted_class,
+                            "confidence": confidence,
+                            "is_valid": is_valid
+                        })
+                        
+                        if is_valid:
+                            valid_images.append(img_data)
+                            print(f"  ✅ {img_data['filename']}: {predicted_class} ({confidence:.3f})")
+                        else:
+                            print(f"  ❌ {img_data['filename']}: Low confidence ({confidence:.3f})")
+                    else:
+                        print(f"  ❌ Classification failed for {img_data['filename']}: {prediction.get('error')}")
+                        img_data["error"] = prediction.get("error")
+                    
+                    # Later stages only send compressed bytes to the VLM; decoded pixels are not kept
+                    if isinstance(img_data, ExtractedImage):
+                        if img_data.get("is_valid"):
+                            if self.cropper:
+                                self._auto_crop(img_data)
+                            img_data.compress()
+                        else:
+                            img_data.release_image()
+            
+            # Steps 1-2: Extract images and classify them with EfficientNet in batches as pages are decoded
+            print("Extracting and classifying images...")
+            pending = []
+            
+            for img_data in self.pdf_extractor.iter_images(pdf_source, temp_dir, rejections=rejected_images):
+                extracted_images.append(img_data)
+                self._register_image(img_data)
+                
+                # Match against previously graded images
+                entry = self._match_hash_index(img_data, pdf_path)
+                if entry is not None:
+                    hash_entries[img_data["filename"]] = entry
+                
+                pending.append(img_data)
+                if len(pending) >= self.classifier.batch_size:
+                    classify_pending(pending)
+                    pending = []
+            
+            if pending:
+                classify_pending(pending)
+            
+            for img_data in rejected_images:
+                print(f"  🚫 {img_data['filename']}: Decorative image skipped ({img_data['rejection_reason']})")
+            
+            if not extracted_images:
+                evaluation_result["errors"].append("No images found in PDF")
+                return evaluation_result
             
-            evaluation_result["valid_images"] = valid_images
+            print(f"Extracted {len(extracted_images)} images ({len(rejected_images)} decorative images skipped)")
             
             if not valid_images:
                 evaluation_result["errors"].append("No valid images after classification")
@@ -294,7 +681,11 @@ class EvaluationEngine:
             
             for img_data in valid_images:
                 try:
-                    evaluability = self.qwen_client.check_image_evaluability(img_data["image_base64"])
+                    evaluability = reusable_stage(img_data, "evaluability")
+                    if evaluability is None:
+                        evaluability = self.qwen_client.check_image_evaluability(img_data["image_base64"])
+                        if evaluability.get("status") == "success":
+                            record_stage(img_data, "evaluability", evaluability)
                     
                     if evaluability.get("status") == "success" and evaluability.get("is_evaluable"):
                         evaluable_images.append(img_data)
@@ -324,23 +715,70 @@ class EvaluationEngine:
                     
                     # Custom mode filtering: Skip categories not in custom reference
                     if custom_mode_only:
-                        available_categories = list(self.metadata_db.get("categories", {}).keys())
+                        available_categories = list(reference_set.categories.keys())
                         if category not in available_categories:
                             print(f"⚠️ SKIP: Category '{category}' not in custom reference (available: {available_categories})")
                             continue
                     
-                    student_metadata_result = self.qwen_client.extract_metadata(
-                        img_data["image_base64"], category
-                    )
-                    
-                    if student_metadata_result.get("status") != "success":
-                        print(f"❌ Metadata extraction failed for {img_data['filename']}")
+                    # Exact copy of an image already graded against the same references
+                    evaluation_stage = f"evaluation:{reference_key}"
+                    cached_evaluation = None
+                    if "reused_from" in img_data and is_exact_copy(hash_entries.get(img_data["filename"]), img_data.get("image_hash")):
+                        cached_evaluation = reusable_stage(img_data, evaluation_stage)
+                    if cached_evaluation:
+                        evaluation_data = dict(cached_evaluation)
+                        evaluation_data["filename"] = img_data["filename"]
+                        evaluation_data["reused_from"] = img_data["reused_from"]
+                        
+                        evaluation_result["evaluations"].append(evaluation_data)
+                        total_score += evaluation_data["score"]
+                        valid_evaluations += 1
+                        
+                        print(f"♻️ {img_data['filename']}: {evaluation_data['score']}/100 points (reused)")
                         continue
                     
-                    student_metadata = student_metadata_result.get("metadata", {})
+                    student_embedding = student_embeddings.get(img_data["filename"])
+                    top_references = []
+                    student_metadata = {}
+                    metadata_source = None
                     
-                    # HYBRID EVALUATION: Find best reference match
-                    top_references = self._find_top_reference_matches(student_metadata, category, top_k=1)
+                    # References whose metadata terms (e.g. "InfoCube", "Delta") appear next to the image
+                    text_candidates = reference_set.prefilter_by_text(category, img_data.get("context_text"))
+                    
+                    # Embedding-only selection: no metadata VLM call needed
+                    if use_embeddings and self.reference_selection == "embedding":
+                        top_references = self._find_top_reference_matches_by_embedding(
+                            student_embedding, category, top_k=1, reference_set=reference_set
+                        )
+                    
+                    if not top_references:
+                        student_metadata_result, metadata_source = self._extract_student_metadata(
+                            img_data, category, text_candidates
+                        )
+                        
+                        if student_metadata_result.get("status") != "success":
+                            print(f"❌ Metadata extraction failed for {img_data['filename']}")
+                            continue
+                        
+                        student_metadata = student_metadata_result.get("metadata", {})
+                        
+                        if use_embeddings and self.reference_selection == "hybrid":
+                            # Embedding shortlist, re-ranked by metadata similarity
+                            shortlist = reference_set.top_by_embedding(
+                                student_embedding, category, top_k=self.embedding_shortlist
+                            )
+                            if shortlist and text_candidates:
+                                shortlist = [row for row in shortlist if row in text_candidates] or shortlist
+                            if shortlist:
+                                ranked = reference_set.rerank_by_metadata(student_metadata, category, shortlist)
+                                top_references = [reference_set.get_references(category)[ranked[0]]]
+                        
+                        if not top_references:
+                            # HYBRID EVALUATION: Find best reference match
+                            top_references = self._find_top_reference_matches(
+                                student_metadata, category, top_k=1, reference_set=reference_set,
+                                candidates=text_candidates
+                            )
                     
                     if not top_references:
                         print(f"❌ No references found for {category}")
@@ -397,7 +835,7 @@ class EvaluationEngine:
                         
                         try:
                             # Detect custom mode based on reference data source
-                            is_custom_mode = "image_base64" in ref_data
+                            is_custom_mode = reference_set.is_custom
                             mode_text = "CUSTOM MODE (50% content weight)" if is_custom_mode else "DATABASE MODE"
                             print(f"Evaluation Mode: {mode_text}")
                             
@@ -463,12 +901,16 @@ class EvaluationEngine:
                         "category": category,
                         "confidence": img_data["confidence"],
                         "student_metadata": student_metadata,
+                        "metadata_source": metadata_source,
                         "references_used": [ref["filename"] for ref in top_references[:len(evaluation_scores)]],
                         "evaluation": evaluation,
                         "score": score
                     }
                     
                     evaluation_result["evaluations"].append(evaluation_data)
+                    # A near-duplicate's grade must not become the stored grade of the indexed image
+                    if is_exact_copy(hash_entries.get(img_data["filename"]), img_data.get("image_hash")):
+                        record_stage(img_data, evaluation_stage, evaluation_data)
                     total_score += score
                     valid_evaluations += 1
                     
@@ -493,6 +935,18 @@ class EvaluationEngine:
             print(f"❌ Evaluation failed: {str(e)}")
         
         finally:
+            # Results carry slim image entries (hash + metadata); valid_images shares the same entries
+            slim_images = {id(img): slim_image_entry(img) for img in extracted_images}
+            evaluation_result["images"] = [slim_images[id(img)] for img in extracted_images]
+            evaluation_result["valid_images"] = [slim_images[id(img)] for img in valid_images]
+            evaluation_result["rejected_images"] = [slim_image_entry(img) for img in rejected_images]
+            
+            if self.hash_index:
+                try:
+                    self.hash_index.save()
+                except Exception as e:
+                    print(f"⚠️ Could not save image hash index: {str(e)}")
+            
             # Cleanup temporary files
             if temp_dir and os.path.exists(temp_dir):
                 try:
@@ -518,8 +972,7 @@ class EvaluationEngine:
             pdf_name = os.path.splitext(os.path.basename(result.get("pdf_path", "unknown")))[0]
             output_path = f"evaluation_result_{pdf_name}_{timestamp}.json"
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
+        write_result_json(result, output_path)
         
         print(f"Evaluation result saved to: {output_path}")
         return output_path
@@ -534,32 +987,7 @@ class EvaluationEngine:
         Returns:
             Summary string
         """
-        summary = f"""
-EVALUATION SUMMARY
-==================
-
-PDF: {os.path.basename(result.get('pdf_path', 'Unknown'))}
-Date: {result.get('timestamp', 'Unknown')}
-
-RESULTS:
-- Images extracted: {len(result.get('images', []))}
-- Valid classifications: {len(result.get('valid_images', []))}
-- Successful evaluations: {len(result.get('evaluations', []))}
-- Overall Score: {result.get('overall_score', 0):.1f}/100
-- Result: {'PASSED' if result.get('passed') else 'FAILED'}
-
-DETAILED SCORES:
-"""
-        
-        for eval_data in result.get('evaluations', []):
-            summary += f"- {eval_data['filename']} ({eval_data['category']}): {eval_data['score']}/100\n"
-        
-        if result.get('errors'):
-            summary += f"\n⚠️  ERRORS:\n"
-            for error in result['errors']:
-                summary += f"- {error}\n"
-        
-        return summary
+        return format_result_summary(result)
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,175 @@
+import os
+import json
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Union
+
+from result_store import ArtifactStore
+
+# Bump when the manifest layout or the extraction output changes
+CACHE_VERSION = 1
+
+class ExtractionCache:
+    """On-disk cache of PDF extraction results keyed by PDF content and extractor settings"""
+
+    def __init__(self, cache_dir: str = "extraction_cache", max_bytes: int = 2 * 1024 ** 3):
+        """
+        Initialize extraction cache
+
+        Layout:
+            <cache_dir>/manifests/<key>.json      image entries of one extraction
+            <cache_dir>/info/<pdf sha256>.json    get_pdf_info() result
+            <cache_dir>/images/<ab>/<hash>.<ext>  content-addressed image bytes
+
+        Args:
+            cache_dir: Cache directory (created if missing)
+            max_bytes: Size bound of the image store; least recently used extractions are evicted
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.manifest_dir = os.path.join(cache_dir, "manifests")
+        self.info_dir = os.path.join(cache_dir, "info")
+        self.store = ArtifactStore(os.path.join(cache_dir, "images"))
+        os.makedirs(self.manifest_dir, exist_ok=True)
+        os.makedirs(self.info_dir, exist_ok=True)
+
+    @staticmethod
+    def hash_pdf(source: Union[str, bytes]) -> str:
+        """SHA-256 of the PDF bytes (path or in-memory bytes)"""
+        if isinstance(source, bytes):
+            return hashlib.sha256(source).hexdigest()
+
+        digest = hashlib.sha256()
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(pdf_hash: str, settings: Dict[str, Any]) -> str:
+        """Cache key of one PDF extracted with one set of extractor settings"""
+        fingerprint = json.dumps({"version": CACHE_VERSION, "settings": settings}, sort_keys=True, default=str)
+        return hashlib.sha256(f"{pdf_hash}:{fingerprint}".encode("utf-8")).hexdigest()
+
+    def _manifest_path(self, key: str) -> str:
+        return os.path.join(self.manifest_dir, f"{key}.json")
+
+    @staticmethod
+    def _write_json(path: str, data: Dict[str, Any]):
+        """Atomic JSON write"""
+        temp_path = f"{path}.tmp{os.getpid()}"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, default=str)
+        os.replace(temp_path, path)
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Read a manifest (marks it as recently used)
+
+        Returns:
+            Manifest, or None if missing or if any of its image files was evicted
+        """
+        path = self._manifest_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+        for record in manifest.get("images", []):
+            if not self.store.exists(record["image_hash"], record["format"]):
+                return None
+
+        os.utime(path)
+        return manifest
+
+    def read_image(self, record: Dict[str, Any]) -> bytes:
+        """Image bytes of a manifest record"""
+        return self.store.get(record["image_hash"], record["format"])
+
+    def store_image(self, data: bytes, image_hash: str, ext: str):
+        """Store image bytes under the entry's content hash"""
+        self.store.put(data, ext, image_hash=image_hash)
+
+    def save(self, key: str, pdf_hash: str, settings: Dict[str, Any],
+             images: List[Dict[str, Any]], rejections: List[Dict[str, Any]]):
+        """
+        Write the manifest of a completed extraction, then enforce the size bound
+
+        Args:
+            key: Cache key (make_key)
+            pdf_hash: SHA-256 of the PDF
+            settings: Extractor settings the key was built from
+            images: Image entries without pixels (bytes stored via store_image)
+            rejections: Entries rejected by the content filter
+        """
+        self._write_json(self._manifest_path(key), {
+            "version": CACHE_VERSION,
+            "pdf_sha256": pdf_hash,
+            "settings": settings,
+            "created_at": datetime.now().isoformat(),
+            "images": images,
+            "rejections": rejections
+        })
+        self.evict()
+
+    def load_info(self, pdf_hash: str) -> Optional[Dict[str, Any]]:
+        """Cached get_pdf_info() result"""
+        try:
+            with open(os.path.join(self.info_dir, f"{pdf_hash}.json"), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def save_info(self, pdf_hash: str, info: Dict[str, Any]):
+        """Store get_pdf_info() result"""
+        self._write_json(os.path.join(self.info_dir, f"{pdf_hash}.json"), info)
+
+    def _image_sizes(self) -> Dict[str, int]:
+        """Stored image files -> size in bytes"""
+        sizes = {}
+        for directory, _, files in os.walk(self.store.root_dir):
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    sizes[path] = os.path.getsize(path)
+                except OSError:
+                    pass
+        return sizes
+
+    def evict(self):
+        """Drop least recently used manifests until the image store fits into max_bytes"""
+        sizes = self._image_sizes()
+        if sum(sizes.values()) <= self.max_bytes:
+            return
+
+        manifests = []
+        for name in os.listdir(self.manifest_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.manifest_dir, name)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    images = json.load(f).get("images", [])
+                manifests.append((os.path.getmtime(path), path, {
+                    self.store.path_for(record["image_hash"], record["format"]) for record in images
+                }))
+            except (OSError, json.JSONDecodeError):
+                continue
+
+        # Oldest first; keep removing until the images still referenced fit
+        manifests.sort()
+        while manifests:
+            referenced = set().union(*(files for _, _, files in manifests))
+            if sum(sizes.get(path, 0) for path in referenced) <= self.max_bytes:
+                break
+            _, path, _ = manifests.pop(0)
+            os.remove(path)
+
+        referenced = set().union(*(files for _, _, files in manifests)) if manifests else set()
+        for path in sizes:
+            if path not in referenced:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
@@ -4,12 +4,19 @@ Fast Metadata Generation Script
 Generate metadata database for all reference solutions without test system overhead
 """
 
+import sys
 import time
 from datetime import datetime
-from metadata_generator import MetadataGenerator
+from metadata_generator import MetadataGenerator, parse_generation_options
 
-def generate_metadata_standalone():
-    """Generate metadata database standalone"""
+def generate_metadata_standalone(max_in_flight: int = 4, qwen_urls=None):
+    """
+    Generate metadata database standalone
+    
+    Args:
+        max_in_flight: Metadata requests kept in flight per Qwen server
+        qwen_urls: Qwen servers to use (default: localhost:5000)
+    """
     print("=" * 60)
     print("METADATA DATABASE GENERATOR")
     print("=" * 60)
@@ -21,14 +28,15 @@ def generate_metadata_standalone():
     try:
         # Initialize generator
         print("Initializing metadata generator...")
-        generator = MetadataGenerator()
+        generator = MetadataGenerator(max_in_flight=max_in_flight, qwen_urls=qwen_urls)
         print("Generator initialized")
         print()
         
         # Generate database
         print("Processing all reference images...")
         print("   Note: ALL images will be processed (no confidence filtering)")
-        print("   Estimated time: ~2-3 hours for 515 images")
+        print("   Estimated time: ~2-3 hours for 515 images with one request at a time;")
+        print("   progress lines show throughput and ETA for the chosen concurrency")
         print()
         
         database_path = generator.save_database()
@@ -74,7 +82,8 @@ if __name__ == "__main__":
     print("You can interrupt anytime with Ctrl+C")
     print()
     
-    success = generate_metadata_standalone()
+    # Options: --concurrency N (default 4), --qwen-url URL (repeatable)
+    success = generate_metadata_standalone(**parse_generation_options(sys.argv))
     
     if success:
         print("Ready to evaluate student submissions!")
@@ -1,64 +1,315 @@
-import torch
-from torchvision import models, transforms
 from PIL import Image
-import torch.nn.functional as F
+import numpy as np
 import os
+import json
 import base64
+import hashlib
 import io
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple, Optional
 
+from preprocessing import BatchNormalizer, open_image, resize_for_model
+from classifier_service import ClassifierServiceClient
+
+# torch is imported where a PyTorch model is built or run: the onnx backend and the
+# classifier service client work on NumPy arrays only
+
+# Backend name -> file suffix replacing the .pth extension
+EXPORT_SUFFIXES = {
+    "onnx": ".onnx",
+    "onnx-int8": ".int8.onnx",
+    "torchscript": ".torchscript.pt"
+}
+
+def exported_path(model_path: str, backend: str) -> str:
+    """Default location of an exported model next to the .pth weights"""
+    return os.path.splitext(model_path)[0] + EXPORT_SUFFIXES[backend]
+
+def file_sha256(path: str) -> str:
+    """SHA-256 hex digest of a file (read in chunks)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    """Row-wise softmax of [N, classes] logits"""
+    shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+
 class ImageClassifier:
     """EfficientNet-based image classifier for SAP BW categories"""
     
-    def __init__(self, model_path: str = "./model/efficientnet_b0_best.pth", confidence_threshold: float = 0.6):
+    BACKENDS = ("torch", "onnx", "torchscript")
+    
+    # INT8 logits are only expected to match the fp32 logits up to quantization error
+    QUANTIZED_PARITY_TOLERANCE = 0.5
+    
+    def __init__(self, model_path: str = "./model/efficientnet_b0_best.pth", confidence_threshold: float = 0.6,
+                 batch_size: int = 16, preprocess_workers: int = 4, backend: str = "torch",
+                 export_path: Optional[str] = None, num_threads: Optional[int] = None,
+                 parity_tolerance: Optional[float] = 1e-3, quantized: bool = False,
+                 fast_preprocess: bool = False, service: Optional[str] = None):
         """
         Initialize classifier
         
         Args:
             model_path: Path to trained EfficientNet model
             confidence_threshold: Minimum confidence for valid predictions
+            batch_size: Images per forward pass in batch_predict
+            preprocess_workers: Threads decoding and preprocessing images for batch_predict
+            backend: "torch" (eager PyTorch), "onnx" (onnxruntime, CPU) or "torchscript" (CPU);
+                     exports are created with model_export.py
+            export_path: Exported model file (default: next to model_path, see model_export.exported_path)
+            num_threads: Intra-op threads of the CPU backends (default: CPU count)
+            parity_tolerance: Maximum logit difference to the PyTorch model accepted when loading
+                              an exported model (None skips the check). The measured difference
+                              is stored next to the export (<export>.parity.json, keyed by the
+                              hashes of export and weights), so the PyTorch model is only built
+                              the first time an export is loaded
+            quantized: Run the INT8 model built by model_export.py (onnx backend; at least
+                       QUANTIZED_PARITY_TOLERANCE is accepted in the parity check)
+            fast_preprocess: Opt in to reduced JPEG decoding, integer pre-downscale and NumPy
+                             normalization into a preallocated batch buffer instead of the
+                             torchvision transform. Inputs differ slightly (see
+                             preprocessing.compare_with_transform), so predictions near the
+                             confidence threshold can change and embeddings no longer match
+                             references built with the transform
+            service: 'host:port' of a running classifier_service.py; the model is not loaded in this
+                     process, images are resized here and classified by the service
         """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        if quantized and backend == "torchscript":
+            raise ValueError("The quantized model requires the onnx backend")
+        
         self.model_path = model_path
+        self.quantized = quantized
+        self.backend = "onnx" if quantized else backend
+        if self.backend == "torch":
+            self.export_path = None
+        else:
+            self.export_path = export_path or exported_path(model_path, "onnx-int8" if quantized else self.backend)
+        self.num_threads = num_threads or os.cpu_count() or 1
+        self.parity_tolerance = parity_tolerance
+        if quantized and parity_tolerance is not None:
+            self.parity_tolerance = max(parity_tolerance, self.QUANTIZED_PARITY_TOLERANCE)
         self.confidence_threshold = confidence_threshold
+        self.batch_size = batch_size
+        self.preprocess_workers = preprocess_workers
         self.class_names = [
             'Data Source', 'Data-Flow', 'Data-Transfer-Process', 
             'Excel-Tabelle', 'Info-Object', 'Transformation'
         ]
         
-        # Image preprocessing
-        self.transform = transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
-        ])
+        # Image preprocessing (reference implementation; fast_preprocess approximates it)
+        # The service takes resized uint8 images, so client mode always uses the fast path
+        self.service = service
+        self.fast_preprocess = fast_preprocess or service is not None
+        self.input_size = (224, 224)
+        self._transform = None
         
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.model = None
+        # Exported backends run on the CPU (the Flask host has no GPU); the torch backend
+        # moves to CUDA if available (_build_torch_model)
+        self.device = "cpu"
+        self.model = None     # PyTorch module (torch backend)
+        self.scripted = None  # TorchScript module (torchscript backend)
+        self.session = None   # onnxruntime session (onnx backend)
+        self.service_client = ClassifierServiceClient(service) if service else None
+        self.parity_max_diff = None
+        
+        # One instance is shared across request threads (model_registry); forward passes
+        # already use all cores, so they run one at a time
+        self._inference_lock = threading.Lock()
         self._load_model()
     
+    @property
+    def transform(self):
+        """torchvision reference transform (torchvision is only imported when it is used)"""
+        if self._transform is None:
+            from torchvision import transforms
+            
+            self._transform = transforms.Compose([
+                transforms.Resize((224, 224)),
+                transforms.ToTensor(),
+                transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+            ])
+        return self._transform
+    
+    def _build_torch_model(self, device: Optional[str] = None):
+        """
+        EfficientNet with the trained weights, in eval mode
+        
+        Args:
+            device: Target device (default: CUDA if available, else CPU; stored in self.device)
+        """
+        import torch
+        from torchvision import models
+        
+        if device is None:
+            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+            device = self.device
+        
+        # Create model architecture
+        model = models.efficientnet_b0(weights=None)
+        model.classifier[1] = torch.nn.Linear(
+            model.classifier[1].in_features, 
+            len(self.class_names)
+        )
+        
+        # Load trained weights
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"Model file not found: {self.model_path}")
+        
+        model.load_state_dict(torch.load(self.model_path, map_location=device))
+        model = model.to(device)
+        model.eval()
+        return model
+    
     def _load_model(self):
-        """Load the trained EfficientNet model"""
+        """Load the trained EfficientNet model with the configured backend"""
         try:
-            # Create model architecture
-            self.model = models.efficientnet_b0(weights=None)
-            self.model.classifier[1] = torch.nn.Linear(
-                self.model.classifier[1].in_features, 
-                len(self.class_names)
-            )
+            if self.service_client is not None:
+                info = self.service_client.info()
+                if info["class_names"] != self.class_names:
+                    raise ValueError(f"Service classes {info['class_names']} do not match {self.class_names}")
+                print(f"Using classifier service at {self.service} ({info['backend']}, {info['model_path']})")
+                return
+            
+            if self.backend == "torch":
+                self.model = self._build_torch_model()
+                print(f"EfficientNet model loaded from {self.model_path}")
+                return
+            
+            if not os.path.exists(self.export_path):
+                raise FileNotFoundError(f"Exported model not found: {self.export_path} (run model_export.py)")
             
-            # Load trained weights
-            if not os.path.exists(self.model_path):
-                raise FileNotFoundError(f"Model file not found: {self.model_path}")
+            if self.backend == "onnx":
+                import onnxruntime as ort
+                
+                options = ort.SessionOptions()
+                options.intra_op_num_threads = self.num_threads
+                options.inter_op_num_threads = 1
+                options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+                options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                self.session = ort.InferenceSession(self.export_path, options, providers=["CPUExecutionProvider"])
+            else:
+                import torch
+                
+                torch.set_num_threads(self.num_threads)
+                self.scripted = torch.jit.load(self.export_path, map_location="cpu").eval()
             
-            self.model.load_state_dict(torch.load(self.model_path, map_location=self.device))
-            self.model = self.model.to(self.device)
-            self.model.eval()
+            variant = f"{self.backend} INT8" if self.quantized else self.backend
+            print(f"EfficientNet {variant} model loaded from {self.export_path} ({self.num_threads} threads)")
             
-            print(f"EfficientNet model loaded from {self.model_path}")
+            if self.parity_tolerance is not None:
+                self._check_parity()
             
         except Exception as e:
             raise Exception(f"Failed to load model: {str(e)}")
     
+    def _parity_record_path(self) -> str:
+        return f"{self.export_path}.parity.json"
+    
+    def _check_parity(self):
+        """
+        Compare logits of the exported model with the PyTorch model on a fixed input
+        
+        The result is stored next to the export; later loads of the same export and
+        weights reuse it instead of building the PyTorch model again.
+        """
+        if not os.path.exists(self.model_path):
+            print(f"⚠️ Parity check skipped: {self.model_path} not found")
+            return
+        
+        key = {"export_sha256": file_sha256(self.export_path), "weights_sha256": file_sha256(self.model_path)}
+        record_path = self._parity_record_path()
+        record = None
+        if os.path.exists(record_path):
+            try:
+                with open(record_path, 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                record = None
+        
+        if record and all(record.get(name) == value for name, value in key.items()):
+            self.parity_max_diff = record["max_abs_logit_diff"]
+            source = "recorded"
+        else:
+            self.parity_max_diff = self._measure_parity()
+            source = "measured"
+            try:
+                with open(record_path, 'w', encoding='utf-8') as f:
+                    json.dump({**key, "max_abs_logit_diff": self.parity_max_diff,
+                               "checked_at": datetime.now().isoformat()}, f, indent=2)
+            except OSError as e:
+                print(f"⚠️ Could not store parity result: {e}")
+        
+        if self.parity_max_diff > self.parity_tolerance:
+            raise ValueError(
+                f"{self.export_path} deviates from PyTorch logits "
+                f"(max abs diff {self.parity_max_diff:.2e} > {self.parity_tolerance:.0e})"
+            )
+        print(f"✅ Parity check passed (max abs logit diff {self.parity_max_diff:.2e}, {source})")
+    
+    def _measure_parity(self) -> float:
+        """Maximum logit difference between the exported model and the PyTorch model"""
+        import torch
+        from model_export import ClassifierWithEmbeddings, example_input
+        
+        reference = ClassifierWithEmbeddings(self._build_torch_model("cpu"))
+        images = example_input()
+        with torch.inference_mode():
+            expected, _ = reference(images)
+        logits, _ = self._run_model(images.numpy())
+        return float(np.abs(logits - expected.numpy()).max())
+    
+    def _run_model(self, batch: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Forward pass of the configured backend
+        
+        Args:
+            batch: Preprocessed float32 images [N, 3, 224, 224]
+            
+        Returns:
+            Tuple of (logits [N, classes], embeddings [N, features])
+        """
+        with self._inference_lock:
+            if self.session is not None:
+                return tuple(self.session.run(None, {"input": batch}))
+            
+            import torch
+            
+            inputs = torch.from_numpy(batch)
+            with torch.inference_mode():
+                if self.scripted is not None:
+                    logits, embeddings = self.scripted(inputs)
+                else:
+                    embeddings = self._forward_embeddings(inputs.to(self.device))
+                    logits = self.model.classifier(embeddings)
+            return logits.cpu().numpy(), embeddings.cpu().numpy()
+    
+    def warm_up(self, batch_size: int = 1):
+        """Run one forward pass so the first request does not pay for lazy allocations"""
+        if self.service_client is not None:
+            self.service_client.info()  # the service warms up itself; this opens the connection
+            return
+        width, height = self.input_size
+        self._run_model(np.zeros((batch_size, 3, height, width), dtype=np.float32))
+    
+    def memory_bytes(self) -> int:
+        """Size of the loaded weights (parameters and buffers, or the exported model file)"""
+        if self.service_client is not None:
+            return 0
+        module = self.model if self.model is not None else self.scripted
+        if module is not None:
+            tensors = list(module.parameters()) + list(module.buffers())
+            return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+        return os.path.getsize(self.export_path)
+    
     def predict_from_path(self, image_path: str) -> Tuple[str, float, bool]:
         """
         Predict category from image file path
@@ -72,7 +323,7 @@ class ImageClassifier:
         if not os.path.exists(image_path):
             raise FileNotFoundError(f"Image file not found: {image_path}")
         
-        image = Image.open(image_path).convert("RGB")
+        image = self._open_image(image_path)
         return self._predict_image(image)
     
     def predict_from_base64(self, image_base64: str) -> Tuple[str, float, bool]:
@@ -87,7 +338,7 @@ class ImageClassifier:
         """
         try:
             image_data = base64.b64decode(image_base64)
-            image = Image.open(io.BytesIO(image_data)).convert("RGB")
+            image = self._open_image(image_data)
             return self._predict_image(image)
         except Exception as e:
             raise Exception(f"Failed to decode base64 image: {str(e)}")
@@ -104,16 +355,12 @@ class ImageClassifier:
         """
         try:
             # Preprocess image
-            input_tensor = self.transform(image).unsqueeze(0).to(self.device)
+            # Preprocessing and prediction
+            probs, _ = self._infer([self._prepare(image)], return_embeddings=False)
+            top_class = int(np.argmax(probs[0]))
             
-            # Prediction
-            with torch.no_grad():
-                outputs = self.model(input_tensor)
-                probs = F.softmax(outputs[0], dim=0)
-                top_prob, top_class = torch.max(probs, dim=0)
-            
-            predicted_class = self.class_names[top_class.item()]
-            confidence = top_prob.item()
+            predicted_class = self.class_names[top_class]
+            confidence = float(probs[0][top_class])
             is_valid = confidence >= self.confidence_threshold
             
             return predicted_class, confidence, is_valid
@@ -121,46 +368,295 @@ class ImageClassifier:
         except Exception as e:
             raise Exception(f"Prediction failed: {str(e)}")
     
-    def batch_predict(self, image_data_list: list) -> list:
+    def predict_and_embed_from_base64(self, image_base64: str) -> Tuple[str, float, bool, np.ndarray]:
+        """
+        Predict category and compute visual embedding in a single forward pass
+        
+        Args:
+            image_base64: Base64 encoded image data
+            
+        Returns:
+            Tuple of (predicted_class, confidence, is_valid, embedding)
+        """
+        try:
+            image_data = base64.b64decode(image_base64)
+            image = self._open_image(image_data)
+        except Exception as e:
+            raise Exception(f"Failed to decode base64 image: {str(e)}")
+        
+        return self.predict_and_embed_from_image(image)
+    
+    def predict_from_image(self, image: Image.Image) -> Tuple[str, float, bool]:
+        """
+        Predict category from an already decoded image (e.g. built from PDF pixmap samples)
+        
+        Args:
+            image: PIL Image object (any mode)
+            
+        Returns:
+            Tuple of (predicted_class, confidence, is_valid)
+        """
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        return self._predict_image(image)
+    
+    def predict_and_embed_from_image(self, image: Image.Image) -> Tuple[str, float, bool, np.ndarray]:
+        """
+        Predict category and compute embedding for an already decoded image
+        
+        Args:
+            image: PIL Image object (any mode)
+            
+        Returns:
+            Tuple of (predicted_class, confidence, is_valid, embedding)
+        """
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        
+        try:
+            probs, embeddings = self._infer([self._prepare(image)])
+            top_class = int(np.argmax(probs[0]))
+            
+            predicted_class = self.class_names[top_class]
+            confidence = float(probs[0][top_class])
+            is_valid = confidence >= self.confidence_threshold
+            embedding = embeddings[0].astype(np.float32)
+            
+            return predicted_class, confidence, is_valid, embedding
+            
+        except Exception as e:
+            raise Exception(f"Prediction failed: {str(e)}")
+    
+    def embed_from_path(self, image_path: str) -> np.ndarray:
+        """
+        Compute penultimate-layer embedding for an image file
+        
+        Args:
+            image_path: Path to image file
+            
+        Returns:
+            1-D float32 embedding vector
+        """
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"Image file not found: {image_path}")
+        
+        image = self._open_image(image_path)
+        return self._embed_image(image)
+    
+    def embed_from_base64(self, image_base64: str) -> np.ndarray:
+        """
+        Compute penultimate-layer embedding for a base64 encoded image
+        
+        Args:
+            image_base64: Base64 encoded image data
+            
+        Returns:
+            1-D float32 embedding vector
+        """
+        try:
+            image_data = base64.b64decode(image_base64)
+            image = self._open_image(image_data)
+        except Exception as e:
+            raise Exception(f"Failed to decode base64 image: {str(e)}")
+        return self._embed_image(image)
+    
+    def _embed_image(self, image: Image.Image) -> np.ndarray:
         """
-        Predict categories for multiple images
+        Internal embedding method
         
         Args:
-            image_data_list: List of image data (paths or base64 strings)
+            image: PIL Image object
             
         Returns:
-            List of prediction results
+            1-D float32 embedding vector
         """
-        results = []
+        try:
+            _, embeddings = self._infer([self._prepare(image)])
+            
+            return embeddings[0].astype(np.float32)
+            
+        except Exception as e:
+            raise Exception(f"Embedding failed: {str(e)}")
+    
+    def _forward_embeddings(self, input_tensor):
+        """Run EfficientNet up to the pooled penultimate layer (before classifier head)"""
+        features = self.model.features(input_tensor)
+        features = self.model.avgpool(features)
+        return features.flatten(1)
+    
+    def _load_input(self, image_data) -> Image.Image:
+        """
+        Decode one batch_predict input (any mode; converted by _prepare)
         
-        for i, image_data in enumerate(image_data_list):
+        Args:
+            image_data: File path, base64 string, image bytes, PIL Image or a
+                        callable returning a PIL Image (decoded in the worker thread)
+        """
+        if callable(image_data):
+            image = image_data()
+        elif isinstance(image_data, Image.Image):
+            image = image_data
+        elif isinstance(image_data, str) and os.path.exists(image_data):
+            # File path
+            image = self._open_image(image_data)
+        elif isinstance(image_data, str):
+            # Assume base64
             try:
-                if isinstance(image_data, str) and os.path.exists(image_data):
-                    # File path
-                    prediction = self.predict_from_path(image_data)
-                elif isinstance(image_data, str):
-                    # Assume base64
-                    prediction = self.predict_from_base64(image_data)
-                else:
-                    raise ValueError("Invalid image data format")
-                
-                results.append({
+                image = self._open_image(base64.b64decode(image_data))
+            except Exception as e:
+                raise Exception(f"Failed to decode base64 image: {str(e)}")
+        elif isinstance(image_data, (bytes, bytearray)):
+            image = self._open_image(image_data)
+        else:
+            raise ValueError("Invalid image data format")
+        
+        return image
+    
+    def _open_image(self, source) -> Image.Image:
+        """Open a file path or image bytes (JPEGs at reduced scale with fast_preprocess)"""
+        if self.fast_preprocess:
+            return open_image(source, self.input_size)
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        return Image.open(source).convert("RGB")
+    
+    def _prepare(self, image: Image.Image):
+        """Model input of one image: uint8 [224, 224, 3] array (fast_preprocess) or normalized tensor"""
+        if self.fast_preprocess:
+            return resize_for_model(image, self.input_size)
+        return self.transform(image if image.mode == "RGB" else image.convert("RGB"))
+    
+    def _to_batch(self, items: list, normalizer: Optional[BatchNormalizer] = None) -> np.ndarray:
+        """
+        Stack prepared inputs into a float32 model batch [N, 3, 224, 224]
+        
+        Args:
+            items: Outputs of _prepare
+            normalizer: Preallocated buffer to normalize into (fast_preprocess; a new one if None)
+        """
+        if self.fast_preprocess:
+            normalizer = normalizer or BatchNormalizer(len(items), self.input_size)
+            return normalizer(items)
+        return np.stack([item.numpy() for item in items])
+    
+    def _preprocess(self, image_data):
+        """Decode and prepare one input; returns (prepared input, None) or (None, error message)"""
+        try:
+            return self._prepare(self._load_input(image_data)), None
+        except Exception as e:
+            return None, str(e)
+    
+    def _forward_batch(self, batch: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        One forward pass over a stacked batch
+        
+        Returns:
+            Tuple of (class probabilities [N, classes], embeddings [N, features])
+        """
+        logits, embeddings = self._run_model(batch)
+        return softmax(logits), embeddings
+    
+    def _infer(self, items: list, normalizer: Optional[BatchNormalizer] = None,
+               return_embeddings: bool = True) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Classify prepared inputs with the local model or the classifier service
+        
+        Args:
+            items: Outputs of _prepare
+            normalizer: Preallocated buffer for the local fast path
+            return_embeddings: Whether the caller needs embeddings (saves transfer in client mode)
+            
+        Returns:
+            Tuple of (class probabilities [N, classes], embeddings [N, features] or None in client mode)
+        """
+        if self.service_client is None:
+            return self._forward_batch(self._to_batch(items, normalizer))
+        return self.service_client.infer(items, return_embeddings)
+    
+    def batch_predict(self, image_data_list: list, batch_size: Optional[int] = None,
+                      return_embeddings: bool = False) -> list:
+        """
+        Predict categories for multiple images with batched forward passes
+        
+        Inputs are decoded and preprocessed in a thread pool (the next batch while
+        the model runs on the current one) and stacked into batches of batch_size.
+        A failing input only fails its own result; if a whole batch fails, its
+        images are retried one by one.
+        
+        Args:
+            image_data_list: List of image data (paths, base64 strings, bytes, PIL Images
+                             or callables returning a PIL Image)
+            batch_size: Images per forward pass (default: self.batch_size)
+            return_embeddings: Add the penultimate-layer "embedding" to each successful result
+            
+        Returns:
+            List of prediction results in input order
+        """
+        batch_size = max(1, batch_size or self.batch_size)
+        results = [None] * len(image_data_list)
+        
+        # One buffer per call (instances are shared between threads), reused for every batch
+        local_fast = self.fast_preprocess and self.service_client is None
+        normalizer = BatchNormalizer(batch_size, self.input_size) if local_fast else None
+        
+        def error_result(i, message):
+            return {
+                "index": i,
+                "predicted_class": None,
+                "confidence": 0.0,
+                "is_valid": False,
+                "status": "error",
+                "error": message
+            }
+        
+        def run(indices, tensors):
+            probs, embeddings = self._infer(tensors, normalizer, return_embeddings)
+            top_classes = np.argmax(probs, axis=1)
+            for row, i in enumerate(indices):
+                confidence = float(probs[row, top_classes[row]])
+                results[i] = {
                     "index": i,
-                    "predicted_class": prediction[0],
-                    "confidence": prediction[1],
-                    "is_valid": prediction[2],
+                    "predicted_class": self.class_names[int(top_classes[row])],
+                    "confidence": confidence,
+                    "is_valid": confidence >= self.confidence_threshold,
                     "status": "success"
-                })
+                }
+                if return_embeddings:
+                    results[i]["embedding"] = embeddings[row].astype(np.float32)
+        
+        chunks = [range(start, min(start + batch_size, len(image_data_list)))
+                  for start in range(0, len(image_data_list), batch_size)]
+        
+        with ThreadPoolExecutor(max_workers=max(1, self.preprocess_workers)) as pool:
+            def submit(chunk):
+                return [pool.submit(self._preprocess, image_data_list[i]) for i in chunk]
+            
+            pending = submit(chunks[0]) if chunks else []
+            for n, chunk in enumerate(chunks):
+                futures = pending
+                pending = submit(chunks[n + 1]) if n + 1 < len(chunks) else []
                 
-            except Exception as e:
-                results.append({
-                    "index": i,
-                    "predicted_class": None,
-                    "confidence": 0.0,
-                    "is_valid": False,
-                    "status": "error",
-                    "error": str(e)
-                })
+                indices, tensors = [], []
+                for i, future in zip(chunk, futures):
+                    tensor, error = future.result()
+                    if error is not None:
+                        results[i] = error_result(i, error)
+                    else:
+                        indices.append(i)
+                        tensors.append(tensor)
+                
+                if not tensors:
+                    continue
+                
+                try:
+                    run(indices, tensors)
+                except Exception:
+                    # Isolate the failing image(s)
+                    for i, tensor in zip(indices, tensors):
+                        try:
+                            run([i], [tensor])
+                        except Exception as e:
+                            results[i] = error_result(i, f"Prediction failed: {str(e)}")
         
         return results
     
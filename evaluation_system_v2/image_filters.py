@@ -0,0 +1,182 @@
+import numpy as np
+from PIL import Image
+from typing import Dict, Optional, Tuple
+
+class ContentFilter:
+    """Statistics-based pre-filter for decorative / non-content images"""
+
+    def __init__(self, max_aspect_ratio: float = 8.0, min_unique_colors: int = 4, min_entropy: float = 0.05,
+                 min_edge_density: float = 0.002, thumbnail_size: int = 256, edge_threshold: int = 24):
+        """
+        Initialize content filter
+
+        Args:
+            max_aspect_ratio: Longer / shorter side above which an image counts as a bar or strip
+            min_unique_colors: Fewer distinct colours count as a flat fill or icon
+            min_entropy: Grey-level entropy (bits) below which an image counts as near-uniform
+            min_edge_density: Share of edge pixels below which an image counts as a background or gradient
+            thumbnail_size: Longer side of the downsampled copy the statistics are computed on
+            edge_threshold: Grey-level gradient (|dx| + |dy|) counted as an edge
+        """
+        self.max_aspect_ratio = max_aspect_ratio
+        self.min_unique_colors = min_unique_colors
+        self.min_entropy = min_entropy
+        self.min_edge_density = min_edge_density
+        self.thumbnail_size = thumbnail_size
+        self.edge_threshold = edge_threshold
+
+    def measure(self, thumbnail: Image.Image, size: Tuple[int, int]) -> Dict[str, float]:
+        """
+        Compute image statistics
+
+        Args:
+            thumbnail: Downsampled copy of the image
+            size: Original (width, height)
+
+        Returns:
+            Dictionary with aspect_ratio, unique_colors, entropy, edge_density
+        """
+        width, height = size
+        rgb = np.asarray(thumbnail.convert("RGB"), dtype=np.uint32)
+        gray = np.asarray(thumbnail.convert("L"), dtype=np.int16)
+
+        packed = (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+        histogram = np.bincount(gray.ravel(), minlength=256) / gray.size
+        histogram = histogram[histogram > 0]
+        entropy = float(-(histogram * np.log2(histogram)).sum())
+
+        edge_density = 0.0
+        if gray.shape[0] > 1 and gray.shape[1] > 1:
+            gradient = np.abs(np.diff(gray, axis=1))[:-1, :] + np.abs(np.diff(gray, axis=0))[:, :-1]
+            edge_density = float((gradient > self.edge_threshold).mean())
+
+        return {
+            "aspect_ratio": round(max(width, height) / max(1, min(width, height)), 3),
+            "unique_colors": int(len(np.unique(packed))),
+            "entropy": round(entropy + 0.0, 4),  # + 0.0 turns -0.0 of a flat histogram into 0.0
+            "edge_density": round(edge_density, 5)
+        }
+
+    def check(self, thumbnail: Image.Image, size: Tuple[int, int]) -> Tuple[Optional[str], Dict[str, float]]:
+        """
+        Decide whether an image carries content
+
+        Args:
+            thumbnail: Downsampled copy of the image (at most thumbnail_size on the longer side)
+            size: Original (width, height)
+
+        Returns:
+            Tuple of (rejection reason or None, statistics)
+        """
+        stats = self.measure(thumbnail, size)
+
+        if stats["aspect_ratio"] > self.max_aspect_ratio:
+            reason = f"aspect ratio {stats['aspect_ratio']:.1f} > {self.max_aspect_ratio}"
+        elif stats["unique_colors"] < self.min_unique_colors:
+            reason = f"{stats['unique_colors']} unique colours < {self.min_unique_colors}"
+        elif stats["entropy"] < self.min_entropy:
+            reason = f"entropy {stats['entropy']:.3f} < {self.min_entropy}"
+        elif stats["edge_density"] < self.min_edge_density:
+            reason = f"edge density {stats['edge_density']:.4f} < {self.min_edge_density}"
+        else:
+            reason = None
+
+        return reason, stats
+
+class AutoCropper:
+    """Finds the content box of a screenshot: trims uniform borders and, optionally, window chrome bands"""
+
+    def __init__(self, tolerance: int = 12, max_outlier_ratio: float = 0.002, padding: int = 4,
+                 min_saving: float = 0.02, remove_chrome: bool = False, max_chrome_ratio: float = 0.15):
+        """
+        Initialize auto-cropper
+
+        Args:
+            tolerance: Grey-level difference still counted as the border colour
+            max_outlier_ratio: Share of deviating pixels a border row/column may contain (JPEG noise)
+            padding: Pixels kept around the detected content
+            min_saving: Minimum share of the area that must be removed for a crop to be applied
+            remove_chrome: Also cut title bars / toolbars / taskbars at the top and bottom
+            max_chrome_ratio: Maximum height share of a chrome band
+        """
+        self.tolerance = tolerance
+        self.max_outlier_ratio = max_outlier_ratio
+        self.padding = padding
+        self.min_saving = min_saving
+        self.remove_chrome = remove_chrome
+        self.max_chrome_ratio = max_chrome_ratio
+
+    def _content_span(self, deviating: np.ndarray) -> Optional[Tuple[int, int]]:
+        """First and last index (exclusive) whose share of deviating pixels exceeds the outlier ratio"""
+        content = np.flatnonzero(deviating.mean(axis=1) > self.max_outlier_ratio)
+        if len(content) == 0:
+            return None
+        return int(content[0]), int(content[-1]) + 1
+
+    def _chrome_span(self, gray: np.ndarray) -> Tuple[int, int]:
+        """
+        Rows between the innermost solid separator lines of the top and bottom bands
+
+        Window chrome (title bar, SAP GUI toolbar, taskbar) ends in a full-width
+        line whose colour differs from the neighbouring row.
+        """
+        height = gray.shape[0]
+        limit = int(height * self.max_chrome_ratio)
+        if limit < 2:
+            return 0, height
+
+        row_median = np.median(gray, axis=1)
+        solid = (np.abs(gray - row_median[:, None]) <= self.tolerance).mean(axis=1) >= 0.98
+        step = np.abs(np.diff(row_median)) > self.tolerance
+
+        # Row r is a separator if it is solid and differs from the row above or below
+        separator = solid.copy()
+        separator[1:-1] &= step[:-1] | step[1:]
+        separator[[0, -1]] = False
+
+        top_rows = np.flatnonzero(separator[:limit])
+        bottom_rows = np.flatnonzero(separator[height - limit:]) + height - limit
+
+        top = int(top_rows[-1]) + 1 if len(top_rows) else 0
+        bottom = int(bottom_rows[0]) if len(bottom_rows) else height
+        return top, bottom
+
+    def find_crop_box(self, image: Image.Image) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Compute the content box
+
+        Args:
+            image: PIL image
+
+        Returns:
+            (left, top, right, bottom) in image coordinates, or None if cropping would not save enough
+        """
+        gray = np.asarray(image.convert("L"), dtype=np.int16)
+        height, width = gray.shape
+        top, bottom, left, right = 0, height, 0, width
+
+        if self.remove_chrome:
+            top, bottom = self._chrome_span(gray)
+
+        # Border colour: most common value of the corner pixels of the remaining area
+        region = gray[top:bottom]
+        if region.size == 0:
+            return None
+        corners = [region[0, 0], region[0, -1], region[-1, 0], region[-1, -1]]
+        border = max(set(corners), key=corners.count)
+        deviating = np.abs(region - border) > self.tolerance
+
+        rows = self._content_span(deviating)
+        columns = self._content_span(deviating.T)
+        if rows is None or columns is None:
+            return None
+
+        left = max(0, columns[0] - self.padding)
+        right = min(width, columns[1] + self.padding)
+        bottom = min(bottom, top + rows[1] + self.padding)
+        top = max(top, top + rows[0] - self.padding)
+
+        if (right - left) * (bottom - top) > (1 - self.min_saving) * width * height:
+            return None
+        return left, top, right, bottom
@@ -0,0 +1,249 @@
+import os
+import io
+import json
+import base64
+import tempfile
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+from PIL import Image
+
+def compute_dhash(image: Image.Image, hash_size: int = 8) -> int:
+    """
+    Compute difference hash (dHash) of an image
+
+    Args:
+        image: PIL Image object
+        hash_size: Hash grid size (hash_size^2 bits)
+
+    Returns:
+        Hash as integer
+    """
+    gray = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    pixels = list(gray.getdata())
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (1 if pixels[offset + col] > pixels[offset + col + 1] else 0)
+
+    return value
+
+def compute_dhash_from_base64(image_base64: str, hash_size: int = 8) -> int:
+    """Compute dHash of a base64 encoded image"""
+    image = Image.open(io.BytesIO(base64.b64decode(image_base64)))
+    return compute_dhash(image, hash_size)
+
+def hamming_distance(hash1: int, hash2: int) -> int:
+    """Number of differing bits between two hashes"""
+    return bin(hash1 ^ hash2).count("1")
+
+def is_exact_copy(entry: Optional[Dict[str, Any]], content_hash: Optional[str]) -> bool:
+    """
+    Whether an image is a byte-identical copy of an indexed image
+
+    A dHash match (even distance 0) only means the images look alike: screenshots with the
+    same layout but different text hash identically. Only the SHA-256 content hash proves
+    that two images are the same, so only then may a stored grade be reused.
+    """
+    return bool(entry is not None and content_hash and entry.get("content_hash") == content_hash)
+
+class ImageHashIndex:
+    """Persistent index of perceptual hashes of graded student images and their stage outputs"""
+
+    def __init__(self, index_path: str = "image_hash_index.json", max_distance: int = 4, max_entries: int = 5000):
+        """
+        Initialize hash index
+
+        Args:
+            index_path: Path to index JSON file
+            max_distance: Maximum Hamming distance for two images to count as near-duplicates
+            max_entries: Upper bound of indexed images; the least recently seen are evicted
+        """
+        self.index_path = index_path
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self.entries = self._load()
+        self._by_hash = {entry["_hash_int"]: entry for entry in self.entries}
+
+    def _load(self) -> List[Dict[str, Any]]:
+        """Load index entries from disk"""
+        if not os.path.exists(self.index_path):
+            return []
+
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Could not read image hash index {self.index_path}: {e}")
+            return []
+
+        entries = data.get("entries", [])
+        for entry in entries:
+            entry["_hash_int"] = int(entry["hash"], 16)
+            entry.setdefault("last_seen", entry.get("first_seen", ""))
+        return entries
+
+    def save(self):
+        """Write index to disk if it changed (atomic replace)"""
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = {
+                    "updated_at": datetime.now().isoformat(),
+                    "max_distance": self.max_distance,
+                    "entries": [
+                        {key: value for key, value in entry.items() if not key.startswith("_")}
+                        for entry in self.entries
+                    ]
+                }
+                self._dirty = False
+
+            # Unique temp file per save: concurrent evaluations never write into the same file
+            directory = os.path.dirname(os.path.abspath(self.index_path))
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(prefix=".image_hash_index_", suffix=".tmp", dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(temp_path, self.index_path)
+            except Exception:
+                with self._lock:
+                    self._dirty = True
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+    def find(self, image_hash: int) -> Tuple[Optional[Dict[str, Any]], int]:
+        """
+        Find closest previously graded image within max_distance
+
+        Returns:
+            Tuple of (entry or None, hamming distance)
+        """
+        best_entry = None
+        best_distance = self.max_distance + 1
+
+        with self._lock:
+            exact = self._by_hash.get(image_hash)
+            if exact is not None:
+                return exact, 0
+
+            for entry in self.entries:
+                distance = hamming_distance(image_hash, entry["_hash_int"])
+                if distance < best_distance:
+                    best_entry, best_distance = entry, distance
+                    if distance == 0:
+                        break
+
+        if best_entry is None:
+            return None, -1
+        return best_entry, best_distance
+
+    def add(self, image_hash: int, pdf_path: str, filename: str, content_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Register a new graded image (evicts the least recently seen images beyond max_entries)
+
+        Args:
+            image_hash: dHash of the image
+            pdf_path: Submission the image came from
+            filename: Image filename within the submission
+            content_hash: SHA-256 of the encoded image bytes (exact-copy check)
+
+        Returns:
+            New index entry (stage outputs are filled in via record_stage)
+        """
+        now = datetime.now().isoformat()
+        entry = {
+            "hash": f"{image_hash:016x}",
+            "_hash_int": image_hash,
+            "content_hash": content_hash,
+            "pdf_path": pdf_path,
+            "filename": filename,
+            "first_seen": now,
+            "last_seen": now,
+            "occurrences": [{"pdf_path": pdf_path, "filename": filename, "timestamp": now, "distance": 0}],
+            "stages": {}
+        }
+        with self._lock:
+            self.entries.append(entry)
+            self._by_hash.setdefault(image_hash, entry)
+            if len(self.entries) > self.max_entries:
+                self.entries.sort(key=lambda item: item["last_seen"])
+                for evicted in self.entries[:len(self.entries) - self.max_entries]:
+                    if self._by_hash.get(evicted["_hash_int"]) is evicted:
+                        del self._by_hash[evicted["_hash_int"]]
+                del self.entries[:len(self.entries) - self.max_entries]
+            self._dirty = True
+        return entry
+
+    def record_occurrence(self, entry: Dict[str, Any], pdf_path: str, filename: str, distance: int):
+        """Record that an image was seen again (near-duplicate report)"""
+        with self._lock:
+            now = datetime.now().isoformat()
+            entry["last_seen"] = now
+            entry["occurrences"].append({
+                "pdf_path": pdf_path,
+                "filename": filename,
+                "timestamp": now,
+                "distance": distance
+            })
+            self._dirty = True
+
+    def record_stage(self, entry: Dict[str, Any], stage: str, output: Any):
+        """
+        Store output of a pipeline stage for reuse
+
+        Args:
+            entry: Index entry
+            stage: Stage key ("classification", "evaluability" or "evaluation:<reference key>")
+            output: JSON-serializable stage output
+        """
+        with self._lock:
+            entry["stages"][stage] = output
+            self._dirty = True
+
+    def near_duplicate_report(self) -> List[Dict[str, Any]]:
+        """
+        Images that appeared in more than one submission
+
+        Returns:
+            List of duplicate groups, largest first
+        """
+        report = []
+
+        with self._lock:
+            for entry in self.entries:
+                submissions = sorted({occ["pdf_path"] for occ in entry["occurrences"]})
+                if len(submissions) < 2:
+                    continue
+                report.append({
+                    "hash": entry["hash"],
+                    "filename": entry["filename"],
+                    "submission_count": len(submissions),
+                    "submissions": submissions,
+                    "occurrences": list(entry["occurrences"])
+                })
+
+        report.sort(key=lambda group: group["submission_count"], reverse=True)
+        return report
+
+# Command line interface
+if __name__ == "__main__":
+    import sys
+
+    index_path = sys.argv[1] if len(sys.argv) > 1 else "image_hash_index.json"
+    index = ImageHashIndex(index_path)
+    report = index.near_duplicate_report()
+
+    print(f"Indexed images: {len(index.entries)}")
+    print(f"Near-duplicate groups: {len(report)}")
+    for group in report:
+        print(f"\n{group['hash']} ({group['filename']}): {group['submission_count']} submissions")
+        for occurrence in group["occurrences"]:
+            print(f"   - {occurrence['pdf_path']} / {occurrence['filename']} (distance {occurrence['distance']})")
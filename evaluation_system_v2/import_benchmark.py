@@ -0,0 +1,112 @@
+"""
+Import-time benchmark for the evaluation system modules
+
+Every module is imported in a fresh interpreter with -X importtime; the report
+shows the cumulative import time and the heaviest packages it pulls in.
+
+Usage:
+    python import_benchmark.py                      # default module list
+    python import_benchmark.py qwen_client app      # selected modules
+    python import_benchmark.py --runs 5             # median of 5 runs per module
+"""
+
+import os
+import sys
+import subprocess
+from typing import Dict, List, Any
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(MODULE_DIR)
+
+DEFAULT_MODULES = [
+    "evaluation_system_v2", "result_store", "model_registry", "qwen_client", "classifier_service",
+    "preprocessing", "reference_set", "metadata_generator", "pdf_processor", "evaluation_engine",
+    "image_classifier"
+]
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """
+    Parse -X importtime output
+
+    Returns:
+        Entries with module name, depth, self_us and cumulative_us in import order
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        stripped = name.lstrip()
+        entries.append({
+            "module": stripped.strip(),
+            "depth": (len(name) - len(stripped) - 1) // 2,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us)
+        })
+    return entries
+
+def measure_import(module: str, runs: int = 1) -> Dict[str, Any]:
+    """
+    Import a module in fresh interpreters
+
+    Args:
+        module: Module name (evaluation_system_v2 modules, or the package itself)
+        runs: Number of interpreters started; the median run is reported
+
+    Returns:
+        Dictionary with module, milliseconds (cumulative import time), its three
+        heaviest direct imports and error (if the import failed)
+    """
+    code = f"import sys; sys.path.insert(0, {MODULE_DIR!r}); import {module}"
+    measurements = []
+
+    for _ in range(runs):
+        process = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=PROJECT_DIR,
+                                 capture_output=True, text=True)
+        if process.returncode != 0:
+            return {"module": module, "milliseconds": None, "heaviest": [], "error": process.stderr.strip().splitlines()[-1]}
+
+        entries = parse_importtime(process.stderr)
+        position = max(i for i, entry in enumerate(entries) if entry["depth"] == 0 and entry["module"] == module)
+
+        # Entries are listed after their imports: the direct imports of the module are the
+        # depth-1 entries between the previous top-level entry and the module itself
+        children = []
+        for entry in reversed(entries[:position]):
+            if entry["depth"] == 0:
+                break
+            if entry["depth"] == 1:
+                children.append(entry)
+        measurements.append((entries[position]["cumulative_us"], children))
+
+    measurements.sort(key=lambda item: item[0])
+    total_us, children = measurements[len(measurements) // 2]
+
+    children.sort(key=lambda entry: entry["cumulative_us"], reverse=True)
+    return {
+        "module": module,
+        "milliseconds": round(total_us / 1000, 1),
+        "heaviest": [(entry["module"], round(entry["cumulative_us"] / 1000, 1)) for entry in children[:3]],
+        "error": None
+    }
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    runs = 1
+    if "--runs" in args:
+        position = args.index("--runs")
+        runs = int(args[position + 1])
+        del args[position:position + 2]
+
+    modules = args or DEFAULT_MODULES
+    results = [measure_import(module, runs) for module in modules]
+
+    print(f"{'Module':24} {'Import [ms]':>12}  Heaviest dependencies")
+    print("-" * 80)
+    for result in results:
+        if result["error"]:
+            print(f"{result['module']:24} {'failed':>12}  {result['error']}")
+            continue
+        heaviest = ", ".join(f"{name} {ms:.0f}" for name, ms in result["heaviest"])
+        print(f"{result['module']:24} {result['milliseconds']:12.1f}  {heaviest}")
+    print(f"\n(median of {runs} run(s); cumulative import time including module-level code)")
@@ -1,35 +1,105 @@
 import os
 import json
+import time
+import queue
 import base64
-from typing import Dict, List, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional
 from datetime import datetime
-from qwen_client import QwenClient
-from image_classifier import ImageClassifier
+from model_registry import get_classifier, get_qwen_client
+from embedding_index import EmbeddingIndex
+from result_store import hash_image_bytes
+import numpy as np
 import glob
 
+def template_version(category: str) -> str:
+    """Fingerprint of a category's metadata template (entries made with another prompt are regenerated)"""
+    from metadata_templates import metadata_templates
+    return hash_image_bytes(metadata_templates.get(category, "").encode("utf-8"))[:12]
+
+def normalize_path(path: str) -> str:
+    """Comparable form of a stored file path (databases created on Windows use backslashes)"""
+    return os.path.normpath(path.replace("\\", "/"))
+
+class ProgressReporter:
+    """Thread-safe progress, throughput and ETA output for long generation runs"""
+    
+    def __init__(self, total: int):
+        """
+        Initialize reporter
+        
+        Args:
+            total: Number of items to process
+        """
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.start = time.time()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _format_seconds(seconds: float) -> str:
+        seconds = int(seconds)
+        return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    
+    def update(self, name: str, error: Optional[str] = None):
+        """Report one finished item"""
+        with self._lock:
+            self.done += 1
+            self.failed += error is not None
+            elapsed = time.time() - self.start
+            rate = self.done / elapsed if elapsed > 0 else 0.0
+            eta = (self.total - self.done) / rate if rate > 0 else 0.0
+            status = f"❌ {error}" if error else "✅"
+            print(f"[{self.done}/{self.total}] {name} {status} | {rate * 60:.1f} img/min | ETA {self._format_seconds(eta)}")
+    
+    def finish(self):
+        """Report totals"""
+        elapsed = time.time() - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        print(f"Processed {self.done} images ({self.failed} failed) in {self._format_seconds(elapsed)} "
+              f"({rate * 60:.1f} img/min)")
+
 class MetadataGenerator:
     """Generate metadata database for reference solutions"""
     
     def __init__(self, reference_images_path: str = "../dataset/mapped_train", 
-                 output_path: str = "metadata_database.json"):
+                 output_path: str = "metadata_database.json", max_in_flight: int = 1,
+                 qwen_urls: Optional[List[str]] = None):
         """
         Initialize metadata generator
         
         Args:
             reference_images_path: Path to reference images directory
             output_path: Output path for metadata database
+            max_in_flight: Metadata extraction requests kept in flight per Qwen server
+                           (1 = sequential; the server runs threaded)
+            qwen_urls: Qwen servers to spread the requests over (default: localhost:5000)
         """
         self.reference_path = reference_images_path
         self.output_path = output_path
-        self.qwen_client = QwenClient()
-        self.classifier = ImageClassifier()
+        self.max_in_flight = max(1, max_in_flight)
+        self.classifier = get_classifier()
+        
+        # Reference embeddings computed during generation (file_path -> vector)
+        self._embedding_cache = {}
         
-        # Check if Qwen server is available
-        health = self.qwen_client.health_check()
-        if not health.get("model_loaded", False):
+        # Check which Qwen servers are available
+        self.qwen_clients = []
+        for url in qwen_urls or ["http://localhost:5000"]:
+            client = get_qwen_client(url)
+            if client.health_check().get("model_loaded", False):
+                self.qwen_clients.append(client)
+            else:
+                print(f"⚠️ Qwen server {url} is not available, skipped")
+        
+        if not self.qwen_clients:
             raise Exception("Qwen server is not available or model not loaded")
+        self.qwen_client = self.qwen_clients[0]
         
-        print("Metadata Generator initialized")
+        print(f"Metadata Generator initialized ({len(self.qwen_clients)} Qwen server(s), "
+              f"{self.max_in_flight} request(s) in flight each)")
     
     def _image_to_base64(self, image_path: str) -> str:
         """Convert image file to base64"""
@@ -46,78 +116,158 @@ class MetadataGenerator:
         
         return image_files
     
-    def generate_category_metadata(self, category: str) -> Dict[str, Any]:
+    def _extract_image_metadata(self, image_path: str, category: str, prediction: Dict[str, Any],
+                                qwen_client) -> Dict[str, Any]:
         """
-        Generate metadata for all images in a category
+        Metadata entry of one reference image
         
         Args:
-            category: Category name (e.g., 'Excel-Tabelle')
+            image_path: Reference image file
+            category: Category of the reference directory
+            prediction: batch_predict result of the image (with embedding)
+            qwen_client: Client of the Qwen server to use
             
         Returns:
-            Dictionary with category metadata
+            Image metadata entry (the embedding is stored in the embedding cache)
         """
-        category_path = os.path.join(self.reference_path, category)
+        if prediction["status"] != "success":
+            raise Exception(prediction["error"])
+        predicted_class, confidence, embedding = prediction["predicted_class"], prediction["confidence"], prediction["embedding"]
+        
+        # Convert to base64
+        with open(image_path, "rb") as image_file:
+            image_bytes = image_file.read()
+        image_base64 = base64.b64encode(image_bytes).decode()
         
-        if not os.path.exists(category_path):
-            raise FileNotFoundError(f"Category path not found: {category_path}")
+        # For reference solutions: process ALL images regardless of confidence
+        # Confidence filtering only applies to student submissions during evaluation
         
-        image_files = self._get_image_files(category_path)
+        if predicted_class != category:
+            print(f"Category mismatch for {os.path.basename(image_path)}: predicted {predicted_class}, expected {category}")
+            # Continue anyway - reference solutions are pre-categorized correctly
         
-        if not image_files:
-            print(f"No images found in {category}")
-            return {"category": category, "images": [], "count": 0}
+        # Extract metadata with Qwen
+        metadata_result = qwen_client.extract_metadata(image_base64, category)
         
-        print(f"Processing {len(image_files)} images in {category}...")
+        if metadata_result.get("status") != "success":
+            raise Exception(f"Metadata extraction failed: {metadata_result.get('error')}")
         
-        category_metadata = {
-            "category": category,
-            "images": [],
-            "count": len(image_files),
-            "generated_at": datetime.now().isoformat()
+        self._embedding_cache[image_path] = embedding
+        return {
+            "filename": os.path.basename(image_path),
+            "file_path": image_path,
+            "predicted_class": predicted_class,
+            "confidence": confidence,
+            "metadata": metadata_result.get("metadata", {}),
+            "processed_at": datetime.now().isoformat(),
+            "content_sha256": hash_image_bytes(image_bytes),
+            "template_version": template_version(category)
         }
+    
+    def _process_images(self, jobs: List[tuple]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Classify images and extract their metadata
+        
+        Images are classified per category in batches up front; the Qwen requests then
+        run with max_in_flight requests per server, across category boundaries.
         
-        for i, image_path in enumerate(image_files):
+        Args:
+            jobs: (category, image_path) pairs
+            
+        Returns:
+            Image metadata entries in job order (None where processing failed)
+        """
+        # Verify category with classifier (for reference only, no filtering)
+        # Batched forward passes per category (same batches, hence same scores as
+        # sequential generation); the same pass yields the embedding for the reference index
+        print(f"Classifying {len(jobs)} images...")
+        predictions = {}
+        for category in dict.fromkeys(category for category, _ in jobs):
+            positions = [i for i, (job_category, _) in enumerate(jobs) if job_category == category]
+            category_predictions = self.classifier.batch_predict([jobs[i][1] for i in positions], return_embeddings=True)
+            predictions.update(zip(positions, category_predictions))
+        
+        # One slot per request that may be in flight; a slot names the server to send to
+        slots = queue.Queue()
+        for _ in range(self.max_in_flight):
+            for client in self.qwen_clients:
+                slots.put(client)
+        
+        entries = [None] * len(jobs)
+        progress = ProgressReporter(len(jobs))
+        
+        def process(i):
+            category, image_path = jobs[i]
+            client = slots.get()
             try:
-                print(f"Processing {i+1}/{len(image_files)}: {os.path.basename(image_path)}")
-                
-                # Convert to base64
-                image_base64 = self._image_to_base64(image_path)
-                
-                # Verify category with classifier (for reference only, no filtering)
-                predicted_class, confidence, is_valid = self.classifier.predict_from_base64(image_base64)
-                
-                # For reference solutions: process ALL images regardless of confidence
-                # Confidence filtering only applies to student submissions during evaluation
-                
-                if predicted_class != category:
-                    print(f"Category mismatch: predicted {predicted_class}, expected {category}")
-                    # Continue anyway - reference solutions are pre-categorized correctly
-                
-                # Extract metadata with Qwen
-                metadata_result = self.qwen_client.extract_metadata(image_base64, category)
-                
-                if metadata_result.get("status") != "success":
-                    print(f"Metadata extraction failed: {metadata_result.get('error')}")
-                    continue
-                
-                # Store image metadata
-                image_metadata = {
-                    "filename": os.path.basename(image_path),
-                    "file_path": image_path,
-                    "predicted_class": predicted_class,
-                    "confidence": confidence,
-                    "metadata": metadata_result.get("metadata", {}),
-                    "processed_at": datetime.now().isoformat()
-                }
-                
-                category_metadata["images"].append(image_metadata)
-                print(f"Metadata extracted successfully")
-                
+                entries[i] = self._extract_image_metadata(image_path, category, predictions[i], client)
+                progress.update(f"{category}/{os.path.basename(image_path)}")
             except Exception as e:
-                print(f"Error processing {image_path}: {str(e)}")
+                progress.update(f"{category}/{os.path.basename(image_path)}", error=str(e))
+            finally:
+                slots.put(client)
+        
+        print(f"Extracting metadata for {len(jobs)} images...")
+        with ThreadPoolExecutor(max_workers=self.max_in_flight * len(self.qwen_clients)) as pool:
+            list(pool.map(process, range(len(jobs))))
+        progress.finish()
+        return entries
+    
+    def _generate_categories(self, categories: List[str]) -> Dict[str, Any]:
+        """
+        Generate metadata for several categories with one shared request pipeline
+        
+        Args:
+            categories: Category names
+            
+        Returns:
+            Dictionary category -> category metadata (entries in directory order), or
+            the exception that prevented processing the category
+        """
+        results = {}
+        files = {}
+        
+        for category in categories:
+            category_path = os.path.join(self.reference_path, category)
+            if not os.path.exists(category_path):
+                results[category] = FileNotFoundError(f"Category path not found: {category_path}")
                 continue
+            
+            files[category] = self._get_image_files(category_path)
+            if not files[category]:
+                print(f"No images found in {category}")
+            
+            results[category] = {
+                "category": category,
+                "images": [],
+                "count": len(files[category]),
+                "generated_at": datetime.now().isoformat()
+            }
+        
+        jobs = [(category, image_path) for category, image_files in files.items() for image_path in image_files]
+        
+        # Failed images are left out, as in sequential processing
+        for (category, _), entry in zip(jobs, self._process_images(jobs)):
+            if entry is not None:
+                results[category]["images"].append(entry)
         
-        print(f"Completed {category}: {len(category_metadata['images'])} images processed")
+        for category in files:
+            print(f"Completed {category}: {len(results[category]['images'])} images processed")
+        return results
+    
+    def generate_category_metadata(self, category: str) -> Dict[str, Any]:
+        """
+        Generate metadata for all images in a category
+        
+        Args:
+            category: Category name (e.g., 'Excel-Tabelle')
+            
+        Returns:
+            Dictionary with category metadata
+        """
+        category_metadata = self._generate_categories([category])[category]
+        if isinstance(category_metadata, Exception):
+            raise category_metadata
         return category_metadata
     
     def generate_full_database(self) -> Dict[str, Any]:
@@ -136,20 +286,19 @@ class MetadataGenerator:
             "version": "1.0"
         }
         
-        for category in categories:
-            try:
-                category_metadata = self.generate_category_metadata(category)
-                database["categories"][category] = category_metadata
-                database["total_images"] += len(category_metadata.get("images", []))
-                
-            except Exception as e:
-                print(f" Failed to process category {category}: {str(e)}")
+        for category, category_metadata in self._generate_categories(categories).items():
+            if isinstance(category_metadata, Exception):
+                print(f" Failed to process category {category}: {str(category_metadata)}")
                 database["categories"][category] = {
                     "category": category,
                     "images": [],
                     "count": 0,
-                    "error": str(e)
+                    "error": str(category_metadata)
                 }
+                continue
+            
+            database["categories"][category] = category_metadata
+            database["total_images"] += len(category_metadata.get("images", []))
         
         return database
     
@@ -175,8 +324,61 @@ class MetadataGenerator:
         print(f"Total categories: {len(database['categories'])}")
         print(f"Total images: {database['total_images']}")
         
+        self.save_embedding_index(database)
+        
         return self.output_path
     
+    def save_embedding_index(self, database: Dict[str, Any]) -> str:
+        """
+        Save EfficientNet embeddings of all reference images as one .npy matrix per category
+        
+        Rows follow the order of each category's "images" list. Embeddings computed
+        during generation are reused; missing ones are computed from the image file.
+        
+        Args:
+            database: Metadata database
+            
+        Returns:
+            Path to embedding index directory
+        """
+        embeddings = {}
+        filenames = {}
+        content_hashes = {}
+        
+        for category, category_data in database.get("categories", {}).items():
+            images = category_data.get("images", [])
+            
+            # Missing embeddings are computed in batched forward passes
+            missing = [img for img in images if img.get("file_path", "") not in self._embedding_cache]
+            predictions = self.classifier.batch_predict(
+                [img.get("file_path", "").replace("\\", "/") for img in missing], return_embeddings=True
+            )
+            for image_metadata, prediction in zip(missing, predictions):
+                if prediction["status"] == "success":
+                    self._embedding_cache[image_metadata.get("file_path", "")] = prediction["embedding"]
+                else:
+                    print(f"Embedding failed for {image_metadata.get('filename')}: {prediction['error']}")
+            
+            rows = [self._embedding_cache.get(img.get("file_path", "")) for img in images]
+            
+            dims = [row.shape[0] for row in rows if row is not None]
+            if not dims:
+                continue
+            
+            # Unreadable references get a zero row so row indices stay aligned
+            matrix = np.zeros((len(rows), dims[0]), dtype=np.float32)
+            for i, row in enumerate(rows):
+                if row is not None:
+                    matrix[i] = row
+            
+            embeddings[category] = matrix
+            filenames[category] = [img.get("filename") for img in images]
+            content_hashes[category] = [img.get("content_sha256") for img in images]
+        
+        index_dir = EmbeddingIndex.save(self.output_path, embeddings, filenames, content_hashes)
+        print(f"Embedding index saved to: {index_dir}")
+        return index_dir
+    
     def load_database(self) -> Dict[str, Any]:
         """
         Load existing metadata database
@@ -193,9 +395,38 @@ class MetadataGenerator:
         print(f"Loaded metadata database: {database['total_images']} images")
         return database
     
+    def _load_previous_embeddings(self, database: Dict[str, Any]):
+        """
+        Put the embedding rows of an existing database into the embedding cache
+        
+        Rows are only used if the stored index lines up with the database entries.
+        """
+        index_dir = EmbeddingIndex.get_index_dir(self.output_path)
+        try:
+            with open(os.path.join(index_dir, "index.json"), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        
+        for category, entry in manifest.get("categories", {}).items():
+            images = database.get("categories", {}).get(category, {}).get("images", [])
+            if not EmbeddingIndex.manifest_matches(entry, images):
+                continue
+            try:
+                matrix = np.load(os.path.join(index_dir, entry["file"]))
+            except (OSError, ValueError):
+                continue
+            for image_metadata, row in zip(images, matrix):
+                self._embedding_cache.setdefault(image_metadata.get("file_path", ""), row)
+    
     def update_database(self) -> str:
         """
-        Update existing database with new images
+        Update existing database incrementally
+        
+        Reference files are identified by content hash: entries whose hash, category and
+        template version are unchanged are kept (renamed / moved files included), only new
+        or changed images are processed, and entries of deleted files are pruned. Entries
+        of older databases without a hash are matched once by file path.
         
         Returns:
             Path to updated database
@@ -207,37 +438,191 @@ class MetadataGenerator:
             print("Creating new database...")
             return self.save_database()
         
-        # Generate new database
-        new_db = self.generate_full_database()
+        self._load_previous_embeddings(existing_db)
+        
+        changes = {"added": [], "changed": [], "template_changed": [], "removed": [], "failed": []}
+        counts = {"unchanged": 0, "moved": 0, "adopted": 0}
+        categories = {}
+        jobs = []
+        
+        def diff_size():
+            return sum(len(names) for names in changes.values()) + counts["moved"]
+        
+        for category in self.classifier.class_names:
+            old_category = existing_db.get("categories", {}).get(category, {})
+            old_entries = old_category.get("images", [])
+            category_path = os.path.join(self.reference_path, category)
+            
+            if not os.path.exists(category_path):
+                print(f" Failed to process category {category}: Category path not found: {category_path}")
+                categories[category] = {"category": category, "images": [], "count": 0,
+                                        "error": f"Category path not found: {category_path}"}
+                changes["removed"].extend(f"{category}/{entry.get('filename')}" for entry in old_entries)
+                continue
+            
+            version = template_version(category)
+            diff_before = diff_size()
+            by_hash, by_path = {}, {}
+            for entry in old_entries:
+                by_path[normalize_path(entry.get("file_path", ""))] = entry
+                if "content_sha256" in entry:
+                    by_hash.setdefault(entry["content_sha256"], []).append(entry)
+            
+            image_files = self._get_image_files(category_path)
+            digests = []
+            for image_path in image_files:
+                with open(image_path, "rb") as image_file:
+                    digests.append(hash_image_bytes(image_file.read()))
+            
+            # Pass 1: same content at the same path; entries without hash are trusted for the
+            # file at their path. Pass 2: same content elsewhere (renamed, moved or copied files)
+            used = set()
+            matches = [None] * len(image_files)
+            for row, (image_path, digest) in enumerate(zip(image_files, digests)):
+                at_path = by_path.get(normalize_path(image_path))
+                if at_path is None:
+                    continue
+                if at_path.get("content_sha256") == digest:
+                    matches[row] = at_path
+                elif "content_sha256" not in at_path:
+                    matches[row] = dict(at_path, content_sha256=digest, template_version=version)
+                    counts["adopted"] += 1
+                else:
+                    continue
+                used.add(id(at_path))
+            
+            for row, digest in enumerate(digests):
+                if matches[row] is None:
+                    matches[row] = next((entry for entry in by_hash.get(digest, []) if id(entry) not in used), None)
+                    if matches[row] is not None:
+                        used.add(id(matches[row]))
+            
+            slots = [None] * len(image_files)
+            for row, (image_path, previous) in enumerate(zip(image_files, matches)):
+                name = f"{category}/{os.path.basename(image_path)}"
+                
+                if previous is not None and previous.get("template_version") == version:
+                    if normalize_path(previous.get("file_path", "")) != normalize_path(image_path):
+                        counts["moved"] += 1
+                        if previous.get("file_path") in self._embedding_cache:
+                            self._embedding_cache[image_path] = self._embedding_cache[previous["file_path"]]
+                    else:
+                        counts["unchanged"] += 1
+                    slots[row] = dict(previous, filename=os.path.basename(image_path), file_path=image_path)
+                    continue
+                
+                # Processed again; the stale entry it replaces does not count as removed
+                at_path = by_path.get(normalize_path(image_path))
+                if previous is not None:
+                    changes["template_changed"].append(name)
+                elif at_path is not None and id(at_path) not in used:
+                    changes["changed"].append(name)
+                    used.add(id(at_path))
+                else:
+                    changes["added"].append(name)
+                    duplicate = next((entry for entry in by_hash.get(digests[row], [])
+                                      if entry.get("template_version") == version), None)
+                    if duplicate is not None:
+                        # Copy of another reference: same metadata, no request needed
+                        slots[row] = dict(duplicate, filename=os.path.basename(image_path), file_path=image_path)
+                        if duplicate.get("file_path") in self._embedding_cache:
+                            self._embedding_cache[image_path] = self._embedding_cache[duplicate["file_path"]]
+                        continue
+                self._embedding_cache.pop(image_path, None)
+                jobs.append((category, image_path, row))
+            
+            changes["removed"].extend(f"{category}/{entry.get('filename')}" for entry in old_entries if id(entry) not in used)
+            
+            touched = diff_size() != diff_before
+            categories[category] = {
+                "category": category,
+                "images": slots,
+                "count": len(image_files),
+                "generated_at": datetime.now().isoformat() if touched else old_category.get("generated_at", datetime.now().isoformat())
+            }
+        
+        if jobs:
+            entries = self._process_images([(category, image_path) for category, image_path, _ in jobs])
+            for (category, image_path, row), entry in zip(jobs, entries):
+                categories[category]["images"][row] = entry
+                if entry is None:
+                    changes["failed"].append(f"{category}/{os.path.basename(image_path)}")
+        
+        total_images = 0
+        for category_metadata in categories.values():
+            category_metadata["images"] = [entry for entry in category_metadata["images"] if entry is not None]
+            total_images += len(category_metadata["images"])
         
-        # Merge with existing (new data takes precedence)
+        # generated_at identifies the reference content (ReferenceSet.key, reuse of stored
+        # evaluations): it only changes if references were added, changed or removed
+        content_changed = any(changes[key] for key in ("added", "changed", "template_changed", "removed", "failed"))
         updated_db = {
-            "generated_at": new_db["generated_at"],
-            "categories": new_db["categories"],
-            "total_images": new_db["total_images"],
+            "generated_at": existing_db.get("generated_at") if not content_changed and existing_db.get("generated_at") else datetime.now().isoformat(),
+            "categories": categories,
+            "total_images": total_images,
             "version": "1.0",
-            "previous_version": existing_db.get("generated_at")
+            "previous_version": existing_db.get("generated_at") if content_changed else existing_db.get("previous_version")
         }
         
+        # Diff summary
+        self.last_update_summary = dict(counts, **{key: len(names) for key, names in changes.items()})
+        print(f"Database update: {len(changes['added'])} added, {len(changes['changed'])} changed, "
+              f"{len(changes['template_changed'])} template changed, {len(changes['removed'])} removed, "
+              f"{counts['moved']} moved, {counts['unchanged']} unchanged, {len(changes['failed'])} failed"
+              + (f" ({counts['adopted']} entries without hash matched by path)" if counts["adopted"] else ""))
+        for symbol, key in (("+", "added"), ("~", "changed"), ("~", "template_changed"), ("-", "removed"), ("❌", "failed")):
+            for name in changes[key]:
+                print(f"   {symbol} {name}" + (" (template changed)" if key == "template_changed" else ""))
+        
+        if not content_changed and not counts["moved"] and not counts["adopted"]:
+            print(f"Metadata database is up to date: {self.output_path} not rewritten")
+            if EmbeddingIndex.load(self.output_path, existing_db).stale_categories:
+                self.save_embedding_index(existing_db)
+            return self.output_path
+        
         return self.save_database(updated_db)
 
+def parse_generation_options(args: List[str]) -> Dict[str, Any]:
+    """
+    Remove concurrency options from command line arguments
+    
+    Args:
+        args: Arguments; "--concurrency N" and "--qwen-url URL" (repeatable) are consumed
+        
+    Returns:
+        MetadataGenerator keyword arguments (max_in_flight, qwen_urls)
+    """
+    options = {}
+    while "--concurrency" in args:
+        position = args.index("--concurrency")
+        options["max_in_flight"] = int(args[position + 1])
+        del args[position:position + 2]
+    while "--qwen-url" in args:
+        position = args.index("--qwen-url")
+        options.setdefault("qwen_urls", []).append(args[position + 1])
+        del args[position:position + 2]
+    return options
+
 # Command line interface
 if __name__ == "__main__":
     import sys
     
-    generator = MetadataGenerator()
+    generator = MetadataGenerator(**parse_generation_options(sys.argv))
     
     if len(sys.argv) > 1:
         if sys.argv[1] == "generate":
             generator.save_database()
         elif sys.argv[1] == "update":
             generator.update_database()
+        elif sys.argv[1] == "embeddings":
+            generator.save_embedding_index(generator.load_database())
         elif sys.argv[1] == "category" and len(sys.argv) > 2:
             category = sys.argv[2]
             metadata = generator.generate_category_metadata(category)
             print(json.dumps(metadata, indent=2, ensure_ascii=False))
         else:
-            print("Usage: python metadata_generator.py [generate|update|category <name>]")
+            print("Usage: python metadata_generator.py [generate|update|embeddings|category <name>] "
+                  "[--concurrency N] [--qwen-url URL ...]")
     else:
         # Default: generate full database
         generator.save_database() 
\ No newline at end of file
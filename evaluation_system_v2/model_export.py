@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Export the EfficientNet classifier to ONNX and TorchScript
+
+Both exports take a [batch, 3, 224, 224] input with a dynamic batch axis and
+return (logits, embeddings), so ImageClassifier can run them as CPU backends.
+The ONNX export can be quantized to INT8 (static post-training quantization
+calibrated on the reference images), with a per-class accuracy report.
+
+Usage:
+    python model_export.py [model_path] [onnx|torchscript|all]
+    python model_export.py [model_path] int8 [calibration_dir] [report_dir]
+"""
+
+import os
+import glob
+import json
+import time
+import inspect
+import torch
+from datetime import datetime
+
+# Export file names are resolved by the classifier, which loads exports without importing torch
+from image_classifier import ImageClassifier, exported_path
+
+IMAGE_EXTENSIONS = ['*.jpg', '*.jpeg', '*.png', '*.bmp', '*.tiff']
+
+class ClassifierWithEmbeddings(torch.nn.Module):
+    """EfficientNet returning class logits and the pooled penultimate-layer embedding"""
+
+    def __init__(self, model: torch.nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, images: torch.Tensor):
+        features = self.model.avgpool(self.model.features(images))
+        embeddings = torch.flatten(features, 1)
+        return self.model.classifier(embeddings), embeddings
+
+def example_input(batch_size: int = 2) -> torch.Tensor:
+    """Deterministic input used for tracing and parity checks"""
+    generator = torch.Generator().manual_seed(0)
+    return torch.randn(batch_size, 3, 224, 224, generator=generator)
+
+def export_onnx(model: torch.nn.Module, output_path: str, opset: int = 17) -> str:
+    """
+    Export to ONNX with a dynamic batch axis
+
+    Args:
+        model: EfficientNet in eval mode (CPU)
+        output_path: Target .onnx file
+        opset: ONNX opset version
+
+    Returns:
+        Path to the exported model
+    """
+    options = {}
+    # Newer torch versions default to the torch.export based exporter (needs onnxscript)
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        options["dynamo"] = False
+
+    torch.onnx.export(
+        ClassifierWithEmbeddings(model).eval(),
+        (example_input(),),
+        output_path,
+        input_names=["input"],
+        output_names=["logits", "embeddings"],
+        dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}, "embeddings": {0: "batch"}},
+        opset_version=opset,
+        do_constant_folding=True,
+        **options
+    )
+    return output_path
+
+def export_torchscript(model: torch.nn.Module, output_path: str) -> str:
+    """
+    Export to TorchScript (traced; EfficientNet has no data-dependent control flow)
+
+    Args:
+        model: EfficientNet in eval mode (CPU)
+        output_path: Target .pt file
+
+    Returns:
+        Path to the exported model
+    """
+    with torch.inference_mode():
+        traced = torch.jit.trace(ClassifierWithEmbeddings(model).eval(), example_input())
+    traced.save(output_path)
+    return output_path
+
+def labelled_images(data_dir: str, class_names: list, per_class: int = None) -> list:
+    """
+    Image files of a dataset directory with one sub-directory per class
+
+    Args:
+        data_dir: Dataset root (e.g. ../dataset/mapped_train)
+        class_names: Classifier class names (sub-directory names)
+        per_class: Maximum images per class (evenly spaced over the sorted files)
+
+    Returns:
+        List of (image path, class index)
+    """
+    samples = []
+    for label, class_name in enumerate(class_names):
+        files = []
+        for ext in IMAGE_EXTENSIONS:
+            files.extend(glob.glob(os.path.join(data_dir, class_name, ext)))
+        files.sort()
+        if per_class and len(files) > per_class:
+            step = len(files) / per_class
+            files = [files[int(i * step)] for i in range(per_class)]
+        samples.extend((path, label) for path in files)
+    return samples
+
+def quantize_onnx(model_path: str = "./model/efficientnet_b0_best.pth",
+                  calibration_dir: str = "../dataset/mapped_train", per_class: int = 32,
+                  batch_size: int = 16) -> str:
+    """
+    Build the INT8 model: static post-training quantization of the ONNX export
+
+    Weights are quantized per channel, activations with ranges calibrated on
+    reference images (QDQ format). The classifier head stays in fp32 so the
+    six-class logits keep their scale.
+
+    Args:
+        model_path: Path to trained EfficientNet weights (the fp32 ONNX export is created if missing)
+        calibration_dir: Reference images, one sub-directory per class
+        per_class: Calibration images per class
+        batch_size: Images per calibration batch
+
+    Returns:
+        Path to the quantized model
+    """
+    import onnx
+    from onnxruntime.quantization import (
+        CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType, quantize_static
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    fp32_path = exported_path(model_path, "onnx")
+    if not os.path.exists(fp32_path):
+        export_model(model_path, ("onnx",))
+
+    classifier = ImageClassifier(model_path, backend="onnx", parity_tolerance=None)
+    samples = labelled_images(calibration_dir, classifier.class_names, per_class)
+    if not samples:
+        raise FileNotFoundError(f"No calibration images found in {calibration_dir}")
+    print(f"Calibrating on {len(samples)} images from {calibration_dir}")
+
+    class ReferenceImageReader(CalibrationDataReader):
+        """Preprocessed reference images in batches"""
+
+        def __init__(self):
+            self.batches = iter(range(0, len(samples), batch_size))
+
+        def get_next(self):
+            start = next(self.batches, None)
+            if start is None:
+                return None
+            inputs = [classifier._preprocess(path)[0] for path, _ in samples[start:start + batch_size]]
+            inputs = [item for item in inputs if item is not None]
+            return {"input": classifier._to_batch(inputs)} if inputs else self.get_next()
+
+    prepared_path = fp32_path.replace(".onnx", ".prep.onnx")
+    output_path = exported_path(model_path, "onnx-int8")
+    quant_pre_process(fp32_path, prepared_path)
+
+    head = [node.name for node in onnx.load(prepared_path).graph.node if node.op_type in ("Gemm", "MatMul")]
+    try:
+        quantize_static(
+            prepared_path, output_path, ReferenceImageReader(),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            nodes_to_exclude=head,
+            calibrate_method=CalibrationMethod.MinMax
+        )
+    finally:
+        os.remove(prepared_path)
+
+    print(f"Quantized model saved to: {output_path}")
+    return output_path
+
+def quantization_report(model_path: str = "./model/efficientnet_b0_best.pth",
+                        data_dir: str = "../dataset/mapped_train", per_class: int = None,
+                        output_path: str = None) -> dict:
+    """
+    Per-class accuracy of the INT8 model against the fp32 model
+
+    Args:
+        model_path: Path to trained EfficientNet weights (INT8 export must exist)
+        data_dir: Labelled images, one sub-directory per class
+        per_class: Maximum images per class (None = all)
+        output_path: Report JSON (default: next to the quantized model)
+
+    Returns:
+        Report dictionary with per-class accuracy, accuracy delta, prediction
+        agreement and the share of predictions above the confidence threshold
+    """
+
+    fp32 = ImageClassifier(model_path, backend="torch")
+    int8 = ImageClassifier(model_path, quantized=True, parity_tolerance=None)
+    samples = labelled_images(data_dir, fp32.class_names, per_class)
+    paths = [path for path, _ in samples]
+
+    predictions = {}
+    timings = {}
+    for name, classifier in (("fp32", fp32), ("int8", int8)):
+        start = time.time()
+        predictions[name] = classifier.batch_predict(paths)
+        timings[name] = (time.time() - start) / max(1, len(paths))
+
+    per_class = {}
+    for class_name in fp32.class_names:
+        per_class[class_name] = {"images": 0, "fp32_correct": 0, "int8_correct": 0,
+                                 "agreement": 0, "fp32_valid": 0, "int8_valid": 0}
+
+    for (path, label), p32, p8 in zip(samples, predictions["fp32"], predictions["int8"]):
+        stats = per_class[fp32.class_names[label]]
+        stats["images"] += 1
+        stats["fp32_correct"] += p32["predicted_class"] == fp32.class_names[label]
+        stats["int8_correct"] += p8["predicted_class"] == fp32.class_names[label]
+        stats["agreement"] += p32["predicted_class"] == p8["predicted_class"]
+        stats["fp32_valid"] += p32["is_valid"]
+        stats["int8_valid"] += p8["is_valid"]
+
+    def ratio(count, total):
+        return round(count / total, 4) if total else None
+
+    classes = {}
+    for class_name, stats in per_class.items():
+        n = stats["images"]
+        fp32_accuracy, int8_accuracy = ratio(stats["fp32_correct"], n), ratio(stats["int8_correct"], n)
+        classes[class_name] = {
+            "images": n,
+            "fp32_accuracy": fp32_accuracy,
+            "int8_accuracy": int8_accuracy,
+            "accuracy_delta": round(int8_accuracy - fp32_accuracy, 4) if n else None,
+            "agreement": ratio(stats["agreement"], n),
+            "fp32_valid_rate": ratio(stats["fp32_valid"], n),
+            "int8_valid_rate": ratio(stats["int8_valid"], n)
+        }
+
+    total = len(samples)
+    fp32_accuracy = ratio(sum(s["fp32_correct"] for s in per_class.values()), total)
+    int8_accuracy = ratio(sum(s["int8_correct"] for s in per_class.values()), total)
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "model_path": model_path,
+        "quantized_model": int8.export_path,
+        "data_dir": data_dir,
+        "confidence_threshold": fp32.confidence_threshold,
+        "images": total,
+        "fp32_accuracy": fp32_accuracy,
+        "int8_accuracy": int8_accuracy,
+        "accuracy_delta": round(int8_accuracy - fp32_accuracy, 4) if total else None,
+        "agreement": ratio(sum(s["agreement"] for s in per_class.values()), total),
+        "fp32_ms_per_image": round(timings["fp32"] * 1000, 2),
+        "int8_ms_per_image": round(timings["int8"] * 1000, 2),
+        "classes": classes
+    }
+
+    output_path = output_path or int8.export_path.replace(".onnx", ".report.json")
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print(f"{'Class':<24}{'Images':>8}{'fp32':>8}{'int8':>8}{'Delta':>8}{'Agree':>8}")
+    for class_name, stats in classes.items():
+        if stats["images"]:
+            print(f"{class_name:<24}{stats['images']:>8}{stats['fp32_accuracy']:>8.3f}{stats['int8_accuracy']:>8.3f}"
+                  f"{stats['accuracy_delta']:>+8.3f}{stats['agreement']:>8.3f}")
+    if total:
+        print(f"{'Total':<24}{total:>8}{fp32_accuracy:>8.3f}{int8_accuracy:>8.3f}"
+              f"{report['accuracy_delta']:>+8.3f}{report['agreement']:>8.3f}")
+    print(f"Latency: fp32 {report['fp32_ms_per_image']} ms/image, int8 {report['int8_ms_per_image']} ms/image")
+    print(f"Report saved to: {output_path}")
+    return report
+
+def export_model(model_path: str = "./model/efficientnet_b0_best.pth", backends: tuple = ("onnx", "torchscript")) -> dict:
+    """
+    Export trained weights to the given backends, then check parity by loading each export
+
+    Args:
+        model_path: Path to trained EfficientNet weights
+        backends: Any of "onnx", "torchscript"
+
+    Returns:
+        Mapping backend -> exported file path
+    """
+
+    classifier = ImageClassifier(model_path, backend="torch")
+    model = classifier.model.cpu().eval()
+
+    exported = {}
+    for backend in backends:
+        output_path = exported_path(model_path, backend)
+        if backend == "onnx":
+            export_onnx(model, output_path)
+        else:
+            export_torchscript(model, output_path)
+        print(f"Exported {backend} model to: {output_path}")
+
+        # Loading runs the parity check against the PyTorch logits and records it next to the export
+        ImageClassifier(model_path, backend=backend)
+        exported[backend] = output_path
+
+    return exported
+
+# Command line interface
+if __name__ == "__main__":
+    import sys
+
+    model_path = sys.argv[1] if len(sys.argv) > 1 else "./model/efficientnet_b0_best.pth"
+    target = sys.argv[2] if len(sys.argv) > 2 else "all"
+
+    if target == "all":
+        export_model(model_path)
+    elif target in ("onnx", "torchscript"):
+        export_model(model_path, (target,))
+    elif target == "int8":
+        calibration_dir = sys.argv[3] if len(sys.argv) > 3 else "../dataset/mapped_train"
+        report_dir = sys.argv[4] if len(sys.argv) > 4 else calibration_dir
+        quantize_onnx(model_path, calibration_dir)
+        quantization_report(model_path, report_dir)
+    else:
+        print("Usage: python model_export.py [model_path] [onnx|torchscript|all]")
+        print("       python model_export.py [model_path] int8 [calibration_dir] [report_dir]")
@@ -0,0 +1,168 @@
+import os
+import time
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Callable, Optional
+
+class ModelRegistry:
+    """Process-wide registry handing out one shared instance per model kind and configuration"""
+
+    def __init__(self):
+        """Initialize empty registry (factories are added with register())"""
+        self._factories = {}
+        self._instances = {}
+        self._stats = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, kind: str, factory: Callable[..., Any]):
+        """
+        Register how instances of a kind are created
+
+        Args:
+            kind: Model kind (e.g. "classifier")
+            factory: Callable building an instance from keyword configuration
+        """
+        with self._lock:
+            self._factories[kind] = factory
+
+    @staticmethod
+    def _make_key(kind: str, config: Dict[str, Any]) -> tuple:
+        return (kind, tuple(sorted(config.items())))
+
+    def get(self, kind: str, **config) -> Any:
+        """
+        Shared instance for a configuration, created on first use
+
+        Concurrent first calls for the same configuration wait for a single load;
+        loads of different configurations do not block each other.
+
+        Args:
+            kind: Registered model kind
+            **config: Keyword arguments for the factory (must be hashable)
+
+        Returns:
+            Shared instance
+        """
+        key = self._make_key(kind, config)
+
+        with self._lock:
+            instance = self._instances.get(key)
+            if instance is not None:
+                self._stats[key]["requests"] += 1
+                return instance
+            if kind not in self._factories:
+                raise KeyError(f"Unknown model kind: {kind}")
+            factory = self._factories[kind]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                instance = self._instances.get(key)
+                if instance is not None:
+                    self._stats[key]["requests"] += 1
+                    return instance
+
+            start = time.time()
+            instance = factory(**config)
+            load_seconds = time.time() - start
+
+            memory = getattr(instance, "memory_bytes", None)
+            with self._lock:
+                self._instances[key] = instance
+                self._stats[key] = {
+                    "kind": kind,
+                    "config": dict(config),
+                    "loaded_at": datetime.now().isoformat(),
+                    "load_seconds": round(load_seconds, 3),
+                    "warmup_seconds": None,
+                    "memory_bytes": memory() if callable(memory) else None,
+                    "requests": 1
+                }
+            print(f"Model registry: loaded {kind} in {load_seconds:.2f}s")
+            return instance
+
+    def warm_up(self, kind: str, **config) -> Any:
+        """
+        Load an instance and run its warm-up (first inference allocates buffers / kernels)
+
+        Returns:
+            Shared instance
+        """
+        instance = self.get(kind, **config)
+        warm_up = getattr(instance, "warm_up", None)
+
+        if callable(warm_up):
+            start = time.time()
+            warm_up()
+            with self._lock:
+                stats = self._stats.get(self._make_key(kind, config))
+                if stats is not None:
+                    stats["warmup_seconds"] = round(time.time() - start, 3)
+        return instance
+
+    def is_loaded(self, kind: str, **config) -> bool:
+        """Whether an instance for the configuration exists"""
+        with self._lock:
+            return self._make_key(kind, config) in self._instances
+
+    def release(self, kind: Optional[str] = None):
+        """Drop instances (of one kind, or all) so their memory can be reclaimed"""
+        with self._lock:
+            for key in [key for key in self._instances if kind is None or key[0] == kind]:
+                del self._instances[key]
+                del self._stats[key]
+
+    def memory_report(self) -> List[Dict[str, Any]]:
+        """
+        Loaded instances with load / warm-up time, model memory and request count
+
+        Returns:
+            List of entries, largest memory first
+        """
+        with self._lock:
+            report = [dict(stats) for stats in self._stats.values()]
+        report.sort(key=lambda entry: entry["memory_bytes"] or 0, reverse=True)
+        return report
+
+    def total_memory_bytes(self) -> int:
+        """Sum of the memory reported by loaded instances"""
+        return sum(entry["memory_bytes"] or 0 for entry in self.memory_report())
+
+def _create_classifier(**config):
+    from image_classifier import ImageClassifier
+    return ImageClassifier(**config)
+
+def _create_qwen_client(**config):
+    from qwen_client import QwenClient
+    return QwenClient(**config)
+
+# Shared by everything running in this process
+REGISTRY = ModelRegistry()
+REGISTRY.register("classifier", _create_classifier)
+REGISTRY.register("qwen", _create_qwen_client)
+
+def _classifier_config(model_path: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    """Registry key configuration; CLASSIFIER_SERVICE ('host:port') switches to the classifier service"""
+    config = dict(config, model_path=os.path.abspath(model_path))
+    if "service" not in config and os.environ.get("CLASSIFIER_SERVICE"):
+        config["service"] = os.environ["CLASSIFIER_SERVICE"]
+    return config
+
+def get_classifier(model_path: str = "./model/efficientnet_b0_best.pth", **config):
+    """
+    Shared ImageClassifier for a model file and configuration
+
+    Args:
+        model_path: Path to trained EfficientNet model (resolved against the working directory)
+        **config: Further ImageClassifier arguments (backend, quantized, confidence_threshold, service, ...)
+    """
+    return REGISTRY.get("classifier", **_classifier_config(model_path, config))
+
+def warm_up_classifier(model_path: str = "./model/efficientnet_b0_best.pth", **config):
+    """Load the shared ImageClassifier (see get_classifier) and run its warm-up pass"""
+    return REGISTRY.warm_up("classifier", **_classifier_config(model_path, config))
+
+def get_qwen_client(base_url: str = "http://localhost:5000"):
+    """Shared QwenClient for a server URL"""
+    return REGISTRY.get("qwen", base_url=base_url)
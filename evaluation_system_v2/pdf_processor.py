@@ -1,111 +1,844 @@
 import fitz  # PyMuPDF
-from PIL import Image
+from PIL import Image, JpegImagePlugin
 import io
 import os
-from typing import List, Tuple
+from typing import List, Tuple, Optional, Iterator, Iterable, Union, BinaryIO
+import queue
+import threading
 import base64
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
+import struct
+import zlib
+import numpy as np
+
+from image_filters import ContentFilter
+from extraction_cache import ExtractionCache
+
+def pixmap_to_array(pix: "fitz.Pixmap") -> np.ndarray:
+    """
+    View pixmap samples as a (height, width, channels) uint8 array without copying
+    
+    The array shares memory with the pixmap and is only valid while pix is alive.
+    Row stride padding is sliced off.
+    """
+    samples = np.frombuffer(pix.samples_mv, dtype=np.uint8)
+    rows = samples.reshape(pix.height, pix.stride)
+    return rows[:, :pix.width * pix.n].reshape(pix.height, pix.width, pix.n)
+
+def pixmap_to_pil(pix: "fitz.Pixmap") -> Image.Image:
+    """
+    Build a PIL image directly from pixmap samples (no PNG encode/decode)
+    
+    GRAY and RGB (with or without alpha) are read as-is; CMYK and other
+    colourspaces are converted to RGB by MuPDF first.
+    
+    Returns:
+        PIL Image in mode L, LA, RGB or RGBA (owns its pixel data)
+    """
+    if pix.n - pix.alpha not in (1, 3):
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    
+    color_mode = "L" if pix.n - pix.alpha == 1 else "RGB"
+    
+    if not pix.alpha:
+        # frombuffer honours the row stride; copy() detaches the image from MuPDF memory
+        image = Image.frombuffer(color_mode, (pix.width, pix.height), pix.samples_mv, "raw", color_mode, pix.stride, 1)
+        return image.copy()
+    
+    # MuPDF alpha is premultiplied: read as "RGBa"/"La" and convert to straight alpha
+    premultiplied = color_mode + "a"
+    image = Image.frombuffer(premultiplied, (pix.width, pix.height), pix.samples_mv, "raw", premultiplied, pix.stride, 1)
+    return image.convert(color_mode + "A")
+
+# A PDF given as file path, in-memory bytes or a readable stream (upload, ZIP member)
+PDFSource = Union[str, bytes, BinaryIO]
+
+def load_pdf_source(source: PDFSource) -> Union[str, bytes]:
+    """
+    Normalize a PDF source to a path or bytes
+    
+    Streams are read once here, so the source can be reopened (e.g. by worker processes).
+    """
+    if isinstance(source, os.PathLike):
+        return os.fspath(source)
+    if isinstance(source, (str, bytes)):
+        return source
+    if isinstance(source, (bytearray, memoryview)):
+        return bytes(source)
+    if hasattr(source, "read"):
+        return source.read()
+    raise TypeError(f"Unsupported PDF source: {type(source).__name__}")
+
+def open_pdf(source: Union[str, bytes]):
+    """Open a fitz document from a path or in-memory bytes"""
+    if isinstance(source, str):
+        if not os.path.exists(source):
+            raise FileNotFoundError(f"PDF file not found: {source}")
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype="pdf")
+
+def png_from_flate_stream(width: int, height: int, colors: int, data: bytes) -> bytes:
+    """
+    Wrap a FlateDecode image stream that uses PNG predictors into a PNG file
+    
+    Such a stream is byte-for-byte valid IDAT data, so no decode/re-encode is needed.
+    
+    Args:
+        width: Image width
+        height: Image height
+        colors: 1 (gray) or 3 (RGB)
+        data: Raw (still compressed) stream bytes
+    """
+    def chunk(tag: bytes, payload: bytes) -> bytes:
+        return struct.pack(">I", len(payload)) + tag + payload + struct.pack(">I", zlib.crc32(tag + payload) & 0xFFFFFFFF)
+    
+    color_type = 0 if colors == 1 else 2
+    header = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", data) + chunk(b"IEND", b"")
+
+class ExtractedImage(dict):
+    """
+    Extracted image entry
+    
+    Behaves like the plain image dict, but keeps the decoded pixels for the
+    classifier and produces compressed encodings only when they are first
+    accessed (e.g. img["image_base64"] for a VLM call). Entries extracted
+    by passthrough keep the PDF's original compressed bytes instead and are
+    decoded only when pixels are needed.
+    """
+    
+    LAZY_KEYS = ("image_base64",)
+    
+    # Quality of re-encoded JPEGs without original quantization tables
+    JPEG_QUALITY = 90
+    
+    def __init__(self, image: Image.Image = None, encoded: bytes = None, **fields):
+        super().__init__(**fields)
+        self._image = image
+        self._encoded = encoded
+    
+    def get_image(self) -> Image.Image:
+        """Decoded PIL image (no PNG round trip)"""
+        if self._image is None:
+            if self._encoded is None:
+                raise ValueError(f"Pixels of {self.get('filename')} were released")
+            self._image = Image.open(io.BytesIO(self._encoded))
+            self._image.load()
+        return self._image
+    
+    def get_thumbnail(self, max_size: int) -> Image.Image:
+        """
+        Downsampled copy of the image (longer side at most max_size)
+        
+        Passthrough JPEGs are decoded in draft mode at reduced scale, without a full decode.
+        """
+        if self._image is not None or self._encoded is None:
+            thumbnail = self.get_image().copy()
+        else:
+            thumbnail = Image.open(io.BytesIO(self._encoded))
+            thumbnail.draft(thumbnail.mode, (max_size, max_size))
+        thumbnail.thumbnail((max_size, max_size))
+        return thumbnail
+    
+    def crop(self, box: Tuple[int, int, int, int]) -> bool:
+        """
+        Replace the working pixels by a crop (e.g. before VLM calls)
+        
+        The crop is re-encoded in the entry's "format", so "format" and the filename
+        keep matching encode(). Passthrough entries are only cropped if the re-encoded
+        crop is smaller than the original PDF bytes. "image_hash" keeps describing the
+        original image, which stays available for audit (artifact store); the crop box
+        is recorded on the entry.
+        
+        Returns:
+            True if the crop was applied
+        """
+        cropped = self.get_image().crop(box)
+        encoded = self._encode_image(cropped, self.get("format", "png"), self._encoded)
+        if self.get("passthrough") and self._encoded is not None and len(encoded) >= len(self._encoded):
+            return False
+        
+        self._image = cropped
+        self._encoded = encoded
+        self.pop("image_base64", None)
+        self["passthrough"] = False
+        self["crop_box"] = list(box)
+        self["cropped_size"] = [cropped.width, cropped.height]
+        return True
+    
+    def encode(self) -> bytes:
+        """
+        Compressed working image in the entry's "format" (original PDF bytes for uncropped passthrough entries)
+        
+        The bytes are kept, so an image is encoded at most once (until cropped or released).
+        """
+        if self._encoded is None:
+            self._encoded = self._encode_image(self.get_image(), self.get("format", "png"))
+        return self._encoded
+    
+    def encode_png(self) -> bytes:
+        """Encode pixels as PNG"""
+        return self._encode_image(self.get_image(), "png")
+    
+    @classmethod
+    def _encode_image(cls, image: Image.Image, image_format: str, original: Optional[bytes] = None) -> bytes:
+        """
+        Encode pixels as PNG or JPEG
+        
+        JPEGs re-use the quantization tables and subsampling of the original JPEG bytes
+        (if given), so a crop is not re-compressed at a different quality.
+        """
+        buffer = io.BytesIO()
+        if image_format == "jpeg":
+            if image.mode not in ("L", "RGB", "CMYK"):
+                image = image.convert("RGB")
+            options = {"quality": cls.JPEG_QUALITY}
+            if original is not None:
+                source = Image.open(io.BytesIO(original))
+                if source.format == "JPEG":
+                    options = {"qtables": source.quantization,
+                               "subsampling": JpegImagePlugin.get_sampling(source)}
+            image.save(buffer, format='JPEG', **options)
+        else:
+            image.save(buffer, format='PNG')
+        return buffer.getvalue()
+    
+    def compress(self):
+        """Keep only the compressed bytes; pixels are decoded again on demand"""
+        self.encode()
+        self._image = None
+    
+    def release_image(self):
+        """Drop pixels and compressed bytes once no further stage needs them"""
+        self._image = None
+        self._encoded = None
+    
+    def __missing__(self, key):
+        if key in self.LAZY_KEYS:
+            value = base64.b64encode(self.encode()).decode()
+            self[key] = value
+            return value
+        raise KeyError(key)
+
+class ImageDeduplicator:
+    """Collapses repeated embedded images of one document into their first entry"""
+    
+    def __init__(self):
+        self.by_xref = {}
+        self.by_hash = {}
+    
+    def record_repeat(self, xref: int, page_number: int, image_index: int) -> bool:
+        """
+        Record another placement of an already extracted xref
+        
+        Returns:
+            True if the xref was seen before (nothing needs to be decoded)
+        """
+        entry = self.by_xref.get(xref)
+        if entry is None:
+            return False
+        entry["occurrences"].append({"page_number": page_number, "image_index": image_index})
+        return True
+    
+    def add(self, entry: dict) -> bool:
+        """
+        Register an extracted entry, merging it into an earlier entry with the same xref or content
+        
+        Returns:
+            True if the entry is new, False if it was merged into an earlier one
+        """
+        xref = entry.get("xref")
+        first = (self.by_xref.get(xref) if xref is not None else None) or self.by_hash.get(entry["image_hash"])
+        if first is not None and first is not entry:
+            first["occurrences"].extend(entry["occurrences"])
+            if xref is not None:
+                self.by_xref.setdefault(xref, first)
+            return False
+        
+        if xref is not None:
+            self.by_xref[xref] = entry
+        self.by_hash.setdefault(entry["image_hash"], entry)
+        return True
+
+# Stateless, shared by all extractors that do not configure their own thresholds
+DEFAULT_CONTENT_FILTER = ContentFilter()
 
 class PDFImageExtractor:
     """Extract images from PDF files for evaluation"""
     
-    def __init__(self, min_image_size: Tuple[int, int] = (100, 100)):
+    # Colourspaces whose samples can be used as-is by JPEG/PNG viewers
+    PASSTHROUGH_COLORSPACES = ("DeviceRGB", "DeviceGray", "ICCBased", "CalRGB", "CalGray")
+    
+    def __init__(self, min_image_size: Tuple[int, int] = (100, 100), workers: int = 1,
+                 parallel_min_pages: int = 16, passthrough: bool = True, deduplicate: bool = True,
+                 content_filter: Optional[ContentFilter] = DEFAULT_CONTENT_FILTER,
+                 stitch_fragments: bool = True, fragment_tolerance: float = 1.5,
+                 cache: Optional[ExtractionCache] = None, capture_text: bool = True,
+                 text_margin: float = 60.0, max_context_chars: int = 1000):
         """
         Initialize PDF extractor
         
         Args:
             min_image_size: Minimum width, height for valid images
+            workers: Number of worker processes for page extraction (1 = serial, 0 = CPU count)
+            parallel_min_pages: PDFs with fewer pages are always extracted serially
+            passthrough: Keep embedded JPEG / PNG-predictor streams as original bytes
+                         when no colourspace conversion is needed
+            deduplicate: Extract repeated images (same xref or content) once, recording
+                         every page placement in the entry's "occurrences"
+            content_filter: Rejects decorative images (flat fills, bars, icons, gradients)
+                            before classification (None disables the filter)
+            stitch_fragments: Reassemble screenshots stored as adjacent strips or tiles
+                              (before the size filter and classification)
+            fragment_tolerance: Maximum gap / misalignment between fragments in PDF points
+            cache: Extraction cache; repeat extractions of the same PDF with the same
+                   settings are served from its manifest
+            capture_text: Store the page text surrounding each image (captions, technical
+                          names) in the entry's "context_text"
+            text_margin: Distance in PDF points up to which a text block counts as surrounding
+            max_context_chars: Length limit of "context_text" (nearest blocks first)
         """
         self.min_image_size = min_image_size
+        self.passthrough = passthrough
+        self.deduplicate = deduplicate
+        self.content_filter = content_filter
+        self.stitch_fragments = stitch_fragments
+        self.fragment_tolerance = fragment_tolerance
+        self.cache = cache
+        self.capture_text = capture_text
+        self.text_margin = text_margin
+        self.max_context_chars = max_context_chars
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.parallel_min_pages = parallel_min_pages
+    
+    def _worker_settings(self) -> dict:
+        """Constructor arguments for extractors running in worker processes"""
+        return {
+            'min_image_size': self.min_image_size,
+            'workers': 1,
+            'passthrough': self.passthrough,
+            'deduplicate': self.deduplicate,
+            'content_filter': self.content_filter,
+            'stitch_fragments': self.stitch_fragments,
+            'fragment_tolerance': self.fragment_tolerance,
+            'capture_text': self.capture_text,
+            'text_margin': self.text_margin,
+            'max_context_chars': self.max_context_chars
+        }
+    
+    def _cache_settings(self) -> dict:
+        """Settings that change the extraction output (part of the cache key)"""
+        settings = self._worker_settings()
+        settings.pop('workers')
+        if self.content_filter:
+            settings['content_filter'] = vars(self.content_filter)
+        return settings
     
-    def extract_images_from_pdf(self, pdf_path: str, output_dir: str = None) -> List[dict]:
+    def extract_images_from_pdf(self, pdf_path: PDFSource, output_dir: str = None,
+                                rejections: Optional[List[dict]] = None) -> List[dict]:
         """
         Extract all images from PDF
         
         Args:
-            pdf_path: Path to PDF file
+            pdf_path: Path to PDF file, PDF bytes or file-like object (e.g. upload or ZIP member stream)
             output_dir: Directory to save extracted images (optional)
+            rejections: List that receives entries rejected by the content filter
+                        (without pixels, with 'rejection_reason' and 'filter_stats')
             
         Returns:
-            List of dictionaries with image info:
+            List of ExtractedImage dictionaries (in page/image order):
             [
                 {
                     'image_path': str,
-                    'image_base64': str,
+                    'image_base64': str,  # encoded lazily on first access
                     'page_number': int,
                     'image_index': int,
                     'width': int,
-                    'height': int
+                    'height': int,
+                    'format': str,        # 'png' or 'jpeg'
+                    'passthrough': bool,  # original PDF bytes kept
+                    'image_hash': str,    # SHA-256 of the original bytes (passthrough) or decoded pixels
+                    'xref': int,          # PDF object number of the image (None if stitched)
+                    'occurrences': list,  # every placement: {'page_number', 'image_index'}
+                    'bbox': list,         # placement on the page in PDF points (capture_text)
+                    'context_text': str   # surrounding page text, nearest first (capture_text)
                 }
             ]
         """
-        if not os.path.exists(pdf_path):
-            raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+        return list(self.iter_images(pdf_path, output_dir, prefetch=0, rejections=rejections))
+    
+    def iter_images(self, pdf_path: PDFSource, output_dir: str = None, prefetch: int = 2,
+                    rejections: Optional[List[dict]] = None) -> Iterator[ExtractedImage]:
+        """
+        Yield images as pages are processed
         
-        extracted_images = []
+        Pages are decoded in a background thread at most `prefetch` pages ahead
+        of the consumer, so memory is bounded by the pipeline depth rather than
+        the PDF size, and the consumer can work on page 1 while page 2 decodes.
+        
+        Args:
+            pdf_path: Path to PDF file, PDF bytes or file-like object (e.g. upload or ZIP member stream)
+            output_dir: Directory to save extracted images (optional)
+            prefetch: Pages decoded ahead of the consumer (0 = decode in the calling thread)
+            rejections: List that receives entries rejected by the content filter
+            
+        Yields:
+            ExtractedImage entries in page/image order (see extract_images_from_pdf)
+        """
+        source = load_pdf_source(pdf_path)
+        if isinstance(source, str) and not os.path.exists(source):
+            raise FileNotFoundError(f"PDF file not found: {source}")
+        
+        if self.cache:
+            pdf_hash = self.cache.hash_pdf(source)
+            cache_key = self.cache.make_key(pdf_hash, self._cache_settings())
+            manifest = self.cache.load(cache_key)
+            if manifest is not None:
+                yield from self._iter_cached(manifest, output_dir, rejections)
+                return
+            
+            collected = rejections if rejections is not None else []
+            pages = self._cache_pages(self._iter_pages(source, output_dir, collected), cache_key, pdf_hash, collected)
+        else:
+            pages = self._iter_pages(source, output_dir, rejections)
+        
+        if prefetch > 0:
+            pages = _prefetch(pages, prefetch)
+        
+        for page_images in pages:
+            yield from page_images
+    
+    def _cache_pages(self, pages: Iterator[List[dict]], cache_key: str, pdf_hash: str,
+                     rejections: List[dict]) -> Iterator[List[dict]]:
+        """
+        Store image bytes as pages are extracted, write the manifest once extraction completes
+        
+        Bytes and fields are snapshotted before the consumer sees (and possibly crops or
+        releases) an entry. The snapshot shares the "occurrences" list with the entry, so
+        repeats merged on later pages still reach the manifest.
+        """
+        extracted = []
+        for page_images in pages:
+            for entry in page_images:
+                self.cache.store_image(entry.encode(), entry["image_hash"], entry["format"])
+                extracted.append({key: value for key, value in entry.items() if key not in ExtractedImage.LAZY_KEYS})
+            yield page_images
+        
+        self.cache.save(
+            cache_key, pdf_hash, self._cache_settings(),
+            extracted,
+            [{key: value for key, value in entry.items() if key not in ExtractedImage.LAZY_KEYS} for entry in rejections]
+        )
+    
+    def _iter_cached(self, manifest: dict, output_dir: str = None,
+                     rejections: Optional[List[dict]] = None) -> Iterator[ExtractedImage]:
+        """Yield the entries of a cached extraction (image bytes read one at a time)"""
+        if rejections is not None:
+            rejections.extend(ExtractedImage(**record) for record in manifest.get("rejections", []))
+        
+        for record in manifest["images"]:
+            entry = ExtractedImage(encoded=self.cache.read_image(record), **record)
+            entry["image_path"] = None
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+                entry["image_path"] = os.path.join(output_dir, entry["filename"])
+                with open(entry["image_path"], 'wb') as f:
+                    f.write(entry.encode())
+            yield entry
+    
+    def _iter_pages(self, source: Union[str, bytes], output_dir: str = None,
+                    rejections: Optional[List[dict]] = None) -> Iterator[List[dict]]:
+        """Yield the images of each page (or page range, when extracting in parallel) in order"""
+        next_page = 0
+        dedup = ImageDeduplicator() if self.deduplicate else None
         
         try:
-            # Open PDF document
-            pdf_document = fitz.open(pdf_path)
+            pdf_document = open_pdf(source)
+            page_count = len(pdf_document)
             
-            for page_num in range(len(pdf_document)):
-                page = pdf_document.load_page(page_num)
-                image_list = page.get_images(full=True)
-                
-                for img_index, img in enumerate(image_list):
-                    # Get image data
-                    xref = img[0]
-                    pix = fitz.Pixmap(pdf_document, xref)
-                    
-                    # Skip if image is too small
-                    if pix.width < self.min_image_size[0] or pix.height < self.min_image_size[1]:
-                        pix = None
-                        continue
-                    
-                    # Convert to PIL Image
-                    if pix.n - pix.alpha < 4:  # GRAY or RGB
-                        img_data = pix.tobytes("png")
-                        pil_image = Image.open(io.BytesIO(img_data))
-                    else:  # CMYK: convert to RGB first
-                        pix1 = fitz.Pixmap(fitz.csRGB, pix)
-                        img_data = pix1.tobytes("png")
-                        pil_image = Image.open(io.BytesIO(img_data))
-                        pix1 = None
-                    
-                    # Generate filename
-                    filename = f"page_{page_num+1}_img_{img_index+1}.png"
-                    
-                    # Save to file if output directory provided
-                    image_path = None
-                    if output_dir:
-                        os.makedirs(output_dir, exist_ok=True)
-                        image_path = os.path.join(output_dir, filename)
-                        pil_image.save(image_path, "PNG")
-                    
-                    # Convert to base64 for API calls
-                    img_buffer = io.BytesIO()
-                    pil_image.save(img_buffer, format='PNG')
-                    img_base64 = base64.b64encode(img_buffer.getvalue()).decode()
-                    
-                    extracted_images.append({
-                        'image_path': image_path,
-                        'image_base64': img_base64,
-                        'page_number': page_num + 1,
-                        'image_index': img_index + 1,
-                        'width': pix.width,
-                        'height': pix.height,
-                        'filename': filename
-                    })
-                    
-                    pix = None  # Free memory
+            if self.workers > 1 and page_count >= self.parallel_min_pages:
+                pdf_document.close()
+                try:
+                    for end, chunk, rejected in self._iter_parallel(source, page_count, output_dir):
+                        next_page = end
+                        # Workers deduplicate within their range, repeats across ranges are merged here
+                        if rejections is not None:
+                            rejections.extend(entry for entry in rejected if not dedup or dedup.add(entry))
+                        yield [entry for entry in chunk if dedup.add(entry)] if dedup else chunk
+                    return
+                except BrokenProcessPool as e:
+                    print(f"Parallel extraction failed ({e}), falling back to serial")
+                    pdf_document = open_pdf(source)
             
-            pdf_document.close()
+            try:
+                for page_num in range(next_page, page_count):
+                    yield self._extract_page_images(pdf_document, page_num, output_dir, dedup, rejections)
+            finally:
+                pdf_document.close()
             
         except Exception as e:
             raise Exception(f"Error extracting images from PDF: {str(e)}")
+    
+    def _iter_parallel(self, source: Union[str, bytes], page_count: int,
+                       output_dir: str = None) -> Iterator[Tuple[int, List[dict], List[dict]]]:
+        """
+        Extract page ranges in a process pool, each worker opening its own document
+        
+        The document (path or in-memory bytes) is sent once per worker through the pool
+        initializer, not with every range. Workers are spawned rather than forked, since
+        this generator usually runs in the prefetch thread. At most two ranges per worker
+        are in flight, so finished ranges wait for the consumer instead of piling up.
+        
+        Yields:
+            Tuples of (end page, images of the range, rejected images) in page/image order
+        """
+        # A few chunks per worker so uneven pages (screenshot-heavy vs. text) balance out
+        chunk_count = min(page_count, self.workers * 4)
+        chunk_size = -(-page_count // chunk_count)
+        page_ranges = [(start, min(start + chunk_size, page_count)) for start in range(0, page_count, chunk_size)]
+        
+        executor = ProcessPoolExecutor(
+            max_workers=min(self.workers, len(page_ranges)),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_page_worker,
+            initargs=(source, self._worker_settings(), output_dir)
+        )
+        pending = []
+        try:
+            for start, end in page_ranges:
+                pending.append((end, executor.submit(_extract_page_range, start, end)))
+                if len(pending) >= self.workers * 2:
+                    end, future = pending.pop(0)
+                    yield (end, *future.result())
+            
+            for end, future in pending:
+                yield (end, *future.result())
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+    
+    def _read_passthrough(self, pdf_document, img: tuple) -> Optional[Tuple[bytes, str]]:
+        """
+        Original compressed bytes of an embedded image, if usable without conversion
+        
+        Args:
+            pdf_document: Open fitz document
+            img: Entry of page.get_images(full=True)
+            
+        Returns:
+            Tuple of (bytes, format) or None if the image must be rasterized
+        """
+        xref, smask, width, height, bpc, colorspace_name, _, _, filter_name = img[:9]
+        
+        # Soft masks, decode arrays, CMYK/indexed/separation colour all need MuPDF
+        if smask or bpc != 8 or colorspace_name not in self.PASSTHROUGH_COLORSPACES:
+            return None
+        if pdf_document.xref_get_key(xref, "Decode")[0] != "null":
+            return None
+        
+        if filter_name == "DCTDecode":
+            info = pdf_document.extract_image(xref)
+            if info.get("ext") == "jpeg" and info.get("colorspace") in (1, 3):
+                return info["image"], "jpeg"
+            return None
+        
+        if filter_name == "FlateDecode":
+            predictor = pdf_document.xref_get_key(xref, "DecodeParms/Predictor")
+            colors = pdf_document.xref_get_key(xref, "DecodeParms/Colors")
+            columns = pdf_document.xref_get_key(xref, "DecodeParms/Columns")
+            bits = pdf_document.xref_get_key(xref, "DecodeParms/BitsPerComponent")
+            
+            if predictor[0] != "int" or int(predictor[1]) < 10:
+                return None
+            colors = int(colors[1]) if colors[0] == "int" else 1
+            if colors not in (1, 3):
+                return None
+            if columns[0] == "int" and int(columns[1]) != width:
+                return None
+            if bits[0] == "int" and int(bits[1]) != 8:
+                return None
+            
+            return png_from_flate_stream(width, height, colors, pdf_document.xref_stream_raw(xref)), "png"
+        
+        return None
+    
+    def _find_fragment_groups(self, image_info: list, image_list: list) -> dict:
+        """
+        Find images that a PDF producer split into strips or tiles
+        
+        Fragments are upright placements whose bounding boxes share an edge
+        (same left/right or top/bottom, touching within a tolerance) and
+        together fill their union rectangle without overlap. Identical strips
+        (e.g. blank ones) may share one xref and appear several times in a group.
+        
+        Args:
+            image_info: Placements of the page (page.get_image_info(xrefs=True))
+            image_list: Entries of page.get_images(full=True)
+        
+        Returns:
+            Mapping index of the first fragment -> [(image index, bbox), ...] in reading order
+        """
+        if len(image_list) < 2:
+            return {}
+        
+        tolerance = self.fragment_tolerance
+        
+        index_of = {}
+        for index, img in enumerate(image_list):
+            index_of.setdefault(img[0], index)
+        
+        placements = []
+        for info in image_info:
+            if info.get("xref") not in index_of:
+                continue
+            a, b, c, d = info["transform"][:4]
+            rect = fitz.Rect(info["bbox"])
+            if a > 0 and d > 0 and b == 0 and c == 0 and not rect.is_empty:
+                placements.append((index_of[info["xref"]], rect))
+        
+        if len(placements) < 2:
+            return {}
+        
+        def close(a, b):
+            return abs(a - b) <= tolerance
+        
+        def adjacent(r1, r2):
+            stacked = close(r1.x0, r2.x0) and close(r1.x1, r2.x1) and (close(r1.y1, r2.y0) or close(r2.y1, r1.y0))
+            side_by_side = close(r1.y0, r2.y0) and close(r1.y1, r2.y1) and (close(r1.x1, r2.x0) or close(r2.x1, r1.x0))
+            return stacked or side_by_side
+        
+        # Union-find over adjacent placements
+        parent = list(range(len(placements)))
         
-        return extracted_images
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        
+        for i in range(len(placements)):
+            for j in range(i + 1, len(placements)):
+                if adjacent(placements[i][1], placements[j][1]):
+                    parent[find(j)] = find(i)
+        
+        clusters = {}
+        for i, placement in enumerate(placements):
+            clusters.setdefault(find(i), []).append(placement)
+        
+        groups = {}
+        for members in clusters.values():
+            if len(members) < 2:
+                continue
+            union = fitz.Rect(members[0][1])
+            for _, rect in members[1:]:
+                union |= rect
+            covered = sum(rect.width * rect.height for _, rect in members)
+            if abs(covered - union.width * union.height) > 0.02 * union.width * union.height:
+                continue
+            
+            members.sort(key=lambda member: (round(member[1].y0), round(member[1].x0)))
+            leader = min(index for index, _ in members)
+            groups[leader] = [(index, tuple(rect)) for index, rect in members]
+        
+        return groups
+    
+    def _stitch_fragments(self, pdf_document, image_list: list, group: list) -> Image.Image:
+        """
+        Reassemble fragments into one image at the highest fragment resolution
+        
+        Args:
+            pdf_document: Open fitz document
+            image_list: Entries of page.get_images(full=True)
+            group: [(image index, bbox), ...] from _find_fragment_groups
+        """
+        fragments = []
+        for index, bbox in group:
+            pix = fitz.Pixmap(pdf_document, image_list[index][0])
+            fragments.append((pixmap_to_pil(pix).convert("RGB"), fitz.Rect(bbox)))
+            pix = None  # Free memory
+        
+        union = fitz.Rect(fragments[0][1])
+        for _, rect in fragments[1:]:
+            union |= rect
+        scale = max(image.width / rect.width for image, rect in fragments)
+        
+        canvas = Image.new("RGB", (round(union.width * scale), round(union.height * scale)), "white")
+        for image, rect in fragments:
+            size = (max(1, round(rect.width * scale)), max(1, round(rect.height * scale)))
+            if image.size != size:
+                image = image.resize(size, Image.Resampling.LANCZOS)
+            canvas.paste(image, (round((rect.x0 - union.x0) * scale), round((rect.y0 - union.y0) * scale)))
+        
+        return canvas
     
-    def extract_images_as_base64_only(self, pdf_path: str) -> List[dict]:
+    def _context_text(self, text_blocks: list, bbox: Optional[tuple]) -> str:
+        """
+        Text of the page surrounding an image
+        
+        Args:
+            text_blocks: Text blocks of the page (page.get_text("blocks"))
+            bbox: Image placement (x0, y0, x1, y1) in PDF points
+            
+        Returns:
+            Blocks within text_margin of the image, nearest first, cut at max_context_chars
+        """
+        if not bbox:
+            return ""
+        
+        x0, y0, x1, y1 = bbox
+        nearby = []
+        for block in text_blocks:
+            bx0, by0, bx1, by1, text, _, block_type = block[:7]
+            text = " ".join(text.split())
+            if block_type != 0 or not text:
+                continue
+            dx = max(0.0, bx0 - x1, x0 - bx1)
+            dy = max(0.0, by0 - y1, y0 - by1)
+            distance = (dx * dx + dy * dy) ** 0.5
+            if distance <= self.text_margin:
+                nearby.append((distance, by0, bx0, text))
+        
+        nearby.sort()
+        context = "\n".join(text for _, _, _, text in nearby)
+        return context[:self.max_context_chars]
+    
+    def _extract_page_images(self, pdf_document, page_num: int, output_dir: str = None,
+                             dedup: Optional[ImageDeduplicator] = None,
+                             rejections: Optional[List[dict]] = None) -> List[dict]:
+        """
+        Extract the images of a single page
+        
+        Args:
+            pdf_document: Open fitz document
+            page_num: Zero-based page number
+            output_dir: Directory to save extracted images (optional)
+            dedup: Document-wide deduplication state (repeats are recorded, not returned)
+            rejections: List that receives entries rejected by the content filter
+            
+        Returns:
+            List of image dictionaries for this page
+        """
+        page_images = []
+        page = pdf_document.load_page(page_num)
+        image_list = page.get_images(full=True)
+        
+        # One pass over the page content for all placements
+        image_info = page.get_image_info(xrefs=True) if image_list and (self.stitch_fragments or self.capture_text) else []
+        
+        # Captions / technical names next to each image (first placement of an xref)
+        text_blocks, image_bboxes = [], {}
+        if self.capture_text and image_list:
+            text_blocks = page.get_text("blocks")
+            for info in image_info:
+                image_bboxes.setdefault(info.get("xref"), tuple(info["bbox"]))
+        
+        # Strips / tiles of one screenshot: first fragment index -> all fragments
+        fragment_groups = self._find_fragment_groups(image_info, image_list) if self.stitch_fragments else {}
+        followers = {index for leader, group in fragment_groups.items() for index, _ in group if index != leader}
+        
+        for img_index, img in enumerate(image_list):
+            if img_index in followers:
+                continue
+            
+            # Get image data
+            xref, width, height = img[0], img[2], img[3]
+            group = fragment_groups.get(img_index)
+            
+            if group:
+                pil_image = self._stitch_fragments(pdf_document, image_list, group)
+                width, height = pil_image.size
+            
+            # Skip if image is too small (decided from the image dictionary, before decoding)
+            if width < self.min_image_size[0] or height < self.min_image_size[1]:
+                continue
+            
+            # Logos, banners and repeated screenshots reuse one xref on every page
+            # (fragments may share xrefs with other screenshots, stitched images go by content only)
+            if dedup and not group and dedup.record_repeat(xref, page_num + 1, img_index + 1):
+                continue
+            
+            passthrough = self._read_passthrough(pdf_document, img) if self.passthrough and not group else None
+            
+            if passthrough:
+                # Original compressed bytes; decoded lazily for the classifier
+                encoded, image_format = passthrough
+                entry = ExtractedImage(encoded=encoded)
+                content_hash = hashlib.sha256(encoded).hexdigest()
+            else:
+                if not group:
+                    # Build PIL image straight from the samples; PNG/base64 only on demand
+                    pix = fitz.Pixmap(pdf_document, xref)
+                    pil_image = pixmap_to_pil(pix)
+                    width, height = pix.width, pix.height
+                    pix = None  # Free memory
+                
+                encoded, image_format = None, "png"
+                entry = ExtractedImage(pil_image)
+                content_hash = hashlib.sha256(pil_image.tobytes()).hexdigest()
+            
+            bbox = image_bboxes.get(xref)
+            if group:
+                xref = None
+                entry["stitched_from"] = [
+                    {"xref": image_list[index][0], "image_index": index + 1, "bbox": [round(v, 2) for v in rect]}
+                    for index, rect in group
+                ]
+                union = fitz.Rect(group[0][1])
+                for _, rect in group[1:]:
+                    union |= fitz.Rect(rect)
+                bbox = tuple(union)
+            
+            if self.capture_text:
+                entry["bbox"] = [round(v, 2) for v in bbox] if bbox else None
+                entry["context_text"] = self._context_text(text_blocks, bbox)
+            
+            # Generate filename
+            filename = f"page_{page_num+1}_img_{img_index+1}.{image_format}"
+            
+            entry.update(
+                image_path=None,
+                page_number=page_num + 1,
+                image_index=img_index + 1,
+                width=width,
+                height=height,
+                filename=filename,
+                format=image_format,
+                passthrough=encoded is not None,
+                image_hash=content_hash,
+                xref=xref,
+                occurrences=[{"page_number": page_num + 1, "image_index": img_index + 1}]
+            )
+            
+            # Same pixels embedded under another xref
+            if dedup and not dedup.add(entry):
+                continue
+            
+            # Decorative images never reach the classifier
+            if self.content_filter:
+                reason, stats = self.content_filter.check(
+                    entry.get_thumbnail(self.content_filter.thumbnail_size), (width, height)
+                )
+                if reason:
+                    entry.release_image()
+                    entry.update(rejection_reason=reason, filter_stats=stats)
+                    if rejections is not None:
+                        rejections.append(entry)
+                    continue
+            
+            # Save to file if output directory provided
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+                entry["image_path"] = os.path.join(output_dir, filename)
+                with open(entry["image_path"], 'wb') as f:
+                    f.write(entry.encode())
+            
+            page_images.append(entry)
+        
+        return page_images
+    
+    def extract_images_as_base64_only(self, pdf_path: PDFSource) -> List[dict]:
         """
         Extract images as base64 only (no file saving)
         Faster method for direct API usage
@@ -115,18 +848,29 @@ class PDFImageExtractor:
         """
         return self.extract_images_from_pdf(pdf_path, output_dir=None)
     
-    def get_pdf_info(self, pdf_path: str) -> dict:
+    def get_pdf_info(self, pdf_path: PDFSource) -> dict:
         """
         Get basic PDF information
         
+        Args:
+            pdf_path: Path to PDF file, PDF bytes or file-like object
+        
         Returns:
             Dictionary with PDF metadata
         """
-        if not os.path.exists(pdf_path):
-            raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+        source = load_pdf_source(pdf_path)
+        if isinstance(source, str) and not os.path.exists(source):
+            raise FileNotFoundError(f"PDF file not found: {source}")
+        
+        pdf_hash = None
+        if self.cache:
+            pdf_hash = self.cache.hash_pdf(source)
+            info = self.cache.load_info(pdf_hash)
+            if info is not None:
+                return info
         
         try:
-            pdf_document = fitz.open(pdf_path)
+            pdf_document = open_pdf(source)
             
             info = {
                 'page_count': len(pdf_document),
@@ -140,10 +884,97 @@ class PDFImageExtractor:
             }
             
             pdf_document.close()
-            return info
             
         except Exception as e:
             raise Exception(f"Error reading PDF info: {str(e)}")
+        
+        if pdf_hash:
+            self.cache.save_info(pdf_hash, info)
+        return info
+
+def _prefetch(items: Iterable, depth: int) -> Iterator:
+    """
+    Run an iterator in a background thread, at most `depth` items ahead
+    
+    The bounded queue provides backpressure; exceptions are re-raised in the
+    consumer, and closing the returned generator stops the producer.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+    
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    break
+        except Exception as e:
+            put((None, e))
+        finally:
+            if hasattr(items, "close"):
+                items.close()
+            put((done, None))
+    
+    producer = threading.Thread(target=produce, name="pdf-prefetch", daemon=True)
+    producer.start()
+    
+    try:
+        while True:
+            item, error = buffer.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+# Extractor and open document of a worker process (set once by _init_page_worker)
+_page_worker = {}
+
+def _init_page_worker(pdf_path: Union[str, bytes], settings: dict, output_dir: str = None):
+    """
+    Worker process initializer: open the document once for all ranges of this worker
+    
+    Args:
+        pdf_path: Path to PDF file or PDF bytes
+        settings: PDFImageExtractor constructor arguments
+        output_dir: Directory to save extracted images (optional)
+    """
+    _page_worker["extractor"] = PDFImageExtractor(**settings)
+    _page_worker["document"] = open_pdf(pdf_path)
+    _page_worker["output_dir"] = output_dir
+
+def _extract_page_range(start: int, end: int) -> Tuple[List[dict], List[dict]]:
+    """
+    Worker process entry point: extract pages [start, end) of the worker's document
+    
+    Args:
+        start: First zero-based page number
+        end: End page number (exclusive)
+    
+    Returns:
+        Tuple of (images, images rejected by the content filter)
+    """
+    extractor = _page_worker["extractor"]
+    dedup = ImageDeduplicator() if extractor.deduplicate else None
+    images = []
+    rejections = []
+    for page_num in range(start, end):
+        images.extend(extractor._extract_page_images(
+            _page_worker["document"], page_num, _page_worker["output_dir"], dedup, rejections
+        ))
+    return images, rejections
 
 # Example usage function
 def process_student_pdf(pdf_path: str, temp_dir: str = "temp_images") -> List[dict]:
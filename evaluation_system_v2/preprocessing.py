@@ -0,0 +1,147 @@
+import io
+import os
+import numpy as np
+from PIL import Image
+from typing import Dict, List, Tuple, Union, BinaryIO
+
+# ImageNet statistics used by the EfficientNet training transform
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+# Allowed deviation of the fast path from the torchvision transform (normalized units);
+# large screenshots measure about 0.01 mean / 0.25 max, images that need no pre-downscale about 1e-6
+FAST_PATH_MEAN_TOLERANCE = 0.02
+FAST_PATH_MAX_TOLERANCE = 0.35
+
+def open_image(source: Union[str, bytes, BinaryIO], size: Tuple[int, int] = (224, 224),
+               reducing_gap: float = 2.0) -> Image.Image:
+    """
+    Open an image for model input, decoding JPEGs at reduced scale
+
+    JPEG draft mode lets the decoder skip DCT detail (scale 1/2, 1/4 or 1/8)
+    as long as the result stays at least reducing_gap times the target size.
+
+    Args:
+        source: File path, image bytes or file-like object
+        size: Target (width, height) of the model input
+        reducing_gap: Minimum ratio between decoded size and target size
+
+    Returns:
+        PIL image (not yet loaded; any mode)
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    image = Image.open(source)
+    if image.format == "JPEG":
+        image.draft("RGB", (int(size[0] * reducing_gap), int(size[1] * reducing_gap)))
+    return image
+
+def resize_for_model(image: Image.Image, size: Tuple[int, int] = (224, 224), reducing_gap: float = 2.0) -> np.ndarray:
+    """
+    Resize an image to the model input size
+
+    Large screenshots are first shrunk by an integer factor with Image.reduce()
+    (box average, cheap) down to reducing_gap times the target size; the final
+    step is the same bilinear resize as transforms.Resize.
+
+    Args:
+        image: PIL image (any mode)
+        size: Target (width, height)
+        reducing_gap: Minimum ratio between pre-downscaled size and target size
+
+    Returns:
+        uint8 array [height, width, 3]
+    """
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    factor = int(min(image.width / (size[0] * reducing_gap), image.height / (size[1] * reducing_gap)))
+    if factor >= 2:
+        image = image.reduce(factor)
+
+    image = image.resize(size, Image.Resampling.BILINEAR)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return np.asarray(image, dtype=np.uint8)
+
+class BatchNormalizer:
+    """Preallocated float32 batch buffer filled with normalized model inputs"""
+
+    def __init__(self, batch_size: int, size: Tuple[int, int] = (224, 224)):
+        """
+        Initialize normalizer
+
+        Args:
+            batch_size: Maximum images per batch
+            size: Model input (width, height)
+        """
+        self.buffer = np.empty((batch_size, 3, size[1], size[0]), dtype=np.float32)
+
+        # (x / 255 - mean) / std == x * scale - shift
+        self.scale = (1.0 / (255.0 * IMAGENET_STD))[:, None, None]
+        self.shift = (IMAGENET_MEAN / IMAGENET_STD)[:, None, None]
+
+    def __call__(self, arrays: List[np.ndarray]) -> np.ndarray:
+        """
+        Normalize resized images into the buffer
+
+        Args:
+            arrays: uint8 arrays [height, width, 3] (at most batch_size)
+
+        Returns:
+            View of the buffer [len(arrays), 3, height, width] (overwritten by the next call)
+        """
+        batch = self.buffer[:len(arrays)]
+        np.multiply(np.stack(arrays).transpose(0, 3, 1, 2), self.scale, out=batch)
+        batch -= self.shift
+        return batch
+
+def compare_with_transform(source: Union[str, bytes], size: Tuple[int, int] = (224, 224)) -> Dict[str, float]:
+    """
+    Deviation of the fast path from the torchvision transform for one image
+
+    Args:
+        source: Image file path or bytes
+
+    Returns:
+        Dictionary with max_abs and mean_abs difference of the normalized inputs
+    """
+    from torchvision import transforms
+
+    transform = transforms.Compose([
+        transforms.Resize((size[1], size[0])),
+        transforms.ToTensor(),
+        transforms.Normalize(IMAGENET_MEAN.tolist(), IMAGENET_STD.tolist())
+    ])
+
+    reference = transform(Image.open(io.BytesIO(source) if isinstance(source, bytes) else source).convert("RGB")).numpy()
+    fast = BatchNormalizer(1, size)([resize_for_model(open_image(source, size), size)])[0]
+
+    difference = np.abs(fast - reference)
+    return {"max_abs": float(difference.max()), "mean_abs": float(difference.mean())}
+
+# Command line interface: check the fast path against the torchvision transform
+if __name__ == "__main__":
+    import sys
+    import glob
+    import time
+
+    image_dir = sys.argv[1] if len(sys.argv) > 1 else "../dataset/mapped_train"
+    tolerance = float(sys.argv[2]) if len(sys.argv) > 2 else FAST_PATH_MEAN_TOLERANCE
+
+    files = []
+    for ext in ('*.jpg', '*.jpeg', '*.png', '*.bmp', '*.tiff'):
+        files.extend(glob.glob(os.path.join(image_dir, "**", ext), recursive=True))
+
+    failures = 0
+    start = time.time()
+    for path in sorted(files):
+        deviation = compare_with_transform(path)
+        if deviation["mean_abs"] > tolerance:
+            failures += 1
+            print(f"❌ {path}: mean {deviation['mean_abs']:.4f}, max {deviation['max_abs']:.4f}")
+
+    print(f"Checked {len(files)} images in {time.time() - start:.1f}s: "
+          f"{failures} above mean tolerance {tolerance}")
+    sys.exit(1 if failures else 0)
@@ -3,7 +3,6 @@ import json
 import base64
 from typing import Dict, Any, Optional
 import time
-from PIL import Image
 import io
 
 class QwenClient:
@@ -163,13 +162,14 @@ class QwenClient:
         else:
             return result
     
-    def extract_metadata(self, image_base64: str, category: str) -> Dict[str, Any]:
+    def extract_metadata(self, image_base64: str, category: str, context_text: Optional[str] = None) -> Dict[str, Any]:
         """
         Extract metadata from image for given category
         
         Args:
             image_base64: Base64 encoded image
             category: Category name (Excel-Tabelle, Data-Flow, etc.)
+            context_text: Text next to the image in the PDF (captions, technical names), optional
             
         Returns:
             Metadata extraction result
@@ -183,8 +183,44 @@ class QwenClient:
             }
         
         prompt = metadata_templates[category]
+        if context_text:
+            prompt += f"\nText neben dem Bild im Dokument (Bildunterschrift, technische Namen):\n{context_text}\n"
+        
         result = self.analyze_image(image_base64, prompt, max_tokens=1024)
+        return self._parse_metadata_response(result, category)
+    
+    def extract_metadata_from_text(self, context_text: str, category: str) -> Dict[str, Any]:
+        """
+        Extract metadata from the text surrounding an image (no vision call)
+        
+        Args:
+            context_text: Text next to the image in the PDF (captions, technical names)
+            category: Category name (Excel-Tabelle, Data-Flow, etc.)
+            
+        Returns:
+            Metadata extraction result (same format as extract_metadata)
+        """
+        from metadata_templates import metadata_templates
+        
+        if category not in metadata_templates:
+            return {
+                "status": "error",
+                "error": f"Unknown category: {category}"
+            }
+        
+        prompt = (
+            "Das Bild liegt nicht vor. Beantworte die folgende Aufgabe ausschließlich anhand des Textes, "
+            "der im Dokument direkt neben dem Bild steht (Bildunterschrift, technische Namen):\n\n"
+            f"{context_text}\n"
+            f"{metadata_templates[category]}"
+        )
         
+        result = self.text_only_query(prompt, max_tokens=1024)
+        return self._parse_metadata_response(result, category)
+    
+    @staticmethod
+    def _parse_metadata_response(result: Dict[str, Any], category: str) -> Dict[str, Any]:
+        """Parse the JSON answer of a metadata query"""
         if result.get("status") == "success":
             try:
                 response_text = result.get("response", "").strip()
@@ -223,6 +259,31 @@ class QwenClient:
         else:
             return result
     
+    @staticmethod
+    def _side_by_side(student_img, reference_img, max_height: int = 800):
+        """
+        Combine student (left) and reference (right) image at the same height
+        
+        The height is that of the taller image, capped at max_height, so small
+        (e.g. auto-cropped) screenshots are not upscaled into a larger composite.
+        """
+        from PIL import Image
+        
+        height = min(max_height, max(student_img.height, reference_img.height))
+        student_width = max(1, int(student_img.width * height / student_img.height))
+        reference_width = max(1, int(reference_img.width * height / reference_img.height))
+        
+        student_resized = student_img.resize((student_width, height), Image.Resampling.LANCZOS)
+        reference_resized = reference_img.resize((reference_width, height), Image.Resampling.LANCZOS)
+        
+        combined_width = student_width + reference_width + 20  # 20px separator
+        combined_img = Image.new('RGB', (combined_width, height), color='white')
+        
+        # Paste images side by side
+        combined_img.paste(student_resized, (0, 0))
+        combined_img.paste(reference_resized, (student_width + 20, 0))
+        return combined_img
+    
     def visual_comparison_evaluation(self, student_image_base64: str, reference_image_path: str, category: str) -> Dict[str, Any]:
         """
         Perform detailed evaluation by comparing two images visually
@@ -248,24 +309,8 @@ class QwenClient:
             # Load reference image
             reference_img = Image.open(reference_image_path)
             
-            # Resize images to same height for side-by-side comparison
-            max_height = 800  # Reasonable height for Qwen
-            student_ratio = max_height / student_img.height
-            reference_ratio = max_height / reference_img.height
-            
-            student_width = int(student_img.width * student_ratio)
-            reference_width = int(reference_img.width * reference_ratio)
-            
-            student_resized = student_img.resize((student_width, max_height), Image.Resampling.LANCZOS)
-            reference_resized = reference_img.resize((reference_width, max_height), Image.Resampling.LANCZOS)
-            
             # Create combined image (side by side)
-            combined_width = student_width + reference_width + 20  # 20px separator
-            combined_img = Image.new('RGB', (combined_width, max_height), color='white')
-            
-            # Paste images side by side
-            combined_img.paste(student_resized, (0, 0))
-            combined_img.paste(reference_resized, (student_width + 20, 0))
+            combined_img = self._side_by_side(student_img, reference_img)
             
             # Convert combined image to base64
             buffer = io.BytesIO()
@@ -403,24 +448,8 @@ KRITISCH:
             # Load reference image
             reference_img = Image.open(reference_image_path)
             
-            # Resize images to same height for side-by-side comparison
-            max_height = 800  # Reasonable height for Qwen
-            student_ratio = max_height / student_img.height
-            reference_ratio = max_height / reference_img.height
-            
-            student_width = int(student_img.width * student_ratio)
-            reference_width = int(reference_img.width * reference_ratio)
-            
-            student_resized = student_img.resize((student_width, max_height), Image.Resampling.LANCZOS)
-            reference_resized = reference_img.resize((reference_width, max_height), Image.Resampling.LANCZOS)
-            
             # Create combined image (side by side)
-            combined_width = student_width + reference_width + 20  # 20px separator
-            combined_img = Image.new('RGB', (combined_width, max_height), color='white')
-            
-            # Paste images side by side
-            combined_img.paste(student_resized, (0, 0))
-            combined_img.paste(reference_resized, (student_width + 20, 0))
+            combined_img = self._side_by_side(student_img, reference_img)
             
             # Convert combined image to base64
             buffer = io.BytesIO()
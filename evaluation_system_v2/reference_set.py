@@ -0,0 +1,254 @@
+import os
+import re
+import json
+import hashlib
+from typing import Dict, List, Any, Optional
+import numpy as np
+
+from embedding_index import EmbeddingIndex
+from result_store import ArtifactStore
+
+# Marks a nested dict node in flattened metadata (children are compared via their own paths)
+_NESTED = object()
+
+def flatten_metadata(metadata: Dict[str, Any], prefix: tuple = ()) -> Dict[tuple, Any]:
+    """
+    Flatten nested metadata into {key_path: value}
+
+    Nested dicts are recorded with a marker so that a dict on one side and a
+    plain value on the other still counts as a mismatch.
+    """
+    flat = {}
+    for key, value in metadata.items():
+        path = prefix + (key,)
+        if isinstance(value, dict):
+            flat[path] = _NESTED
+            flat.update(flatten_metadata(value, path))
+        else:
+            flat[path] = value
+    return flat
+
+def flat_metadata_similarity(student_flat: Dict[tuple, Any], reference_flat: Dict[tuple, Any]) -> float:
+    """
+    Similarity of two flattened metadata objects (share of matching leaf values on common keys)
+
+    Returns:
+        Similarity score (0-1)
+    """
+    if not student_flat or not reference_flat:
+        return 0.0
+
+    if len(reference_flat) < len(student_flat):
+        smaller, larger = reference_flat, student_flat
+    else:
+        smaller, larger = student_flat, reference_flat
+
+    matches = 0
+    total = 0
+    for path, value in smaller.items():
+        if path not in larger:
+            continue
+        other = larger[path]
+        if value is _NESTED and other is _NESTED:
+            continue
+        total += 1
+        if value is not _NESTED and other is not _NESTED and value == other:
+            matches += 1
+
+    return matches / total if total > 0 else 0.0
+
+def text_terms(flat_metadata: Dict[tuple, Any]) -> frozenset:
+    """
+    Descriptive string values of flattened metadata (e.g. "InfoCube", "Delta", "Financial")
+
+    Numbers, booleans and "Unbekannt" carry no information a text can confirm.
+    """
+    terms = set()
+    for value in flat_metadata.values():
+        if not isinstance(value, str):
+            continue
+        term = " ".join(re.findall(r"\w+", value.lower()))
+        if term and not term.isdigit() and term not in ("unbekannt", "true", "false"):
+            terms.add(term)
+    return frozenset(terms)
+
+def metadata_similarity(student_meta: Dict[str, Any], reference_meta: Dict[str, Any]) -> float:
+    """Similarity score (0-1) between two nested metadata objects"""
+    if not student_meta or not reference_meta:
+        return 0.0
+    return flat_metadata_similarity(flatten_metadata(student_meta), flatten_metadata(reference_meta))
+
+class ReferenceSet:
+    """Reference solutions for one evaluation, with a match index built once per set"""
+
+    def __init__(self, database: Dict[str, Any], embedding_index: Optional[EmbeddingIndex] = None,
+                 is_custom: bool = False, key: Optional[str] = None, artifact_store: Optional[ArtifactStore] = None):
+        """
+        Initialize reference set
+
+        Args:
+            database: Metadata database format {"categories": {name: {"images": [...]}}}
+            embedding_index: Embeddings aligned with each category's "images" list
+            is_custom: True for references uploaded with a request (custom mode templates)
+            key: Identifier of the reference content (used for result reuse)
+            artifact_store: Store holding the reference image files (owned by this set)
+        """
+        self.database = database
+        self.embedding_index = embedding_index or EmbeddingIndex()
+        self.is_custom = is_custom
+        self.artifact_store = artifact_store
+        self.key = key or self._compute_key()
+
+        # Match index: flattened metadata per reference, computed once
+        self._flat_metadata = {
+            category: [flatten_metadata(ref.get("metadata") or {}) for ref in data.get("images", [])]
+            for category, data in self.categories.items()
+        }
+        self._text_terms = {
+            category: [text_terms(flat) for flat in flats]
+            for category, flats in self._flat_metadata.items()
+        }
+
+    @classmethod
+    def from_database(cls, metadata_db_path: str) -> "ReferenceSet":
+        """
+        Build reference set from a metadata database file and its embedding index
+
+        Args:
+            metadata_db_path: Path to metadata database JSON
+        """
+        with open(metadata_db_path, 'r', encoding='utf-8') as f:
+            database = json.load(f)
+
+        return cls(
+            database,
+            embedding_index=EmbeddingIndex.load(metadata_db_path, database),
+            is_custom=False,
+            key=f"database:{os.path.abspath(metadata_db_path)}:{database.get('generated_at')}"
+        )
+
+    @classmethod
+    def from_custom(cls, custom_metadata: Dict[str, List[Dict[str, Any]]],
+                    embeddings: Optional[Dict[str, List[np.ndarray]]] = None,
+                    artifact_store: Optional[ArtifactStore] = None) -> "ReferenceSet":
+        """
+        Build reference set from uploaded custom references
+
+        Args:
+            custom_metadata: Mapping category -> list of reference entries
+                             (image referenced by "file_path" and "image_hash")
+            embeddings: Mapping category -> embeddings in the same order as the entries
+            artifact_store: Store holding the uploaded reference images, removed by cleanup()
+        """
+        database = {"categories": {}}
+        for category, items in custom_metadata.items():
+            database["categories"][category] = {"images": items}
+
+        matrices = {}
+        for category, rows in (embeddings or {}).items():
+            if rows and len(rows) == len(custom_metadata.get(category, [])):
+                matrices[category] = np.stack(rows)
+
+        return cls(database, embedding_index=EmbeddingIndex(matrices), is_custom=True, artifact_store=artifact_store)
+
+    def _compute_key(self) -> str:
+        """Content fingerprint of the references (metadata and image identity)"""
+        digest = hashlib.sha256()
+        for category in sorted(self.categories):
+            digest.update(category.encode("utf-8"))
+            for ref in self.categories[category].get("images", []):
+                # Storage location does not change what a reference is
+                identity = {key: value for key, value in ref.items() if key not in ("image_base64", "file_path")}
+                digest.update(json.dumps(identity, sort_keys=True, default=str).encode("utf-8"))
+                if "image_base64" in ref:
+                    digest.update(hashlib.sha256(ref["image_base64"].encode("ascii")).digest())
+        prefix = "custom" if self.is_custom else "references"
+        return f"{prefix}:{digest.hexdigest()}"
+
+    def cleanup(self):
+        """Remove reference image files owned by this set"""
+        if self.artifact_store:
+            self.artifact_store.cleanup()
+
+    @property
+    def categories(self) -> Dict[str, Any]:
+        """Category name -> category data"""
+        return self.database.get("categories", {})
+
+    def get_references(self, category: str) -> List[Dict[str, Any]]:
+        """Reference entries of a category"""
+        return self.categories.get(category, {}).get("images", [])
+
+    def has_embeddings(self, category: str) -> bool:
+        """Whether embedding search is available for a category"""
+        return self.embedding_index.has_category(category, expected_count=len(self.get_references(category)))
+
+    def top_by_metadata(self, student_metadata: Dict[str, Any], category: str, top_k: int = 3) -> List[Dict[str, Any]]:
+        """
+        Top K references by metadata similarity
+
+        Args:
+            student_metadata: Extracted metadata from student image
+            category: Image category
+            top_k: Number of top matches to return
+
+        Returns:
+            List of top matching references (sorted by similarity)
+        """
+        references = self.get_references(category)
+        student_flat = flatten_metadata(student_metadata or {})
+
+        scored = [
+            (flat_metadata_similarity(student_flat, ref_flat), i)
+            for i, ref_flat in enumerate(self._flat_metadata.get(category, []))
+        ]
+        scored.sort(key=lambda item: item[0], reverse=True)
+
+        return [references[i] for _, i in scored[:top_k]]
+
+    def rerank_by_metadata(self, student_metadata: Dict[str, Any], category: str, candidates: List[int]) -> List[int]:
+        """Order candidate row indices by metadata similarity (stable for ties)"""
+        student_flat = flatten_metadata(student_metadata or {})
+        flats = self._flat_metadata.get(category, [])
+        return sorted(candidates, key=lambda i: flat_metadata_similarity(student_flat, flats[i]), reverse=True)
+
+    def top_by_embedding(self, embedding: np.ndarray, category: str, top_k: int = 3) -> List[int]:
+        """
+        Top K reference row indices by cosine similarity of embeddings
+
+        Returns:
+            Row indices into get_references(category), best first (empty without embeddings)
+        """
+        if embedding is None or not self.has_embeddings(category):
+            return []
+
+        matches = self.embedding_index.top_k(embedding, category, top_k=top_k)
+        references = self.get_references(category)
+        for row, similarity in matches:
+            print(f"   Embedding match: {references[row].get('filename')} (cosine {similarity:.3f})")
+
+        return [row for row, _ in matches]
+
+    def prefilter_by_text(self, category: str, text: str) -> Optional[List[int]]:
+        """
+        Reference row indices whose metadata terms appear in the text next to a student image
+
+        Args:
+            category: Image category
+            text: Context text of the student image (captions, technical names)
+
+        Returns:
+            Rows mentioning the most terms, or None if the text mentions none (no restriction)
+        """
+        if not text:
+            return None
+
+        words = set(re.findall(r"\w+", text.lower()))
+        scored = [
+            (sum(1 for term in terms if words.issuperset(term.split())), i)
+            for i, terms in enumerate(self._text_terms.get(category, []))
+        ]
+        best = max((score for score, _ in scored), default=0)
+        if best == 0:
+            return None
+        return [i for score, i in scored if score == best]
@@ -0,0 +1,238 @@
+import os
+import json
+import base64
+import hashlib
+import shutil
+import tempfile
+from typing import Dict, List, Any, Optional
+
+# Keys holding image payloads; never written into result files
+PAYLOAD_KEYS = ("image_base64",)
+
+def hash_image_bytes(data: bytes) -> str:
+    """SHA-256 hex digest identifying image content"""
+    return hashlib.sha256(data).hexdigest()
+
+class ArtifactStore:
+    """Content-addressed side-car store for image pixels referenced from results"""
+
+    def __init__(self, root_dir: str):
+        """
+        Initialize artifact store
+
+        Args:
+            root_dir: Directory holding the artifacts (created if missing)
+        """
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+
+    def path_for(self, image_hash: str, ext: str = "png") -> str:
+        """Storage path of an artifact (sharded by the first two hash characters)"""
+        return os.path.join(self.root_dir, image_hash[:2], f"{image_hash}.{ext}")
+
+    def put(self, data: bytes, ext: str = "png", image_hash: Optional[str] = None) -> str:
+        """
+        Store bytes (no-op if the content already exists)
+
+        Args:
+            data: Image bytes
+            ext: File extension
+            image_hash: Precomputed SHA-256 of data
+
+        Returns:
+            Content hash
+        """
+        image_hash = image_hash or hash_image_bytes(data)
+        path = self.path_for(image_hash, ext)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.tmp{os.getpid()}"
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+
+        return image_hash
+
+    def put_base64(self, image_base64: str, ext: str = "png") -> str:
+        """Store a base64 encoded image, returns content hash"""
+        return self.put(base64.b64decode(image_base64), ext)
+
+    def get(self, image_hash: str, ext: str = "png") -> bytes:
+        """Read artifact bytes"""
+        path = self.path_for(image_hash, ext)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Artifact not found: {image_hash}")
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def exists(self, image_hash: str, ext: str = "png") -> bool:
+        """Whether an artifact is stored"""
+        return os.path.exists(self.path_for(image_hash, ext))
+
+    def cleanup(self):
+        """Delete the whole store"""
+        shutil.rmtree(self.root_dir, ignore_errors=True)
+
+def slim_image_entry(img_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copy of an extracted image entry without pixel payloads
+
+    The image is referenced by its "image_hash" (and artifact store, if used) instead.
+    """
+    return {key: value for key, value in img_data.items() if key not in PAYLOAD_KEYS}
+
+def write_result_json(result: Dict[str, Any], output_path: str, indent: int = 2):
+    """
+    Stream an evaluation result to a JSON file
+
+    Top-level lists are written element by element, and image payloads are
+    dropped on the way, so no full serialized copy of the result is built in memory.
+
+    Args:
+        result: Evaluation result dictionary
+        output_path: Output file path
+        indent: JSON indentation
+    """
+    pad = " " * indent
+
+    def encode(value, level):
+        text = json.dumps(value, indent=indent, ensure_ascii=False, default=str)
+        return text.replace("\n", "\n" + pad * level)
+
+    # Unique temp file: concurrent saves to the same path never write into one file
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(output_path)}.", suffix=".tmp",
+                                     dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write("{")
+            for i, (key, value) in enumerate(result.items()):
+                f.write("," if i else "")
+                f.write(f"\n{pad}{json.dumps(key, ensure_ascii=False)}: ")
+
+                if isinstance(value, list) and value:
+                    f.write("[")
+                    for j, item in enumerate(value):
+                        if isinstance(item, dict):
+                            item = slim_image_entry(item)
+                        f.write("," if j else "")
+                        f.write(f"\n{pad * 2}{encode(item, 2)}")
+                    f.write(f"\n{pad}]")
+                else:
+                    f.write(encode(value, 1))
+            f.write("\n}\n")
+
+        os.chmod(temp_path, 0o644)  # mkstemp creates private files
+        os.replace(temp_path, output_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def format_result_summary(result: Dict[str, Any]) -> str:
+    """
+    Generate human-readable evaluation summary
+
+    Args:
+        result: Evaluation result (in memory or loaded from a result file)
+
+    Returns:
+        Summary string
+    """
+    summary = f"""
+EVALUATION SUMMARY
+==================
+
+PDF: {os.path.basename(result.get('pdf_path', 'Unknown'))}
+Date: {result.get('timestamp', 'Unknown')}
+
+RESULTS:
+- Images extracted: {len(result.get('images', []))}
+- Valid classifications: {len(result.get('valid_images', []))}
+- Successful evaluations: {len(result.get('evaluations', []))}
+- Overall Score: {result.get('overall_score', 0):.1f}/100
+- Result: {'PASSED' if result.get('passed') else 'FAILED'}
+
+DETAILED SCORES:
+"""
+
+    for eval_data in result.get('evaluations', []):
+        summary += f"- {eval_data['filename']} ({eval_data['category']}): {eval_data['score']}/100\n"
+
+    if result.get('errors'):
+        summary += f"\n⚠️  ERRORS:\n"
+        for error in result['errors']:
+            summary += f"- {error}\n"
+
+    return summary
+
+def summarize_results(paths: List[str]) -> List[Dict[str, Any]]:
+    """
+    One summary row per result file
+
+    Args:
+        paths: Result JSON files or directories containing them
+
+    Returns:
+        List of rows (file, pdf, timestamp, images, valid_images, evaluations,
+        overall_score, passed, errors), oldest first
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".json"))
+        else:
+            files.append(path)
+
+    rows = []
+    for path in files:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            rows.append({"file": path, "error": str(e)})
+            continue
+
+        rows.append({
+            "file": path,
+            "pdf": os.path.basename(result.get("pdf_path", "Unknown")),
+            "timestamp": result.get("timestamp", ""),
+            "images": len(result.get("images", [])),
+            "valid_images": len(result.get("valid_images", [])),
+            "evaluations": len(result.get("evaluations", [])),
+            "overall_score": result.get("overall_score", 0),
+            "passed": bool(result.get("passed")),
+            "errors": len(result.get("errors", []))
+        })
+
+    rows.sort(key=lambda row: row.get("timestamp") or "")
+    return rows
+
+# Command line interface: summarize result files without loading the evaluation system
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python result_store.py <result.json | results_dir> [...]")
+        sys.exit(1)
+
+    if len(sys.argv) == 2 and os.path.isfile(sys.argv[1]):
+        with open(sys.argv[1], 'r', encoding='utf-8') as f:
+            print(format_result_summary(json.load(f)))
+        sys.exit(0)
+
+    rows = summarize_results(sys.argv[1:])
+    for row in rows:
+        if "error" in row:
+            print(f"❌ {row['file']}: {row['error']}")
+            continue
+        status = "PASSED" if row["passed"] else "FAILED"
+        print(f"{row['timestamp'][:19]:19}  {row['pdf'][:40]:40}  {row['overall_score']:5.1f}  {status}  "
+              f"{row['evaluations']}/{row['valid_images']}/{row['images']} evaluated/valid/extracted"
+              + (f"  ⚠️ {row['errors']} errors" if row["errors"] else ""))
+
+    scored = [row for row in rows if "error" not in row]
+    if scored:
+        passed = sum(row["passed"] for row in scored)
+        average = sum(row["overall_score"] for row in scored) / len(scored)
+        print(f"\n{len(scored)} results, {passed} passed, average score {average:.1f}")
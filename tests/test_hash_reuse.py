@@ -0,0 +1,57 @@
+import base64
+import io
+
+from PIL import Image, ImageDraw
+
+from evaluation_engine import EvaluationEngine
+from image_hash_index import ImageHashIndex, compute_dhash, is_exact_copy
+from result_store import hash_image_bytes
+
+def make_screen(text: str) -> Image.Image:
+    """Same SAP GUI-like layout with different field contents"""
+    image = Image.new("RGB", (800, 600), (240, 240, 240))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 800, 30), fill=(30, 60, 120))
+    draw.rectangle((20, 60, 780, 580), outline=(0, 0, 0), fill=(255, 255, 255))
+    draw.text((40, 80), text, fill=(0, 0, 0))
+    return image
+
+def make_entry(image: Image.Image, filename: str) -> dict:
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return {
+        "filename": filename,
+        "format": "png",
+        "image_base64": base64.b64encode(buffer.getvalue()).decode(),
+        "image_hash": hash_image_bytes(buffer.getvalue())
+    }
+
+def make_engine(tmp_path) -> EvaluationEngine:
+    engine = EvaluationEngine.__new__(EvaluationEngine)
+    engine.hash_index = ImageHashIndex(str(tmp_path / "index.json"))
+    engine.artifact_store = None
+    return engine
+
+def test_same_dhash_different_image_does_not_reuse_grade(tmp_path):
+    first, second = make_screen("ZSALES_CUBE 0CALDAY"), make_screen("ZSTOCK_CUBE 0MATERIAL")
+    assert compute_dhash(first) == compute_dhash(second)
+
+    engine = make_engine(tmp_path)
+    graded = make_entry(first, "page1_img1.png")
+    entry = engine._match_hash_index(graded, "student_a.pdf")
+    assert is_exact_copy(entry, graded["image_hash"])
+
+    other = make_entry(second, "page1_img1.png")
+    match = engine._match_hash_index(other, "student_b.pdf")
+    assert match is entry
+    assert other["reused_from"]["hash_distance"] == 0
+    assert other["reused_from"]["exact"] is False
+    assert not is_exact_copy(match, other["image_hash"])
+
+def test_byte_identical_copy_reuses_grade(tmp_path):
+    engine = make_engine(tmp_path)
+    entry = engine._match_hash_index(make_entry(make_screen("ZSALES_CUBE"), "a.png"), "student_a.pdf")
+
+    copy = make_entry(make_screen("ZSALES_CUBE"), "b.png")
+    assert engine._match_hash_index(copy, "student_b.pdf") is entry
+    assert copy["reused_from"]["exact"] is True
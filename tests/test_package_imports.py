@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAZY_ATTRIBUTES = ["PDFImageExtractor", "ImageClassifier", "QwenClient", "MetadataGenerator", "EvaluationEngine"]
+
+def run_python(code: str) -> subprocess.CompletedProcess:
+    """Run code in a fresh interpreter from the repository root (without the tests' sys.path entry)"""
+    return subprocess.run([sys.executable, "-c", code], cwd=PROJECT_DIR, capture_output=True, text=True)
+
+def test_package_import_loads_no_components():
+    process = run_python(
+        "import sys, evaluation_system_v2\n"
+        "print(sorted(name for name in ('torch', 'torchvision', 'fitz', 'image_classifier') if name in sys.modules))"
+    )
+
+    assert process.returncode == 0, process.stderr
+    assert process.stdout.strip() == "[]"
+
+@pytest.mark.parametrize("name", LAZY_ATTRIBUTES)
+def test_lazy_attribute_resolves(name):
+    process = run_python(
+        "import evaluation_system_v2, sys\n"
+        f"component = evaluation_system_v2.{name}\n"
+        f"assert component is getattr(sys.modules[component.__module__], {name!r})\n"
+        "print(component.__name__)"
+    )
+
+    assert process.returncode == 0, process.stderr
+    assert process.stdout.strip().splitlines()[-1] == name
+
+def test_lazy_attributes_are_listed():
+    import evaluation_system_v2
+
+    assert set(LAZY_ATTRIBUTES) <= set(dir(evaluation_system_v2))
+    assert set(evaluation_system_v2.__all__) == set(LAZY_ATTRIBUTES)
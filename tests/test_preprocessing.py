@@ -0,0 +1,50 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+pytest.importorskip("torchvision")
+
+from preprocessing import FAST_PATH_MAX_TOLERANCE, FAST_PATH_MEAN_TOLERANCE, compare_with_transform
+
+def make_screenshot(width: int, height: int, seed: int = 0) -> Image.Image:
+    """Synthetic SAP GUI-like screenshot: title bar, text rows and framed panels"""
+    rng = np.random.default_rng(seed)
+    image = Image.new("RGB", (width, height), (240, 240, 240))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, width, int(height * 0.05)), fill=(30, 60, 120))
+
+    for _ in range(width * height // 4000):
+        x = int(rng.integers(0, width - 60))
+        y = int(rng.integers(int(height * 0.06), height - 12))
+        draw.text((x, y), "ZSALES_CUBE 0CALDAY", fill=tuple(int(c) for c in rng.integers(0, 120, 3)))
+
+    for _ in range(10):
+        x, y = int(rng.integers(0, width - 100)), int(rng.integers(0, height - 50))
+        box = (x, y, x + int(rng.integers(20, 200)), y + int(rng.integers(10, 80)))
+        draw.rectangle(box, outline=(0, 0, 0), fill=tuple(int(c) for c in rng.integers(150, 255, 3)))
+
+    return image
+
+def encode(image: Image.Image, image_format: str) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **({"quality": 85} if image_format == "JPEG" else {}))
+    return buffer.getvalue()
+
+@pytest.mark.parametrize("image_format", ["PNG", "JPEG"])
+@pytest.mark.parametrize("size", [(2560, 1440), (1920, 1080), (1366, 768), (320, 240), (180, 150)])
+def test_fast_path_matches_torchvision_transform(size, image_format):
+    deviation = compare_with_transform(encode(make_screenshot(*size, seed=size[0]), image_format))
+
+    assert deviation["mean_abs"] <= FAST_PATH_MEAN_TOLERANCE
+    assert deviation["max_abs"] <= FAST_PATH_MAX_TOLERANCE
+
+def test_fast_path_accepts_file_paths(tmp_path):
+    path = tmp_path / "screenshot.jpg"
+    make_screenshot(2400, 1350).save(path, format="JPEG", quality=85)
+
+    deviation = compare_with_transform(str(path))
+
+    assert deviation["mean_abs"] <= FAST_PATH_MEAN_TOLERANCE
+    assert deviation["max_abs"] <= FAST_PATH_MAX_TOLERANCE